@@ -0,0 +1,158 @@
+"""
+Compare HTML extraction strategies for the Brattle, Harvard Film Archive and Coolidge Corner parsers, using the pages in
+`example_data/`.
+
+    python benchmarks/html_extraction.py [--repeat N]
+
+Three strategies are measured for each page:
+
+  legacy - a full `lxml.html` document queried with string XPath expressions, as the providers used to do
+  dom - a full document queried with the providers' precompiled XPath objects (the default)
+  streaming - the providers' `streaming=True` mode, see `kinopy.util.html_.iter_elements()`
+
+Peak memory is measured as the growth of the peak RSS of a fresh interpreter during a single extraction, since most of
+the memory in question belongs to libxml2 and is invisible to `tracemalloc`. This needs Linux, where the peak can be
+reset after startup, elsewhere it is reported as 0.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import timeit
+from datetime import date
+from pathlib import Path
+
+import lxml.html
+
+from kinopy.provider import BrattleProvider, CoolidgeCornerProvider, HarvardFilmArchiveProvider
+
+
+EXAMPLE_DATA = Path(__file__).parent.parent.joinpath("example_data")
+
+
+def brattle_legacy(src: bytes):
+    doc = lxml.html.fromstring(src)
+    results = []
+    for shw in doc.xpath("//div[@class='show-details']"):
+        [link] = shw.xpath(".//a[@class='title']")
+        dates = shw.xpath(".//div[contains(@class, 'date-selector')]//li[@data-date]")
+        results.append((link.text_content().strip(), link.attrib["href"], [node.attrib["data-date"] for node in dates]))
+    return results
+
+
+def harvard_legacy(src: bytes):
+    doc = lxml.html.fromstring(src)
+    results = []
+    for evt in doc.xpath("//div[contains(concat(' ', @class, ' '), ' event ')]"):
+        [time_node] = evt.xpath("./div/time")
+        [title_node] = evt.xpath(".//*[@class='event__title']")
+        [link_node] = evt.xpath(".//a[@class='event__link']")
+        results.append((time_node.attrib["datetime"], title_node.text_content(), link_node.attrib["href"]))
+    return results
+
+
+def coolidge_legacy(src: bytes):
+    doc = lxml.html.fromstring(src)
+    results = []
+    for fc in doc.xpath("//div[@class='film-card']"):
+        [link] = fc.xpath(".//h2/a[@class='film-card__link']")
+        [excerpt] = fc.xpath(".//div[@class='film-card__excerpt']")
+        results.append((link.attrib["href"], link.text_content(), excerpt.text_content()))
+    return results
+
+
+CASES = {
+    "brattle": (
+        "brattle.html",
+        {
+            "legacy": brattle_legacy,
+            "dom": BrattleProvider.shows_from_html,
+            "streaming": lambda src: BrattleProvider.shows_from_html(src, streaming=True),
+        },
+    ),
+    "harvard_film_archive": (
+        "harvard_film_archive_calendar.html",
+        {
+            "legacy": harvard_legacy,
+            "dom": HarvardFilmArchiveProvider.shows_from_html,
+            "streaming": lambda src: HarvardFilmArchiveProvider.shows_from_html(src, streaming=True),
+        },
+    ),
+    "coolidge_corner": (
+        "coolidge_showings.html",
+        {
+            "legacy": coolidge_legacy,
+            "dom": lambda src: CoolidgeCornerProvider.from_showing_page(date.today(), src),
+            "streaming": lambda src: CoolidgeCornerProvider.from_showing_page(date.today(), src, streaming=True),
+        },
+    ),
+}
+
+
+def peak_rss_kib(case: str, strategy: str) -> int:
+    """
+    Run a single extraction in a fresh interpreter and report how much its peak RSS grew, in KiB
+    """
+    proc = subprocess.run(
+        [sys.executable, __file__, "--measure-rss", case, strategy],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return int(proc.stdout)
+
+
+def _rss_kib(field: str) -> int:
+    for line in Path("/proc/self/status").read_text().splitlines():
+        if line.startswith(f"{field}:"):
+            return int(line.split()[1])
+    raise ValueError(f"{field} not found")
+
+
+def measure_rss(case: str, strategy: str) -> None:
+    fixture, strategies = CASES[case]
+    src = EXAMPLE_DATA.joinpath(fixture).read_bytes()
+
+    try:
+        # NOTE: resets the peak RSS (VmHWM) to the current RSS, so that startup doesn't count
+        Path("/proc/self/clear_refs").write_text("5")
+        before = _rss_kib("VmRSS")
+    except OSError:
+        print(0)
+        return
+
+    strategies[strategy](src)
+
+    print(_rss_kib("VmHWM") - before)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="print results as JSON instead of a table")
+    parser.add_argument("--measure-rss", nargs=2, metavar=("CASE", "STRATEGY"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure_rss:
+        measure_rss(*args.measure_rss)
+        return
+
+    results = {}
+    for case, (fixture, strategies) in CASES.items():
+        src = EXAMPLE_DATA.joinpath(fixture).read_bytes()
+        for strategy, func in strategies.items():
+            best = min(timeit.repeat(lambda: func(src), number=5, repeat=args.repeat)) / 5
+            results[case, strategy] = {"ms": best * 1000, "peak_rss_kib": peak_rss_kib(case, strategy)}
+
+    if args.json:
+        print(json.dumps({f"{case}:{strategy}": result for (case, strategy), result in results.items()}, indent=2))
+        return
+
+    print(f"{'page':<24}{'strategy':<12}{'best (ms)':>12}{'speedup':>10}{'peak RSS (KiB)':>16}")
+    for (case, strategy), result in results.items():
+        speedup = results[case, "legacy"]["ms"] / result["ms"]
+        print(f"{case:<24}{strategy:<12}{result['ms']:>12.2f}{speedup:>9.2f}x{result['peak_rss_kib']:>16}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Offline benchmarks of each provider's parse path, driven by the captured payloads in `example_data/`.
+
+    python benchmarks/providers.py [--repeat N] [--tolerance FRACTION] [--update-baseline]
+
+Network access is stubbed out: every request made through `kinopy.util.web` is answered from a fixture, and the
+showings cache is bypassed. Film page URLs are resolved (and Landmark's film details kept) through a fresh store, so
+every run after the first (which is not timed) finds them already there. For each provider this reports the best time to turn its payloads into `Showing` objects,
+the resulting throughput (showings and input megabytes per second) and the peak memory allocated along the way, as
+seen by `tracemalloc`.
+
+Results are compared against `benchmarks/baseline.json`, and the script exits with a nonzero status if any provider is
+slower or uses more memory than its baseline by more than the tolerance. Timings are machine-specific, so regenerate
+the baseline with `--update-baseline` when benchmarking on a new machine.
+
+NOTE: Apple Cinemas is not covered, there is no captured payload for it yet.
+"""
+import argparse
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Optional
+from unittest import mock
+
+from kinopy.provider import (
+    AlamoDrafthouseProvider,
+    BrattleProvider,
+    CoolidgeCornerProvider,
+    HarvardFilmArchiveProvider,
+    LandmarkKendallSquareProvider,
+    RegentTheatreProvider,
+    SomervilleTheatreProvider,
+)
+from kinopy.provider import landmark_kendall
+from kinopy.util import urlresolver, web
+from kinopy.util.kvstore import TTLStore
+
+
+HERE = Path(__file__).parent
+EXAMPLE_DATA = HERE.parent.joinpath("example_data")
+BASELINE = HERE.joinpath("baseline.json")
+
+
+class FixtureResponse:
+    """
+    Just enough of `requests.Response` for the providers
+    """
+    def __init__(self, content: bytes = b"", status_code: int = 200):
+        self.content = content
+        self.status_code = status_code
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    def raise_for_status(self) -> None:
+        if not self.ok:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+@dataclass
+class Case:
+    # (substring of URL, fixture filename) pairs, checked in order. Unmatched requests get a 404
+    routes: list[tuple[str, str]]
+    run: Callable[[], dict]
+
+    def fixtures(self) -> dict[str, bytes]:
+        return {fixture: EXAMPLE_DATA.joinpath(fixture).read_bytes() for _, fixture in self.routes}
+
+
+def _stub_request(routes: list[tuple[str, str]], fixtures: dict[str, bytes]):
+    def request(method, url, **kwargs):
+        for pattern, fixture in routes:
+            if pattern in url:
+                return FixtureResponse(fixtures[fixture])
+        return FixtureResponse(status_code=404)
+
+    return request
+
+
+def _uncached(method):
+    """
+    The showings-by-date function underneath the `daily_showings_cache` decorator
+    """
+    return method.__wrapped__
+
+
+def _somerville() -> dict:
+    config = SimpleNamespace(provider_section=lambda name: {"token": "benchmark"})
+    provider = SomervilleTheatreProvider(config)
+    return _uncached(SomervilleTheatreProvider.showings_by_date)(provider, from_date=date(2025, 8, 1), to_date=date(2025, 9, 12))
+
+
+def _coolidge() -> dict:
+    d = date(2025, 8, 12)
+    return {d: CoolidgeCornerProvider.showings_for_date(d)}
+
+
+def _regent() -> dict:
+    # NOTE: the months retrieved are shared between providers, each run has to retrieve them again
+    RegentTheatreProvider.clear_cache()
+    provider = RegentTheatreProvider()
+    return _uncached(RegentTheatreProvider.showings_by_date)(provider, from_date=date(2025, 8, 1), to_date=date(2025, 10, 31))
+
+
+CASES = {
+    "alamo_drafthouse": Case(
+        routes=[("drafthouse.com", "alamo.json")],
+        run=lambda: AlamoDrafthouseProvider.from_json(AlamoDrafthouseProvider.showings_json()),
+    ),
+    "alamo_drafthouse_streaming": Case(
+        routes=[("drafthouse.com", "alamo.json")],
+        run=lambda: AlamoDrafthouseProvider.from_json(AlamoDrafthouseProvider.showings_src(), streaming=True),
+    ),
+    "brattle": Case(
+        routes=[("brattlefilm.org", "brattle.html")],
+        run=lambda: _uncached(BrattleProvider.showings_by_date)(BrattleProvider, from_date=date.min, to_date=date.max),
+    ),
+    "coolidge_corner": Case(
+        routes=[("coolidge.org/showtimes", "coolidge_showings.html")],
+        run=_coolidge,
+    ),
+    "harvard_film_archive": Case(
+        routes=[("harvardfilmarchive.org", "harvard_film_archive_calendar.html")],
+        run=lambda: _uncached(HarvardFilmArchiveProvider.showings_by_date)(HarvardFilmArchiveProvider, from_date=date(2025, 8, 1), to_date=date(2025, 8, 31)),
+    ),
+    "landmark_kendall": Case(
+        routes=[("boxofficeapi/schedule", "kendall.json"), ("boxofficeapi/movies", "kendall_details.json")],
+        run=lambda: _uncached(LandmarkKendallSquareProvider.showings_by_date)(LandmarkKendallSquareProvider, from_date=date(2025, 8, 10), to_date=date(2025, 8, 14)),
+    ),
+    "regent_theatre": Case(
+        routes=[("evo-ajax", "regent.json"), ("regenttheatre.com/schedule", "regent_schedule.html")],
+        run=_regent,
+    ),
+    "somerville_theatre": Case(
+        routes=[("veezi.com", "somerville_veezi_data.json")],
+        run=_somerville,
+    ),
+}
+
+
+def measure(case: Case, repeat: int) -> dict:
+    fixtures = case.fixtures()
+    input_mb = sum(len(src) for src in fixtures.values()) / 1e6
+
+    with contextlib.ExitStack() as stack:
+        tmpdir = Path(stack.enter_context(tempfile.TemporaryDirectory()))
+        resolver = urlresolver.URLResolver(TTLStore(tmpdir.joinpath("urls.sqlite3")))
+        stack.enter_context(mock.patch.object(urlresolver, "default_resolver", lambda: resolver))
+        details = TTLStore(tmpdir.joinpath("film_details.sqlite3"))
+        stack.enter_context(mock.patch.object(landmark_kendall, "details_store", lambda: details))
+        stack.enter_context(mock.patch.object(web, "request", _stub_request(case.routes, fixtures)))
+        stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+
+        result = case.run()
+        nshowings = sum(len(shows) for shows in result.values())
+
+        best = min(timeit.repeat(case.run, number=1, repeat=repeat))
+
+        tracemalloc.start()
+        case.run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "seconds": best,
+        "showings": nshowings,
+        "showings_per_second": nshowings / best,
+        "input_mb_per_second": input_mb / best,
+        "peak_kib": peak / 1024,
+    }
+
+
+def regressions(results: dict[str, dict], baseline: dict[str, dict], tolerance: float) -> list[str]:
+    problems = []
+
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        base = baseline[name]
+        if result["seconds"] > base["seconds"] * (1 + tolerance):
+            problems.append(f"{name}: {result['seconds'] * 1000:.2f} ms is slower than baseline {base['seconds'] * 1000:.2f} ms")
+        if result["peak_kib"] > base["peak_kib"] * (1 + tolerance):
+            problems.append(f"{name}: peak {result['peak_kib']:.0f} KiB is more than baseline {base['peak_kib']:.0f} KiB")
+        if result["showings"] != base["showings"]:
+            problems.append(f"{name}: produced {result['showings']} showings, baseline produced {base['showings']}")
+
+    return problems
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown or memory growth, as a fraction of the baseline")
+    parser.add_argument("--update-baseline", action="store_true", help=f"store these results as the new baseline in {BASELINE.name}")
+    parser.add_argument("providers", nargs="*", metavar="PROVIDER", help=f"providers to benchmark, any of: {', '.join(CASES)} (default: all)")
+    args = parser.parse_args(argv)
+
+    if unknown := set(args.providers) - set(CASES):
+        parser.error(f"unknown providers: {', '.join(sorted(unknown))}")
+
+    results = {name: measure(CASES[name], repeat=args.repeat) for name in (args.providers or CASES)}
+
+    print(f"{'provider':<24}{'best (ms)':>12}{'showings':>10}{'showings/s':>12}{'MB/s':>8}{'peak (KiB)':>12}")
+    for name, result in results.items():
+        print(
+            f"{name:<24}{result['seconds'] * 1000:>12.2f}{result['showings']:>10}{result['showings_per_second']:>12.0f}"
+            f"{result['input_mb_per_second']:>8.1f}{result['peak_kib']:>12.0f}"
+        )
+
+    if args.update_baseline:
+        baseline = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+        baseline.update(results)
+        BASELINE.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline updated: {BASELINE}")
+        return 0
+
+    if not BASELINE.exists():
+        print(f"No baseline found at {BASELINE}, run with --update-baseline to create one")
+        return 0
+
+    problems = regressions(results, json.loads(BASELINE.read_text()), tolerance=args.tolerance)
+    for problem in problems:
+        print(f"REGRESSION: {problem}")
+
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,24 +2,180 @@ function hi() {
     alert("hi!");
 }
 
-function toggleCinema(cinemaName) {
-    for (node of document.getElementsByClassName(cinemaName)) {
-        if (node.classList.contains("hidden")) {
-            node.classList.remove("hidden");
-        } else {
-            node.classList.add("hidden");
-        }
+// Each filter on the page has an ID (in its data-filter attribute), and everything it matches has that ID as a class.
+// The page has a rule for every filter that hides what it matches while the page has the filter's "hide-" class (see
+// write_filter_styles() in main.py), so toggling a filter changes a single class however many showings it matches.
+
+function toggleFilter(filterId) {
+    document.documentElement.classList.toggle(`hide-${filterId}`);
+}
+
+document.addEventListener("change", (event) => {
+    const filterId = event.target.dataset && event.target.dataset.filter;
+    if (filterId) {
+        toggleFilter(filterId);
+    }
+});
+
+function addFilterStyles(filterIds) {
+    const style = document.createElement("style");
+    style.textContent = filterIds.map((filterId) => `.hide-${filterId} .${filterId} { display: none; }`).join("\n");
+    document.head.append(style);
+}
+
+
+// Calendar pages written with `mode = "data"` (see write_shell() in main.py) only hold an empty element with the URL
+// of the index of the data files. The showings of each day are fetched when the week they are in is shown, the same
+// markup as ShowingCalendar.write_weeks() is built from them.
+
+const WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"];
+const MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"];
+
+let calendar = null;
+
+function parseDate(s) {
+    const [year, month, day] = s.split("-").map(Number);
+    return new Date(year, month - 1, day);
+}
+
+function formatDate(d) {
+    const pad = (n) => String(n).padStart(2, "0");
+    return `${d.getFullYear()}-${pad(d.getMonth() + 1)}-${pad(d.getDate())}`;
+}
+
+function addDays(d, n) {
+    const result = new Date(d);
+    result.setDate(result.getDate() + n);
+    return result;
+}
+
+function weekdayClass(d) {
+    // NOTE: getDay() starts the week on Sunday, the calendar classes start it on Monday
+    return WEEKDAYS[(d.getDay() + 6) % 7];
+}
+
+async function loadCalendar(root) {
+    const indexUrl = root.dataset.index;
+    const response = await fetch(indexUrl, {cache: "no-cache"});
+    const index = await response.json();
+
+    calendar = {
+        root: root,
+        base: indexUrl.substring(0, indexUrl.lastIndexOf("/") + 1),
+        index: index,
+        cssclasses: new Map(index.cinemas.map((c) => [c.name, c.cssclass])),
+        days: new Map(),
+        start: parseDate(index.from),
+    };
+
+    renderTitleFilters(document.getElementById("title-filters"), index.titles);
+    await renderWeek();
+}
+
+function loadDay(key) {
+    if (!calendar.days.has(key)) {
+        const entry = calendar.index.days[key];
+        const day = entry
+            ? fetch(`${calendar.base}${entry.src}?v=${entry.version}`).then((response) => response.json())
+            : Promise.resolve({date: key, cinemas: []});
+        calendar.days.set(key, day);
     }
+    return calendar.days.get(key);
 }
 
-function toggleMovie(title) {
-    for (node of document.getElementsByTagName("li")) {
-        if (node.textContent == title) {
-            if (node.classList.contains("hidden")) {
-                node.classList.remove("hidden");
-            } else {
-                node.classList.add("hidden");
-            }
+function renderDay(d, day) {
+    const td = document.createElement("td");
+    td.className = weekdayClass(d);
+
+    day.cinemas.forEach((cinema, n) => {
+        if (n) {
+            td.append(document.createElement("hr"));
+        }
+
+        const cssclass = calendar.cssclasses.get(cinema.name);
+        const div = document.createElement("div");
+        div.className = `cinema-root ${cssclass}`;
+        div.dataset.cinema = cssclass;
+
+        const name = document.createElement("span");
+        name.textContent = cinema.name;
+        const ul = document.createElement("ul");
+        for (const show of cinema.showings) {
+            const li = document.createElement("li");
+            const a = document.createElement("a");
+            const i = document.createElement("i");
+            a.href = show.url;
+            i.textContent = show.title;
+            a.append(i);
+            li.append(a);
+            li.className = show.mass_market ? `${show.id} mass-market` : show.id;
+            li.dataset.title = show.id;
+            ul.append(li);
+        }
+
+        div.append(name, ul);
+        td.append(div);
+    });
+
+    return td;
+}
+
+async function renderWeek() {
+    const start = calendar.start;
+    const days = [...Array(7).keys()].map((n) => addDays(start, n));
+    const data = await Promise.all(days.map((d) => loadDay(formatDate(d))));
+
+    // NOTE: the week may have changed while its days were being fetched
+    if (start !== calendar.start) {
+        return;
+    }
+
+    const last = days[6];
+    const table = document.createElement("table");
+    table.innerHTML = (
+        `<thead>\n<th colspan=7>\n<h3>${MONTHS[start.getMonth()]} ${start.getDate()} - ${MONTHS[last.getMonth()]} ${last.getDate()}</h3>\n</th>\n</thead>\n`
+        + "<thead>\n"
+        + days.map((d) => `<th class="daynum">${weekdayClass(d).replace(/^./, (c) => c.toUpperCase())} ${d.getDate()}</th>\n`).join("")
+        + "</thead>\n"
+    );
+
+    const tr = document.createElement("tr");
+    days.forEach((d, n) => tr.append(renderDay(d, data[n])));
+    table.append(tr);
+
+    calendar.root.replaceChildren(table);
+
+    // NOTE: the next week is fetched ahead of time, so that moving to it is quick
+    for (let n = 7; n < 14; n++) {
+        const key = formatDate(addDays(start, n));
+        if (key <= calendar.index.to) {
+            loadDay(key);
         }
     }
 }
+
+function shiftWeek(weeks) {
+    const start = addDays(calendar.start, 7 * weeks);
+    const key = formatDate(start);
+    if (key < calendar.index.from || key > calendar.index.to) {
+        return;
+    }
+
+    calendar.start = start;
+    renderWeek();
+}
+
+function renderTitleFilters(container, titles) {
+    addFilterStyles(titles.map((t) => t.id));
+
+    for (const t of titles) {
+        const box = document.createElement("input");
+        box.type = "checkbox";
+        box.checked = !document.documentElement.classList.contains(`hide-${t.id}`);
+        box.dataset.filter = t.id;
+
+        const label = document.createElement("label");
+        label.append(box, t.title);
+        container.append(label, " ", document.createElement("br"));
+    }
+}
@@ -1,124 +1,473 @@
 from __future__ import annotations
 
+import argparse
+import hashlib
 import json
 import itertools
 import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
 from datetime import date, timedelta
+from io import StringIO
 from pathlib import Path
 from textwrap import dedent
+from typing import Callable, Iterable, Optional, TextIO
 
-from kinopy.config import kinopy_config
-from kinopy.datamodel import Day, Cinema, Showing, ShowingCalendar
-from kinopy.provider import (
-    AlamoDrafthouseProvider,
-    AppleCinemasProvider,
-    BrattleProvider,
-    CoolidgeCornerProvider,
-    HarvardFilmArchiveProvider,
-    LandmarkKendallSquareProvider,
-    RegentTheatreProvider,
-    SomervilleTheatreProvider,
-)
+from kinopy.config import KinopySettings, get_config
+from kinopy.datamodel import CACHE_ROOT, Day, Cinema, MassMarketClassifier, Showing, ShowingCalendar, ShowingStore, fingerprint_by_date
+from kinopy.provider import PROVIDERS, provider_class
+from kinopy.util import metrics, web
+from kinopy.util.cache import showings_cache_ttl
+from kinopy.util.files import write_if_changed
+from kinopy.util.fragments import FragmentCache
 
 
 HERE = Path(__file__).parent
-def showings_by_cinema() -> dict[Cinema, dict[Day, Showing]]:
-    results = {}
 
-    from_date = date.today()
-    to_date = from_date + timedelta(days=6)
 
-    # TODO: Create heuristic for filtering out "mass-market" new releases. A single checkbox to show/hide these is fine in the UI,
-    # and I think it might be enough to create this class of films by checking how many times a movie appears on the calendar. If
-    # a movie appears multiple times across multiple theatres, it's likely a new release. May need to hold onto historical data to
-    # do this right though.
+# NOTE: "page" writes every showing into cal.html, "data" writes a shell page that loads them from JSON files as needed
+OUTPUT_MODES = ("page", "data")
+
+# NOTE: the class of the showings of mass-market releases, and the ID of the filter that hides them
+MASS_MARKET = "mass-market"
+
+
+ShowingsJob = Callable[[], dict[Day, list[Showing]]]
+# NOTE: what went wrong for each cinema whose job failed
+Failures = dict[Cinema, str]
+
+
+# NOTE: the provider for each cinema (see kinopy.provider.PROVIDERS), in the order they should appear on the calendar,
+# and whether it takes the settings when it is created
+CINEMAS: dict[Cinema, tuple[str, bool]] = {
+    "Somerville Theatre": ("somerville_theatre", True),
+    "The Brattle": ("brattle", False),
+    "Regent Theatre": ("regent_theatre", False),
+    "Harvard Film Archive": ("harvard_film_archive", False),
+    "Coolidge Corner Theatre": ("coolidge_corner", True),
+    "Alamo Drafthouse": ("alamo_drafthouse", False),
+    "Landmark Kendall Square Cinema": ("landmark_kendall", False),
+    "Apple Cinemas": ("apple_cinemas", True),
+}
+
+
+def provider_jobs(from_date: date, to_date: date, config: KinopySettings) -> dict[Cinema, ShowingsJob]:
+    """
+    The retrieval job for each enabled cinema, in the order they should appear on the calendar
+
+    A provider's module is only imported when its job runs.
+    """
+    enabled = config.provider.enabled if config.provider is not None else None
+    if enabled is not None and (unknown := set(enabled) - set(PROVIDERS)):
+        raise ValueError(f"Unknown providers enabled in kinopy.toml: {', '.join(sorted(unknown))}")
+
+    def job(name: str, configured: bool) -> ShowingsJob:
+        ttl = config.provider_cache_ttl(name)
+
+        def run() -> dict[Day, list[Showing]]:
+            cls = provider_class(name)
+            provider = cls(config) if configured else cls()
+            with showings_cache_ttl(ttl) if ttl is not None else nullcontext():
+                return provider.showings_by_date(from_date=from_date, to_date=to_date)
+
+        return run
+
+    return {cinema: job(name, configured) for cinema, (name, configured) in CINEMAS.items() if enabled is None or name in enabled}
+
+
+def measured(cinema: Cinema, job: ShowingsJob) -> ShowingsJob:
+    """
+    Wrap `job` so that its run, and everything it does along the way, is recorded in the metrics for `cinema`
+    """
+    def run() -> dict[Day, list[Showing]]:
+        with metrics.provider(cinema) as m:
+            result = job()
+            m["showings"] = sum(len(shows) for shows in result.values())
+        return result
+
+    return run
+
+
+def fetch_serially(jobs: dict[Cinema, ShowingsJob]) -> tuple[dict[Cinema, dict[Day, list[Showing]]], Failures]:
+    """
+    Run each job in turn, returning the results of the ones that succeeded and what went wrong with the others
+    """
+    results, failures = {}, {}
+
+    for cinema, job in jobs.items():
+        try:
+            print(f"=== Getting showings for: {cinema}")
+            results[cinema] = job()
+        except Exception as exc:
+            print(f"=== FAILED to retrieve {cinema} listings: {exc}")
+            failures[cinema] = repr(exc)
+
+    return results, failures
+
+
+def fetch_concurrently(jobs: dict[Cinema, ShowingsJob], timeout: float, timeouts: dict[Cinema, float]) -> tuple[dict[Cinema, dict[Day, list[Showing]]], Failures]:
+    """
+    Run every job at once, collecting results as they complete
+
+    A job that raises or does not finish before its deadline is left off of the results and put in the failures
+    instead, the same as a failure when retrieving serially.
+    """
+    results, failures = {}, {}
 
-    # TODO (maybe): related to above remark: a local database more sophisticated than the existing cache could be useful
+    executor = ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix="kinopy-provider")
+    start = time.monotonic()
 
-    # TODO: I am not sure this code does the right thing when the next week crosses a month boundary
+    pending = {}
+    deadlines = {}
+    for cinema, job in jobs.items():
+        print(f"=== Getting showings for: {cinema}")
+        fut = executor.submit(job)
+        pending[fut] = cinema
+        deadlines[fut] = start + timeouts.get(cinema, timeout)
 
-    # SOMERVILLE
     try:
-        print("=== Getting showings for: Somerville Theatre")
-        somerville_presentations = SomervilleTheatreProvider(kinopy_config).showings_by_date(from_date=from_date, to_date=to_date)
-        results["Somerville Theatre"] = somerville_presentations
-    except Exception as exc:
-        print(f"=== FAILED to retrieve Somerville Theatre listings: {exc}")
+        while pending:
+            next_deadline = min(deadlines[fut] for fut in pending)
+            done, _ = wait(pending, timeout=max(0.0, next_deadline - time.monotonic()), return_when=FIRST_COMPLETED)
 
-    # THE BRATTLE
-    print("=== Getting showings for: The Brattle")
-    brattle_presentations = BrattleProvider().showings_by_date(from_date=from_date, to_date=to_date)
-    results["The Brattle"] = brattle_presentations
+            for fut in done:
+                cinema = pending.pop(fut)
+                try:
+                    results[cinema] = fut.result()
+                    print(f"=== Finished retrieving {cinema} listings ({time.monotonic() - start:.1f} s)")
+                except Exception as exc:
+                    print(f"=== FAILED to retrieve {cinema} listings: {exc}")
+                    failures[cinema] = repr(exc)
 
-    # REGENT
-    print("=== Getting showings for: Regent Theatre")
-    regent_presentations = RegentTheatreProvider().showings_by_date(from_date=from_date, to_date=to_date)
-    results["Regent Theatre"] = regent_presentations
+            now = time.monotonic()
+            for fut in [fut for fut in pending if deadlines[fut] <= now]:
+                cinema = pending.pop(fut)
+                fut.cancel()
+                print(f"=== TIMED OUT retrieving {cinema} listings after {now - start:.1f} s")
+                failures[cinema] = f"timed out after {now - start:.1f} s"
+    finally:
+        # NOTE: a worker that has timed out can't be interrupted, we just stop waiting on it. The interpreter will still
+        # wait for it before exiting, but the calendar gets built in the meantime.
+        executor.shutdown(wait=False, cancel_futures=True)
 
-    # HARVARD FILM ARCHIVE
-    print("=== Getting showings for: Harvard Film Archive")
-    harvard_presentations = HarvardFilmArchiveProvider.showings_by_date(from_date=from_date, to_date=to_date)
-    results["Harvard Film Archive"] = harvard_presentations
+    return results, failures
 
-    # COOLIDGE
-    print("=== Getting showings for: Coolidge Corner")
-    coolidge_presentations = CoolidgeCornerProvider().showings_by_date(from_date=from_date, to_date=to_date)
-    results["Coolidge Corner Theatre"] = coolidge_presentations
 
-    # ALAMO
-    print("=== Getting showings for: Alamo Drafthouse")
-    alamo_presentations = AlamoDrafthouseProvider().showings_by_date(from_date=from_date, to_date=to_date)
-    results["Alamo Drafthouse"] = alamo_presentations
+def showing_window() -> tuple[date, date]:
+    """
+    The range of dates on the calendar
+    """
+    from_date = date.today()
+    return from_date, from_date + timedelta(days=get_config().output.days - 1)
 
-    # LANDMARK KENDALL
-    print("=== Getting showings for: Landmark Kendall Square Cinema")
-    landmark_presentations = LandmarkKendallSquareProvider().showings_by_date(from_date=from_date, to_date=to_date)
-    results["Landmark Kendall Square Cinema"] = landmark_presentations
 
-    # APPLE CINEMAS CAMBRIDGE
-    print("=== Getting showings for: Apple Cinemas")
-    apple_presentations = AppleCinemasProvider().showings_by_date(from_date=from_date, to_date=to_date)
-    results["Apple Cinemas"] = apple_presentations
+def calendar_weeks() -> int:
+    """
+    How many weeks it takes to show the whole range of dates on the calendar
+    """
+    return -(-get_config().output.days // 7)
 
-    return results
 
+def showings_by_cinema(concurrent: Optional[bool] = None, store: Optional[ShowingStore] = None, classifier: Optional[MassMarketClassifier] = None) -> dict[Cinema, dict[Day, list[Showing]]]:
+    from_date, to_date = showing_window()
 
-def main():
-    shows = showings_by_cinema()
+    config = get_config()
+    fetch_config = config.fetch
+    if concurrent is None:
+        concurrent = fetch_config.concurrent
 
-    # Showtime!
-    cal = ShowingCalendar(shows)
-
-    cal_table = cal.formatweek()
-
-    cinema_checkboxes = "\n".join(f'<input type="checkbox" checked=on onClick="toggleCinema(\'{cinema.replace(" ", "-")}\')">{cinema.title()}</input> <br/>' for cinema in shows.keys())
-    show_titles = set(show.title for showlst in itertools.chain.from_iterable(cinema.values() for cinema in shows.values()) for show in showlst)
-    title_checkboxes = "\n".join(f'<input type="checkbox" checked=on onClick="toggleMovie(\'{title}\')">{title}</input> <br/>' for title in sorted(show_titles))
-
-    html = dedent(
-        f"""
-        <html>
-        <head>
-            <meta http-equiv="Content-Type" content="text/html; charset=utf-8">
-            <title>Movie showings in selected theatres in the Boston metro area</title>
-            <link type="text/css" rel="stylesheet" href="cal.css" />
-            <script src="cal.js"></script>
-        </head>
-        <body>
-            {cal_table}
-
-            <hr/>
-            {cinema_checkboxes}
-            <div class="title-filters">
-                {title_checkboxes}
-            </div>
-
-        </body>
-        </html>
-        """
+    jobs = {cinema: measured(cinema, job) for cinema, job in provider_jobs(from_date=from_date, to_date=to_date, config=config).items()}
+
+    if concurrent:
+        results, failures = fetch_concurrently(jobs, timeout=fetch_config.timeout, timeouts=fetch_config.timeouts)
+    else:
+        results, failures = fetch_serially(jobs)
+
+    # NOTE: "mass-market" new releases are told apart by how many cinemas they show at and for how long, which needs
+    # more history than the current listings, so every result is counted as it comes in, see kinopy.datamodel.massmarket
+    if classifier is not None:
+        for cinema, shows in results.items():
+            classifier.record(cinema, from_date=from_date, to_date=to_date, shows=shows)
+
+    if store is not None:
+        # NOTE: a result the same as the last one recorded (e.g. one from the daily showings cache) isn't recorded
+        # again, see ShowingStore.record_run()
+        for cinema, shows in results.items():
+            store.record_run(cinema, from_date=from_date, to_date=to_date, shows=shows)
+        for cinema, error in failures.items():
+            store.record_failure(cinema, from_date=from_date, to_date=to_date, error=error)
+
+        # NOTE: reading back from the store means a cinema that failed this time still shows its last known listings
+        results = store.showings_by_cinema(from_date=from_date, to_date=to_date, cinemas=jobs)
+
+    # NOTE: results arrive in completion order, but the calendar should list cinemas in a stable order
+    return {cinema: results[cinema] for cinema in jobs if cinema in results}
+
+
+PAGE_HEAD = dedent(
+    """
+    <html>
+    <head>
+        <meta http-equiv="Content-Type" content="text/html; charset=utf-8">
+        <title>Movie showings in selected theatres in the Boston metro area</title>
+        <link type="text/css" rel="stylesheet" href="cal.css" />
+        <script src="cal.js"></script>
+    </head>
+    <body>
+    """
+)
+
+PAGE_FOOT = dedent(
+    """
+    </body>
+    </html>
+    """
+)
+
+
+def write_filter(stream: TextIO, filter_id: str, label: str) -> None:
+    stream.write(f'<label><input type="checkbox" checked=on data-filter="{filter_id}">{label}</label> <br/>\n')
+
+
+def write_filter_styles(stream: TextIO, filter_ids: Iterable[str]) -> None:
+    """
+    Write a rule for each filter that hides what it matches while the page has the filter's "hide-" class, so that
+    toggling a filter only ever changes one class, see cal.js
+    """
+    stream.write("<style>\n")
+    for filter_id in filter_ids:
+        stream.write(f".hide-{filter_id} .{filter_id} {{ display: none; }}\n")
+    stream.write("</style>\n")
+
+
+def write_cinema_filters(stream: TextIO, cinemas: Iterable[Cinema]) -> None:
+    for cinema in cinemas:
+        write_filter(stream, ShowingCalendar.cinema_cssclass(cinema), cinema.title())
+
+
+def write_mass_market_filter(stream: TextIO) -> None:
+    write_filter(stream, MASS_MARKET, "Mass-market releases")
+
+
+def write_page(stream: TextIO, cal: ShowingCalendar, shows: dict[Cinema, dict[Day, list[Showing]]], starting_day: Optional[date] = None, weeks: int = 1) -> None:
+    titles = ShowingCalendar.title_filters(cal.title_ids)
+    mass_market = cal.classifier is not None
+
+    stream.write(PAGE_HEAD)
+    write_filter_styles(stream, itertools.chain((ShowingCalendar.cinema_cssclass(cinema) for cinema in shows), [MASS_MARKET] if mass_market else [], titles))
+
+    cal.write_weeks(stream, starting_day=starting_day, weeks=weeks)
+
+    stream.write("<hr/>\n")
+    write_cinema_filters(stream, shows.keys())
+    if mass_market:
+        write_mass_market_filter(stream)
+
+    stream.write('<div class="title-filters">\n')
+    for title_id, label in titles.items():
+        write_filter(stream, title_id, label)
+    stream.write("</div>\n")
+
+    stream.write(PAGE_FOOT)
+
+
+def render_page(shows: dict[Cinema, dict[Day, list[Showing]]], classifier: Optional[MassMarketClassifier] = None) -> str:
+    buf = StringIO()
+    write_page(buf, ShowingCalendar(shows, classifier=classifier), shows, weeks=calendar_weeks())
+    return buf.getvalue()
+
+
+def write_shell(stream: TextIO, cinemas: list[Cinema], data_dir: str, mass_market: bool = False) -> None:
+    """
+    Write the calendar page without any showings in it, cal.js loads them from `data_dir` (see `write_data()`) as they
+    are viewed
+    """
+    stream.write(PAGE_HEAD)
+    # NOTE: the rules for the titles are added by cal.js along with their filters
+    write_filter_styles(stream, itertools.chain((ShowingCalendar.cinema_cssclass(cinema) for cinema in cinemas), [MASS_MARKET] if mass_market else []))
+
+    stream.write(f'<div id="calendar" data-index="{data_dir}/index.json"></div>\n')
+    stream.write('<button onClick="shiftWeek(-1)">&larr; Previous week</button> <button onClick="shiftWeek(1)">Next week &rarr;</button>\n')
+
+    stream.write("<hr/>\n")
+    write_cinema_filters(stream, cinemas)
+    if mass_market:
+        write_mass_market_filter(stream)
+    stream.write('<div class="title-filters" id="title-filters"></div>\n')
+
+    stream.write('<script>loadCalendar(document.getElementById("calendar"));</script>\n')
+    stream.write(PAGE_FOOT)
+
+
+def write_data(directory: Path, shows: dict[Cinema, dict[Day, list[Showing]]], from_date: date, to_date: date, classifier: Optional[MassMarketClassifier] = None) -> int:
+    """
+    Write the showings on each day from `from_date` through `to_date` as a JSON file in `directory`, along with an
+    index of those files
+
+    Only files whose contents changed are written, and the files of days that are no longer on the calendar are removed.
+    Returns how many files were written.
+    """
+    days_dir = directory.joinpath("days")
+    days_dir.mkdir(parents=True, exist_ok=True)
+
+    by_date = ShowingCalendar.index(shows)
+    title_ids = ShowingCalendar.title_index(shows)
+    mass_market = classifier.mass_market() if classifier is not None else frozenset()
+
+    def showing(show: Showing) -> dict:
+        result = {"title": show.title, "id": title_ids[show.title], "url": show.url}
+        if mass_market and classifier.film(show.title) in mass_market:
+            result["mass_market"] = True
+        return result
+
+    written = 0
+    day_files = {}
+    # NOTE: days without any showings don't get a file, cal.js doesn't ask for days that aren't in the index
+    for dt in sorted(dt for dt in by_date if from_date <= dt <= to_date):
+        day = {
+            "date": dt.isoformat(),
+            "cinemas": [
+                {"name": cinema, "showings": [showing(show) for show in day_shows]}
+                for cinema, day_shows in by_date[dt]
+            ],
+        }
+        data = json.dumps(day, separators=(",", ":")).encode("utf-8")
+        path = days_dir.joinpath(f"{dt.isoformat()}.json")
+        written += write_if_changed(path, data)
+        # NOTE: the version is added to the URL, so that a browser never uses a stale copy of a day that changed
+        day_files[dt.isoformat()] = {"src": f"days/{path.name}", "version": hashlib.sha256(data).hexdigest()[:16]}
+
+    for stale in days_dir.glob("*.json"):
+        if stale.stem not in day_files:
+            stale.unlink()
+
+    index = {
+        "from": from_date.isoformat(),
+        "to": to_date.isoformat(),
+        "cinemas": [{"name": cinema, "cssclass": ShowingCalendar.cinema_cssclass(cinema)} for cinema in shows],
+        "titles": [{"title": label, "id": title_id} for title_id, label in ShowingCalendar.title_filters(title_ids).items()],
+        "days": day_files,
+    }
+    written += write_if_changed(directory.joinpath("index.json"), json.dumps(index, separators=(",", ":")).encode("utf-8"))
+
+    return written
+
+
+def serve(store: ShowingStore, classifier: Optional[MassMarketClassifier] = None) -> None:
+    """
+    Serve the calendar until interrupted, refreshing each cinema in the background, see `kinopy.server`
+    """
+    # NOTE: only imported when serving, a one-off run doesn't need http.server
+    from kinopy.server import CalendarServer
+
+    config = get_config()
+    server_config = config.server
+
+    cinemas = list(provider_jobs(*showing_window(), config=config))
+    server = CalendarServer(
+        (server_config.host, server_config.port),
+        cinemas=cinemas,
+        jobs=lambda from_date, to_date: provider_jobs(from_date=from_date, to_date=to_date, config=config),
+        window=showing_window,
+        render=lambda shows: render_page(shows, classifier=classifier),
+        static_files=[HERE.joinpath("cal.css"), HERE.joinpath("cal.js")],
+        interval=server_config.interval,
+        intervals=server_config.intervals,
+        retry_interval=server_config.retry_interval,
+        store=store,
+        classifier=classifier,
     )
 
-    Path("cal.html").write_text(html)
+    print(f"=== Serving the calendar at http://{server_config.host}:{server.server_address[1]}/")
+    server.start_refreshing()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop_refreshing()
+        server.server_close()
+
+
+def write_calendar_page(shows: dict[Cinema, dict[Day, list[Showing]]], classifier: Optional[MassMarketClassifier] = None) -> None:
+    # NOTE: only the fragments of the page whose listings changed since the last run are rendered again, and cal.html
+    # is only written if the page came out different
+    fragments = FragmentCache(CACHE_ROOT.joinpath("fragments.json"), version=ShowingCalendar.FRAGMENT_VERSION)
+    changed = fragments.changed_since_last_run({cinema: fingerprint_by_date(shows_by_date) for cinema, shows_by_date in shows.items()})
+    if changed:
+        print(f"=== Listings changed since the last run: {', '.join(changed)}")
+
+    # Showtime!
+    cal = ShowingCalendar(shows, fragments=fragments, classifier=classifier)
+
+    buf = StringIO()
+    write_page(buf, cal, shows, weeks=calendar_weeks())
+    updated = write_if_changed(Path("cal.html"), buf.getvalue().encode("utf-8"))
+    fragments.save()
+
+    print(f"=== cal.html {'updated' if updated else 'unchanged'} ({fragments.hits} fragments reused, {fragments.misses} rendered)")
+
+
+def write_calendar_data(shows: dict[Cinema, dict[Day, list[Showing]]], data_dir: str, classifier: Optional[MassMarketClassifier] = None) -> None:
+    from_date, to_date = showing_window()
+
+    buf = StringIO()
+    write_shell(buf, list(shows), data_dir=data_dir, mass_market=classifier is not None)
+    updated = write_if_changed(Path("cal.html"), buf.getvalue().encode("utf-8"))
+    written = write_data(Path(data_dir), shows, from_date=from_date, to_date=to_date, classifier=classifier)
+
+    print(f"=== cal.html {'updated' if updated else 'unchanged'}, {written} data files written to {data_dir}/")
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Build a calendar of movie showings at selected cinemas")
+    parser.add_argument("--serve", action="store_true", help="serve the calendar over HTTP and keep it up to date, instead of writing cal.html once")
+    parser.add_argument("--output", choices=OUTPUT_MODES, help="how to write the calendar, overrides the mode in kinopy.toml (see [kinopy.output])")
+    args = parser.parse_args(argv)
+
+    config = get_config()
+
+    web.configure(**config.http.model_dump())
+
+    store = ShowingStore(CACHE_ROOT.joinpath("showings.sqlite3"))
+
+    mass_market_config = config.mass_market
+    classifier = None
+    if mass_market_config.enabled:
+        classifier = MassMarketClassifier(
+            CACHE_ROOT.joinpath("films.sqlite3"),
+            min_cinemas=mass_market_config.min_cinemas,
+            min_days=mass_market_config.min_days,
+            recent_days=mass_market_config.recent_days,
+        )
+
+    if args.serve:
+        serve(store, classifier=classifier)
+        return
+
+    run = metrics.start_run() if config.metrics.enabled else None
+
+    shows = showings_by_cinema(store=store, classifier=classifier)
+
+    mode = args.output or config.output.mode
+    if mode not in OUTPUT_MODES:
+        raise ValueError(f"Unknown output mode {mode!r}, expected one of: {', '.join(OUTPUT_MODES)}")
+
+    if mode == "data":
+        write_calendar_data(shows, data_dir=config.output.data_dir, classifier=classifier)
+    else:
+        write_calendar_page(shows, classifier=classifier)
+
+    stats = web.cache_stats()
+    print(f"=== HTTP cache: {stats['hits']} hits, {stats['revalidations']} revalidated, {stats['misses']} misses")
+
+    if run is not None:
+        metrics.stop_run()
+        metrics_path = Path(config.metrics.jsonl_path) if config.metrics.jsonl_path else CACHE_ROOT.joinpath("metrics.jsonl")
+        run.write(metrics_path, max_bytes=config.metrics.max_bytes)
+        print(f"=== Metrics (appended to {metrics_path}):")
+        print(run.summary())
 
 
 if __name__ == "__main__":
@@ -1,15 +1,13 @@
 from __future__ import annotations
 
 import os
+from datetime import timedelta
+from functools import cache
 from typing import Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, PydanticBaseSettingsSource, SettingsConfigDict, TomlConfigSettingsSource
 
-from kinopy.provider import (
-    SomervilleTheatreProvider,
-)
-
 
 class KinopyTomlSettingsSource(TomlConfigSettingsSource):
     def __init__(self, settings_cls: type[BaseSettings], toml_file: Optional[os.PathLike] = None):
@@ -26,16 +24,88 @@ class KinopyTomlSettingsSource(TomlConfigSettingsSource):
         super(TomlConfigSettingsSource, self).__init__(settings_cls, self.toml_data)
 
 
-# NOTE:2025-08-17:To add a configuration section for a new provider, import it and follow the example here.
-# The provider settings sections should be Optional in general, a provider is meant to be discarded if it is not configured.
+# NOTE: each [kinopy.provider.<name>] section is kept as-is and validated against the provider's own `Config` when the
+# provider is created, see `KinopySettings.provider_section()`. That way loading the settings doesn't import every
+# provider, only the ones that are used. The keys in PROVIDER_COMMON_KEYS can be given for any provider and are left out
+# of the section its `Config` sees
+PROVIDER_COMMON_KEYS = ("cache_ttl",)
+
+
 class KinopyProviderSettings(BaseSettings):
-    somerville_theatre: Optional[SomervilleTheatreProvider.Config] = None
+    model_config = SettingsConfigDict(extra="allow")
+
+    # names of the providers to retrieve (see kinopy.provider.PROVIDERS), or all of them if not given
+    enabled: Optional[list[str]] = None
+
+
+class KinopyFetchSettings(BaseSettings):
+    # NOTE: when concurrent, every provider is retrieved at once and each one gets a deadline (in seconds) after which its
+    # results are abandoned. Deadlines can be overridden per cinema in `timeouts`
+    concurrent: bool = True
+    timeout: float = 120.0
+    timeouts: dict[str, float] = Field(default_factory=dict)
+
+
+class KinopyHttpSettings(BaseSettings):
+    # NOTE: see kinopy.util.web.ClientConfig
+    pool_connections: int = 10
+    pool_maxsize: int = 10
+    timeout: Optional[float] = 30.0
+    retries: int = 0
+    http2: bool = False
+    cache: bool = True
+    transport: str = "live"
+    recordings: Optional[str] = None
+    rewrite_to: Optional[str] = None
+
+
+class KinopyMetricsSettings(BaseSettings):
+    # NOTE: see kinopy.util.metrics. When enabled, each run's metrics are summarized and appended as JSON lines to
+    # `jsonl_path`, which defaults to metrics.jsonl in the cache directory. Once the file reaches `max_bytes` it is
+    # moved aside to <jsonl_path>.1 (replacing the one before) and a new one is started
+    enabled: bool = False
+    jsonl_path: Optional[str] = None
+    max_bytes: int = 10 * 1024 * 1024
+
+
+class KinopyServerSettings(BaseSettings):
+    # NOTE: see kinopy.server. Each cinema is refreshed every `interval` seconds unless overridden in `intervals`, and a
+    # failed refresh is retried after `retry_interval` seconds
+    host: str = "127.0.0.1"
+    port: int = 8000
+    interval: float = 3600.0
+    intervals: dict[str, float] = Field(default_factory=dict)
+    retry_interval: float = 300.0
+
+
+class KinopyOutputSettings(BaseSettings):
+    # NOTE: with `mode = "page"` every showing is written into cal.html. With `mode = "data"`, cal.html is a small shell
+    # and the showings for each day are written as JSON files in `data_dir`, which cal.js fetches as they come into view.
+    # The calendar covers `days` days starting today
+    mode: str = "page"
+    days: int = 7
+    data_dir: str = "data"
+
+
+class KinopyMassMarketSettings(BaseSettings):
+    # NOTE: see kinopy.datamodel.massmarket. A film counts as a mass-market release when it has shown on at least
+    # `min_days` days at each of `min_cinemas` cinemas, within the last `recent_days` days
+    enabled: bool = True
+    min_cinemas: int = 3
+    min_days: int = 3
+    recent_days: int = 14
 
 
 class KinopySettings(BaseSettings):
     model_config = SettingsConfigDict(toml_file="kinopy.toml")
 
     provider: Optional[KinopyProviderSettings]
+    fetch: KinopyFetchSettings = Field(default_factory=KinopyFetchSettings)
+    http: KinopyHttpSettings = Field(default_factory=KinopyHttpSettings)
+    metrics: KinopyMetricsSettings = Field(default_factory=KinopyMetricsSettings)
+    server: KinopyServerSettings = Field(default_factory=KinopyServerSettings)
+    output: KinopyOutputSettings = Field(default_factory=KinopyOutputSettings)
+    mass_market: KinopyMassMarketSettings = Field(default_factory=KinopyMassMarketSettings)
 
     @classmethod
     def settings_customise_sources(
@@ -48,5 +118,42 @@ class KinopySettings(BaseSettings):
     ) -> tuple[PydanticBaseSettingsSource, ...]:
         return (KinopyTomlSettingsSource(settings_cls),)
 
-
-kinopy_config = KinopySettings()
+    def provider_section(self, name: str) -> Optional[dict]:
+        """
+        The settings in the [kinopy.provider.<name>] section, or None if there isn't one
+        """
+        section = self._provider_settings(name)
+        if section is None:
+            return None
+        return {key: value for key, value in section.items() if key not in PROVIDER_COMMON_KEYS}
+
+    def provider_cache_ttl(self, name: str) -> Optional[timedelta]:
+        """
+        How long the provider's cached showings remain valid (`cache_ttl`, in seconds), or None if it isn't set
+        """
+        ttl = (self._provider_settings(name) or {}).get("cache_ttl")
+        if ttl is None:
+            return None
+        if isinstance(ttl, bool) or not isinstance(ttl, (int, float)) or ttl <= 0:
+            raise ValueError(f"cache_ttl for provider {name!r} must be a positive number of seconds, not {ttl!r}")
+        return timedelta(seconds=ttl)
+
+    def _provider_settings(self, name: str) -> Optional[dict]:
+        if self.provider is None:
+            return None
+        return (self.provider.model_extra or {}).get(name)
+
+
+@cache
+def get_config() -> KinopySettings:
+    """
+    The settings from kinopy.toml (or the file named by $KINOPY_CONFIG), which is read the first time this is called
+    """
+    return KinopySettings()
+
+
+def __getattr__(name):
+    # NOTE: `kinopy_config` used to be built on import, it's still available here but now built on first use
+    if name == "kinopy_config":
+        return get_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,10 +1,14 @@
 from pathlib import Path
 
+from .massmarket import MassMarketClassifier
 from .showingcalendar import ShowingCalendar
-from .showing import Showing
+from .sessions import Session, SessionIndex
+from .showing import Showing, ShowingColumns, fingerprint, fingerprint_by_date
+from .store import ShowingStore
+from .titles import FilmIndex, canonical_title, film_key
 from .types_ import Day, Cinema
 
 
 # TODO: using CWD for this isn't a great idea
+# NOTE: nothing is created here on import, everything that writes under this directory creates what it needs first
 CACHE_ROOT = Path().joinpath("kinopy_cache")
-CACHE_ROOT.mkdir(exist_ok=True, parents=True)
@@ -0,0 +1,194 @@
+"""
+Telling "mass-market" new releases apart from everything else, by how widely and how long they've been showing
+
+Rather than going back over the history of every showing, running counts are kept for each film at each cinema (how
+many days it has shown there, how many sessions, and when it was first and last shown) and are updated as each
+provider's results come in. Each day a film shows at a cinema is kept too, which is what lets the counts be updated
+correctly when the same days are scraped again (as they are every day), or when a showing disappears from a day.
+"""
+from __future__ import annotations
+
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Iterator, Optional
+
+from .showing import Showing
+from .titles import FilmIndex
+from .types_ import Cinema
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS film_day (
+    film TEXT NOT NULL,
+    cinema TEXT NOT NULL,
+    date TEXT NOT NULL,
+    sessions INTEGER NOT NULL,
+    PRIMARY KEY (cinema, date, film)
+);
+
+CREATE TABLE IF NOT EXISTS film_cinema (
+    film TEXT NOT NULL,
+    cinema TEXT NOT NULL,
+    days INTEGER NOT NULL,
+    sessions INTEGER NOT NULL,
+    first_date TEXT NOT NULL,
+    last_date TEXT NOT NULL,
+    PRIMARY KEY (film, cinema)
+);
+CREATE INDEX IF NOT EXISTS film_cinema_last_date ON film_cinema (last_date);
+"""
+
+
+class MassMarketClassifier:
+    """
+    A film is taken to be a mass-market release if it has been showing on at least `min_days` days at each of at least
+    `min_cinemas` cinemas, and was shown at each of them in the last `recent_days` days
+
+    Films are matched up across cinemas by their titles, see `FilmIndex`.
+    """
+    def __init__(self, path: Path, min_cinemas: int = 3, min_days: int = 3, recent_days: int = 14):
+        self.path = path
+        self.min_cinemas = min_cinemas
+        self.min_days = min_days
+        self.recent_days = recent_days
+
+        self._lock = threading.Lock()
+        self._films: Optional[FilmIndex] = None
+        self._mass_market: Optional[tuple[date, frozenset[str]]] = None
+
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # NOTE: see ShowingStore
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+
+    def _film_index(self) -> FilmIndex:
+        # NOTE: seeded with the films already counted, so that a new spelling of one of them is counted with it
+        if self._films is None:
+            with self._connect() as conn:
+                films = [film for (film,) in conn.execute("SELECT DISTINCT film FROM film_cinema ORDER BY film")]
+            self._films = FilmIndex()
+            self._films.add_many(films)
+        return self._films
+
+    def film(self, title: str) -> str:
+        """
+        The key that the film with `title` is counted under
+        """
+        with self._lock:
+            return self._film_index().add(title)
+
+    def record(self, cinema: Cinema, from_date: date, to_date: date, shows: dict[date, list[Showing]]) -> None:
+        """
+        Update the counts with the showings found at `cinema` from `from_date` through `to_date`, which replace any
+        recorded before for those days
+        """
+        with self._lock:
+            films = self._film_index()
+
+            sessions: dict[tuple[str, str], int] = {}
+            for dt, day_shows in shows.items():
+                if from_date <= dt <= to_date:
+                    for show in day_shows:
+                        # NOTE: a showing without showtimes still counts as one session
+                        key = (films.add(show.title), dt.isoformat())
+                        sessions[key] = sessions.get(key, 0) + max(1, len(show.showtimes))
+
+            with self._connect() as conn:
+                before = {
+                    (film, dt): n
+                    for film, dt, n in conn.execute(
+                        "SELECT film, date, sessions FROM film_day WHERE cinema = ? AND date BETWEEN ? AND ?",
+                        (cinema, from_date.isoformat(), to_date.isoformat()),
+                    )
+                }
+
+                # NOTE: only the differences are applied, (film, days added, sessions added, dates added)
+                changes: dict[str, list] = {}
+                removed, updated = [], []
+                for key in before.keys() | sessions.keys():
+                    old, new = before.get(key, 0), sessions.get(key, 0)
+                    if old == new:
+                        continue
+
+                    film, dt = key
+                    change = changes.setdefault(film, [0, 0, []])
+                    change[0] += (new > 0) - (old > 0)
+                    change[1] += new - old
+                    if new:
+                        change[2].append(dt)
+
+                    if new:
+                        updated.append((film, cinema, dt, new))
+                    else:
+                        removed.append((cinema, dt, film))
+
+                conn.executemany("DELETE FROM film_day WHERE cinema = ? AND date = ? AND film = ?", removed)
+                conn.executemany("INSERT OR REPLACE INTO film_day (film, cinema, date, sessions) VALUES (?, ?, ?, ?)", updated)
+
+                # NOTE: when a film only lost days, its first and last dates are left as they were
+                conn.executemany(
+                    """
+                    INSERT INTO film_cinema (film, cinema, days, sessions, first_date, last_date) VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (film, cinema) DO UPDATE SET
+                        days = days + excluded.days,
+                        sessions = sessions + excluded.sessions,
+                        first_date = min(first_date, excluded.first_date),
+                        last_date = max(last_date, excluded.last_date)
+                    """,
+                    (
+                        (film, cinema, days, n_sessions, *((min(dates), max(dates)) if dates else ("9999-12-31", "0001-01-01")))
+                        for film, (days, n_sessions, dates) in changes.items()
+                    ),
+                )
+
+            self._mass_market = None
+
+    def mass_market(self) -> frozenset[str]:
+        """
+        The keys of every film that is currently a mass-market release
+        """
+        today = date.today()
+
+        with self._lock:
+            # NOTE: worked out again whenever the counts change, or the date does
+            if self._mass_market is None or self._mass_market[0] != today:
+                since = today - timedelta(days=self.recent_days)
+                with self._connect() as conn:
+                    rows = conn.execute(
+                        """
+                        SELECT film FROM film_cinema
+                        WHERE days >= ? AND last_date >= ?
+                        GROUP BY film HAVING COUNT(*) >= ?
+                        """,
+                        (self.min_days, since.isoformat(), self.min_cinemas),
+                    )
+                    self._mass_market = (today, frozenset(film for (film,) in rows))
+
+            return self._mass_market[1]
+
+    def is_mass_market(self, showing: Showing) -> bool:
+        return self.film(showing.title) in self.mass_market()
+
+    def counts(self, title: str) -> dict[Cinema, dict]:
+        """
+        The counts for the film with `title` at each cinema it has shown at
+        """
+        film = self.film(title)
+        with self._connect() as conn:
+            rows = conn.execute("SELECT cinema, days, sessions, first_date, last_date FROM film_cinema WHERE film = ? AND days > 0", (film,)).fetchall()
+
+        return {
+            cinema: {"days": days, "sessions": sessions, "first_date": date.fromisoformat(first), "last_date": date.fromisoformat(last)}
+            for cinema, days, sessions, first, last in rows
+        }
@@ -0,0 +1,114 @@
+"""
+Finding sessions by when they start, across every cinema
+
+Each `Showing` only says which day a film is showing, along with the start of each of that day's sessions (for the
+providers that give them). A `SessionIndex` keeps every one of those sessions sorted by start time, overall and for each
+cinema, so that questions like "what starts in the next 3 hours" or "what's the latest show tonight" are answered with a
+binary search rather than by going through every showing.
+"""
+from __future__ import annotations
+
+import heapq
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, NamedTuple, Optional
+
+from .showing import Showing
+from .types_ import Cinema
+
+
+class Session(NamedTuple):
+    start: datetime
+    cinema: Cinema
+    showing: Showing
+
+
+class _Sessions:
+    """
+    Sessions sorted by start time, with the start times kept separately to search through
+    """
+    def __init__(self, sessions: list[Session]):
+        self.sessions = sorted(sessions, key=lambda ses: (ses.start, ses.showing.title))
+        self.starts = [ses.start for ses in self.sessions]
+
+    def between(self, start: datetime, end: datetime) -> list[Session]:
+        return self.sessions[bisect_left(self.starts, start):bisect_left(self.starts, end)]
+
+    def last_before(self, end: datetime) -> Optional[Session]:
+        n = bisect_left(self.starts, end)
+        return self.sessions[n - 1] if n else None
+
+    def first_after(self, start: datetime) -> Optional[Session]:
+        n = bisect_right(self.starts, start)
+        return self.sessions[n] if n < len(self.sessions) else None
+
+
+class SessionIndex:
+    def __init__(self, sessions: Iterable[Session]):
+        sessions = list(sessions)
+
+        by_cinema: dict[Cinema, list[Session]] = {}
+        for ses in sessions:
+            by_cinema.setdefault(ses.cinema, []).append(ses)
+
+        self._all = _Sessions(sessions)
+        self._by_cinema = {cinema: _Sessions(cinema_sessions) for cinema, cinema_sessions in by_cinema.items()}
+
+    @classmethod
+    def from_showings(cls, shows: dict[Cinema, dict[date, list[Showing]]]) -> "SessionIndex":
+        return cls(
+            Session(start, cinema, show)
+            for cinema, shows_by_date in shows.items()
+            for day_shows in shows_by_date.values()
+            for show in day_shows
+            for start in show.showtimes
+        )
+
+    def __len__(self) -> int:
+        return len(self._all.sessions)
+
+    def cinemas(self) -> list[Cinema]:
+        return list(self._by_cinema)
+
+    def _indexes(self, cinemas: Optional[Iterable[Cinema]]) -> list[_Sessions]:
+        if cinemas is None:
+            return [self._all]
+        return [self._by_cinema[cinema] for cinema in cinemas if cinema in self._by_cinema]
+
+    def between(self, start: datetime, end: datetime, cinemas: Optional[Iterable[Cinema]] = None) -> list[Session]:
+        """
+        Every session starting at or after `start` and before `end`, in order of their starts, at any of `cinemas` (or
+        at all of them)
+        """
+        found = [index.between(start, end) for index in self._indexes(cinemas)]
+        if len(found) == 1:
+            return found[0]
+        return list(heapq.merge(*found, key=lambda ses: ses.start))
+
+    def starting_within(self, duration: timedelta, now: Optional[datetime] = None, cinemas: Optional[Iterable[Cinema]] = None) -> list[Session]:
+        """
+        Every session starting in the next `duration`, e.g. `starting_within(timedelta(hours=3))`
+        """
+        now = now or datetime.now()
+        return self.between(now, now + duration, cinemas=cinemas)
+
+    def on(self, day: date, cinemas: Optional[Iterable[Cinema]] = None) -> list[Session]:
+        start = datetime.combine(day, time())
+        return self.between(start, start + timedelta(days=1), cinemas=cinemas)
+
+    def latest(self, day: date, cinemas: Optional[Iterable[Cinema]] = None) -> Optional[Session]:
+        """
+        The last session starting on `day`, e.g. the latest show tonight
+        """
+        start = datetime.combine(day, time())
+        end = start + timedelta(days=1)
+        found = [ses for index in self._indexes(cinemas) if (ses := index.last_before(end)) is not None and ses.start >= start]
+        return max(found, key=lambda ses: ses.start, default=None)
+
+    def next(self, after: Optional[datetime] = None, cinemas: Optional[Iterable[Cinema]] = None) -> Optional[Session]:
+        """
+        The first session starting after `after` (or now)
+        """
+        after = after or datetime.now()
+        found = [ses for index in self._indexes(cinemas) if (ses := index.first_after(after)) is not None]
+        return min(found, key=lambda ses: ses.start, default=None)
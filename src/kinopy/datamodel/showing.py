@@ -1,14 +1,171 @@
+import hashlib
+import json as jsonlib
+import sys
+from array import array
 from dataclasses import dataclass
-from datetime import date, timedelta
-from typing import Optional
+from datetime import date, datetime, timedelta
+from typing import Iterable, Iterator, Optional
 
 
-@dataclass
+# NOTE: slots are only available from Python 3.10
+_DATACLASS_OPTIONS = {"frozen": True}
+if sys.version_info >= (3, 10):
+    _DATACLASS_OPTIONS["slots"] = True
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class Showing:
-    date: str
+    date: date
     title: str
     url: str
 
     # NOTE: optional because I feel like Coolidge is the only one that provides it
     # Is excerpt a good enough name for arbitrary descriptive text? Should I generalize to description?
     excerpt: Optional[str]
+
+    # NOTE: when each session on the day starts (in the cinema's local time), in order. Empty for providers that only
+    # say which days a film is showing
+    showtimes: tuple[datetime, ...] = ()
+
+    def __post_init__(self):
+        # NOTE: the same title and URL show up once per day they're showing, so keep a single copy of each
+        if isinstance(self.date, datetime):
+            object.__setattr__(self, "date", self.date.date())
+        elif isinstance(self.date, str):
+            object.__setattr__(self, "date", date.fromisoformat(self.date))
+        object.__setattr__(self, "title", sys.intern(self.title))
+        object.__setattr__(self, "url", sys.intern(self.url))
+        if self.showtimes:
+            showtimes = (datetime.fromisoformat(t) if isinstance(t, str) else t for t in self.showtimes)
+            object.__setattr__(self, "showtimes", tuple(sorted(showtimes)))
+
+
+def fingerprint(shows: Iterable[Showing]) -> str:
+    """
+    A hash of the content of `shows` (in order), leaving out their dates
+    """
+    content = [(show.title, show.url, show.excerpt) for show in shows]
+    return hashlib.sha256(jsonlib.dumps(content, separators=(",", ":")).encode()).hexdigest()
+
+
+def fingerprint_by_date(shows: dict[date, list[Showing]]) -> str:
+    """
+    A hash of the content of all of `shows`, e.g. one provider's result
+    """
+    content = [(dt.isoformat(), fingerprint(day_shows)) for dt, day_shows in sorted(shows.items()) if day_shows]
+    return hashlib.sha256(jsonlib.dumps(content, separators=(",", ":")).encode()).hexdigest()
+
+
+class ShowingColumns:
+    """
+    A compact collection of showings, stored a column per field
+
+    Dates are kept as ordinals and every string is kept once in a table and referred to by its index, so a long run of
+    showings of the same few films costs a few bytes each. `Showing` objects are only created when they are asked for.
+    """
+    def __init__(self):
+        self._strings: list[Optional[str]] = []
+        self._string_index: dict[Optional[str], int] = {}
+
+        self.dates = array("l")
+        self.titles = array("l")
+        self.urls = array("l")
+        self.excerpts = array("l")
+        # NOTE: each showing's showtimes are kept as a single string, see `_showtimes_str()`
+        self.showtimes = array("l")
+
+    @classmethod
+    def from_showings(cls, shows: Iterable[Showing]) -> "ShowingColumns":
+        cols = cls()
+        cols.extend(shows)
+        return cols
+
+    @classmethod
+    def from_dict(cls, shows: dict[date, list[Showing]]) -> "ShowingColumns":
+        return cls.from_showings(show for day_shows in shows.values() for show in day_shows)
+
+    def _index(self, s: Optional[str]) -> int:
+        idx = self._string_index.get(s)
+        if idx is None:
+            idx = self._string_index[s] = len(self._strings)
+            self._strings.append(s)
+        return idx
+
+    @staticmethod
+    def _showtimes_str(showtimes: tuple[datetime, ...]) -> str:
+        return " ".join(t.isoformat() for t in showtimes)
+
+    @staticmethod
+    def _showtimes(s: Optional[str]) -> tuple[datetime, ...]:
+        return tuple(datetime.fromisoformat(t) for t in s.split()) if s else ()
+
+    def append(self, show: Showing) -> None:
+        self.dates.append(show.date.toordinal())
+        self.titles.append(self._index(show.title))
+        self.urls.append(self._index(show.url))
+        self.excerpts.append(self._index(show.excerpt))
+        self.showtimes.append(self._index(self._showtimes_str(show.showtimes)))
+
+    def extend(self, shows: Iterable[Showing]) -> None:
+        for show in shows:
+            self.append(show)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __getitem__(self, n: int) -> Showing:
+        strings = self._strings
+        return Showing(
+            date=date.fromordinal(self.dates[n]),
+            title=strings[self.titles[n]],
+            url=strings[self.urls[n]],
+            excerpt=strings[self.excerpts[n]],
+            showtimes=self._showtimes(strings[self.showtimes[n]]),
+        )
+
+    def __iter__(self) -> Iterator[Showing]:
+        for n in range(len(self)):
+            yield self[n]
+
+    def by_date(self, from_date: date = date.min, to_date: date = date.max) -> dict[date, list[Showing]]:
+        """
+        The showings on each day from `from_date` through `to_date`, in the order they were added
+        """
+        lo, hi = from_date.toordinal(), to_date.toordinal()
+
+        result = {}
+        for n, ordinal in enumerate(self.dates):
+            if lo <= ordinal <= hi:
+                result.setdefault(date.fromordinal(ordinal), []).append(self[n])
+
+        return result
+
+    def to_json(self) -> dict:
+        return {
+            "strings": self._strings,
+            "date": self.dates.tolist(),
+            "title": self.titles.tolist(),
+            "url": self.urls.tolist(),
+            "excerpt": self.excerpts.tolist(),
+            "showtimes": self.showtimes.tolist(),
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "ShowingColumns":
+        cols = cls()
+        cols._strings = [sys.intern(s) if s is not None else None for s in data["strings"]]
+        cols._string_index = {s: idx for idx, s in enumerate(cols._strings)}
+        cols.dates = array("l", data["date"])
+        cols.titles = array("l", data["title"])
+        cols.urls = array("l", data["url"])
+        cols.excerpts = array("l", data["excerpt"])
+        if "showtimes" in data:
+            cols.showtimes = array("l", data["showtimes"])
+        else:
+            # NOTE: cached before showtimes were kept
+            cols.showtimes = array("l", [cols._index("")]) * len(cols.dates)
+
+        if not (len(cols.dates) == len(cols.titles) == len(cols.urls) == len(cols.excerpts) == len(cols.showtimes)):
+            raise ValueError("Columns have different lengths")
+
+        return cols
@@ -1,103 +1,233 @@
-from calendar import HTMLCalendar
+import hashlib
+from calendar import HTMLCalendar, month_abbr, month_name
+from collections import defaultdict
 from datetime import date, timedelta
-from textwrap import dedent
-from typing import Any, Optional
+from io import StringIO
+from typing import Callable, Optional, Protocol, TextIO, Union
 
 from .types_ import Day, Cinema
-from .showing import Showing
+from .showing import Showing, fingerprint
+from .titles import FilmIndex
+
+
+class Fragments(Protocol):
+    def get(self, key: str, render: Callable[[], str]) -> str:
+        ...
+
+
+class Classifier(Protocol):
+    def is_mass_market(self, showing: Showing) -> bool:
+        ...
 
 
 class ShowingCalendar(HTMLCalendar):
     """
     For generating calendars of showings
+
+    Showings are indexed by date once up front, so rendering touches each showing once no matter how many days or
+    cinemas are on the calendar. The `write_*()` methods write HTML directly to a stream, the `format*()` methods
+    return it as a string.
+
+    If `fragments` is given, the HTML for each cinema's showings on a day is looked up there by a fingerprint of those
+    showings, and only rendered if it isn't found, see `kinopy.util.fragments`. If `classifier` is given, the showings
+    of mass-market releases are marked as such (see `MassMarketClassifier`), so that they can be hidden.
     """
     cssclasses_weekday_head = [cls + "-head" for cls in HTMLCalendar.cssclasses]
 
+    # NOTE: bump this whenever `write_cinema_day()` writes something different, so that kept fragments aren't reused
+    FRAGMENT_VERSION = "2"
+
     Slug = str
 
-    # NOTE: this signature does not allow for multiple days with the same number across month boundaries but I'm not
-    # sure it matters since I'm pretty rapidly orienting around using weeks and weeks do not have this problem
-    def __init__(self, shows: dict[Cinema, dict[date, Showing]]):
+    def __init__(self, shows: dict[Cinema, dict[date, list[Showing]]], fragments: Optional[Fragments] = None, classifier: Optional[Classifier] = None):
         self._shows = shows
+        self._index = self.index(shows)
+        self.title_ids = self.title_index(shows)
+        self._fragments = fragments
+        self.classifier = classifier
         super().__init__()
 
-    def formatday(self, day, weekday) -> str:
+    @staticmethod
+    def index(shows: dict[Cinema, dict[date, list[Showing]]]) -> dict[date, list[tuple[Cinema, list[Showing]]]]:
         """
-        Return a day as a table cell.
+        The showings at each cinema for every date, keeping the order of the cinemas
+        """
+        result = defaultdict(list)
+
+        for cinema, shows_by_date in shows.items():
+            for dt, day_shows in shows_by_date.items():
+                if day_shows:
+                    result[dt].append((cinema, day_shows))
+
+        return result
+
+    @staticmethod
+    def cinema_cssclass(cinema: Cinema) -> str:
+        return cinema.lower().replace(" ", "-")
+
+    @staticmethod
+    def title_id(key: str) -> str:
+        """
+        An identifier for the film with `key` (see `FilmIndex`) that stays the same between runs, usable as a CSS class
+        """
+        return "t-" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+    @classmethod
+    def title_index(cls, shows: dict[Cinema, dict[date, list[Showing]]]) -> dict[str, str]:
+        """
+        The ID (see `title_id()`) of every title on the calendar, titles that are spellings of the same film (see
+        `kinopy.datamodel.titles`) share one
+        """
+        titles = {show.title for shows_by_date in shows.values() for day_shows in shows_by_date.values() for show in day_shows}
+        return {title: cls.title_id(key) for title, key in FilmIndex().add_many(titles).items()}
+
+    @staticmethod
+    def title_filters(title_ids: dict[str, str]) -> dict[str, str]:
+        """
+        A label for each ID in `title_ids`, in order of the labels. A film with several titles is labelled with the
+        first of them.
+        """
+        labels = {}
+        for title in sorted(title_ids, key=str.casefold):
+            labels.setdefault(title_ids[title], title)
+        return labels
+
+    def write_day(self, stream: TextIO, day: date, in_range: bool = True, with_number: bool = False) -> None:
+        """
+        Write a day as a table cell, or an empty one if it isn't `in_range`
+
+        Parameters
+        ----------
+        with_number - if given, the cell starts with the date, for when the header can't say which date each cell is
+        """
+        if not in_range:
+            stream.write(f'<td class="{self.cssclass_noday}">&nbsp;</td>\n')
+            return
+
+        stream.write(f'<td class="{self.cssclasses[day.weekday()]}">\n')
+        if with_number:
+            stream.write(f'<div class="daynum">{month_abbr[day.month]} {day.day}</div>\n')
+
+        for n, (cinema, shows) in enumerate(self._index.get(day, ())):
+            if n:
+                stream.write("<hr/>\n")
+
+            if self._fragments is None:
+                self.write_cinema_day(stream, cinema, shows)
+            else:
+                # NOTE: the classes of the showings depend on what else is on the calendar (and on the classifier), so
+                # they're part of the key too
+                classes = " ".join(self.showing_cssclass(show) for show in shows)
+                key = f"{cinema}:{fingerprint(shows)}:{hashlib.sha1(classes.encode('utf-8')).hexdigest()[:12]}"
+                stream.write(self._fragments.get(key, lambda: self.format_cinema_day(cinema, shows)))
+
+        stream.write("</td>\n")
+
+    def write_cinema_day(self, stream: TextIO, cinema: Cinema, shows: list[Showing]) -> None:
+        """
+        Write the showings at one cinema on a day
+        """
+        # NOTE: each showing is marked with the IDs of its cinema and title, which is what the filters on the page
+        # hide them by, see cal.js
+        cssclass = self.cinema_cssclass(cinema)
+        stream.write(f'<div class="cinema-root {cssclass}" data-cinema="{cssclass}">\n<span>{cinema}</span>\n<ul>\n')
+        for show in shows:
+            stream.write(f'<li class="{self.showing_cssclass(show)}" data-title="{self.title_ids[show.title]}"><a href="{show.url}"><i>{show.title}</i></a></li>\n')
+        stream.write("</ul>\n</div>\n")
+
+    def is_mass_market(self, show: Showing) -> bool:
+        return self.classifier is not None and self.classifier.is_mass_market(show)
+
+    def showing_cssclass(self, show: Showing) -> str:
+        title_id = self.title_ids[show.title]
+        return f"{title_id} mass-market" if self.is_mass_market(show) else title_id
+
+    def format_cinema_day(self, cinema: Cinema, shows: list[Showing]) -> str:
+        buf = StringIO()
+        self.write_cinema_day(buf, cinema, shows)
+        return buf.getvalue()
+
+    def write_dayheads(self, stream: TextIO, days: list[date], with_numbers: bool = True) -> None:
+        stream.write("<thead>\n")
+        for d in days:
+            label = self.cssclasses[d.weekday()].title()
+            if with_numbers:
+                label = f"{label} {d.day}"
+            stream.write(f'<th class="daynum">{label}</th>\n')
+        stream.write("</thead>\n")
+
+    def write_weeks(self, stream: TextIO, starting_day: Optional[date] = None, weeks: int = 1) -> None:
+        """
+        Write a table of `weeks` consecutive weeks, starting on `starting_day`
         """
-        if day == 0:
-            # day outside month
-            return '<td class="%s">&nbsp;</td>' % self.cssclass_noday
-        else:
-            showing_sets = []
-
-            wd = self.cssclasses[weekday]
-            for cinema, shows in self._shows.items():
-                # TODO: stupid hack because the core datamodel uses `date` but this code bodged together from HTMLCalendar
-                # is oriented around integer days. This whole thing probably needs a rewrite to orient around `date` objects,
-                # but for now we'll shim here
-                shows = {dt.day: v for dt,v in shows.items()}
-
-                shows_txt = "\n".join(f'<li><a href="{show.url}"><i>{show.title}</i></a></li>' for show in shows.get(day, []))
-
-                if not shows_txt:
-                    continue
-
-                showing_sets.append(
-                    dedent(
-                        f'''
-                        <div class="cinema-root {cinema.lower().replace(' ', '-')}">
-                            <span>{cinema}</span>
-                            <ul>
-                                {shows_txt}
-                            </ul>
-                        </div>
-                        '''
-                    )
-                )
-
-            cell_txt = "\n<hr/>\n".join(showing_sets)
-
-            result = dedent(
-                f'''
-                <td class="{wd}">
-                    {cell_txt}
-                </td>
-                '''
-            )
-
-            return result
-
-    def formatweek(self, starting_day: Optional[date] = None) -> str:
         if starting_day is None:
             starting_day = date.today()
 
-        MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-        mon_start = MONTHS[starting_day.month - 1]
-        mon_end = MONTHS[(starting_day + timedelta(days=5)).month - 1]
-
-        week = []
-        for n in range(7):
-            d = starting_day + timedelta(days=n)
-            week.append((d.day, d.weekday()))
-
-        daytxt = '\n'.join(f'<th class="daynum">{self.cssclasses[wd].title()} {day}</th>' for (day, wd) in week)
-        cal_table = super().formatweek(week)
-
-        html = dedent(
-            f"""
-            <table>
-                <thead>
-                    <th colspan=7>
-                        <h3>{mon_start} {week[0][0]} - {mon_end} {week[-1][0]}</h3>
-                    </th>
-                </thead>
-                <thead>
-                    {daytxt}
-                </thead>
-                {cal_table}
-            </table>
-            """
+        last_day = starting_day + timedelta(days=7 * weeks - 1)
+
+        stream.write("<table>\n")
+        stream.write(
+            f"<thead>\n<th colspan=7>\n"
+            f"<h3>{month_abbr[starting_day.month]} {starting_day.day} - {month_abbr[last_day.month]} {last_day.day}</h3>\n"
+            f"</th>\n</thead>\n"
         )
+        # NOTE: with a single week, the day numbers go in the header since there's only one of each weekday, otherwise
+        # they go in each day's cell
+        self.write_dayheads(stream, [starting_day + timedelta(days=n) for n in range(7)], with_numbers=(weeks == 1))
+
+        for week in range(weeks):
+            stream.write("<tr>\n")
+            for n in range(7):
+                self.write_day(stream, starting_day + timedelta(days=7 * week + n), with_number=(weeks > 1))
+            stream.write("</tr>\n")
+
+        stream.write("</table>\n")
+
+    def write_week(self, stream: TextIO, starting_day: Optional[date] = None) -> None:
+        self.write_weeks(stream, starting_day=starting_day, weeks=1)
 
-        return html
+    def write_month(self, stream: TextIO, year: int, month: int, withyear: bool = True) -> None:
+        """
+        Write a whole month as a table of weeks, in the usual calendar layout, headed with its name (and year, if
+        `withyear`)
+        """
+        weeks = self.monthdatescalendar(year, month)
+        heading = f"{month_name[month]} {year}" if withyear else month_name[month]
+
+        stream.write("<table>\n")
+        stream.write(f"<thead>\n<th colspan=7>\n<h3>{heading}</h3>\n</th>\n</thead>\n")
+        self.write_dayheads(stream, weeks[0], with_numbers=False)
+
+        for week in weeks:
+            stream.write("<tr>\n")
+            for d in week:
+                self.write_day(stream, d, in_range=(d.month == month), with_number=True)
+            stream.write("</tr>\n")
+
+        stream.write("</table>\n")
+
+    def formatday(self, day: Union[date, int], weekday: int, *, in_range: bool = True, with_number: bool = False) -> str:
+        """
+        Return a day as a table cell.
+
+        NOTE: called as HTMLCalendar's is, but with the date of the day rather than its day of the month. As there, 0 is
+        a day outside of the month, an empty cell. The date's own weekday is used, `weekday` is only there to match
+        """
+        if isinstance(day, int):
+            if day != 0:
+                raise TypeError(f"formatday() needs the date of the day, not the day of the month ({day!r})")
+            return f'<td class="{self.cssclass_noday}">&nbsp;</td>\n'
+
+        buf = StringIO()
+        self.write_day(buf, day, in_range=in_range, with_number=with_number)
+        return buf.getvalue()
+
+    def formatweek(self, starting_day: Optional[date] = None, *, weeks: int = 1) -> str:
+        buf = StringIO()
+        self.write_weeks(buf, starting_day=starting_day, weeks=weeks)
+        return buf.getvalue()
+
+    def formatmonth(self, theyear: int, themonth: int, withyear: bool = True) -> str:
+        buf = StringIO()
+        self.write_month(buf, theyear, themonth, withyear=withyear)
+        return buf.getvalue()
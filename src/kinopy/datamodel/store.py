@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+from collections import defaultdict
+from contextlib import closing, contextmanager
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from .showing import Showing
+from .types_ import Cinema
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scrape_run (
+    id INTEGER PRIMARY KEY,
+    cinema TEXT NOT NULL,
+    from_date TEXT NOT NULL,
+    to_date TEXT NOT NULL,
+    started TEXT NOT NULL,
+    finished TEXT,
+    -- one of: 'ok', 'failed'
+    status TEXT NOT NULL,
+    error TEXT,
+    -- see ShowingStore.fingerprint(), NULL for failed runs
+    fingerprint TEXT
+);
+CREATE INDEX IF NOT EXISTS scrape_run_cinema ON scrape_run (cinema, status, from_date, to_date);
+
+CREATE TABLE IF NOT EXISTS showing (
+    run_id INTEGER NOT NULL REFERENCES scrape_run (id),
+    cinema TEXT NOT NULL,
+    date TEXT NOT NULL,
+    title TEXT NOT NULL,
+    url TEXT NOT NULL,
+    excerpt TEXT,
+    -- ISO 8601 start times separated by spaces, NULL if the provider doesn't give them
+    showtimes TEXT
+);
+CREATE INDEX IF NOT EXISTS showing_cinema_date ON showing (cinema, date);
+CREATE INDEX IF NOT EXISTS showing_date ON showing (date);
+CREATE INDEX IF NOT EXISTS showing_title_date ON showing (title, date);
+CREATE INDEX IF NOT EXISTS showing_run ON showing (run_id);
+"""
+
+# NOTE: the showings for a day are the ones from the most recent successful run that covered that day, so a day a cinema
+# has since dropped everything from is correctly reported as empty
+_LATEST_RUN_FOR_DAY = """
+    SELECT r.id FROM scrape_run r
+    WHERE r.cinema = s.cinema AND r.status = 'ok' AND r.from_date <= s.date AND s.date <= r.to_date
+    ORDER BY r.id DESC
+    LIMIT 1
+"""
+
+
+class ShowingStore:
+    """
+    SQLite database of every scraped showing, along with a record of each scrape that produced them
+    """
+    def __init__(self, path: Path):
+        self.path = path
+
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+            # NOTE: databases from before showtimes were kept, and from before runs were fingerprinted
+            columns = {name for _, name, *_ in conn.execute("PRAGMA table_info(showing)")}
+            if "showtimes" not in columns:
+                conn.execute("ALTER TABLE showing ADD COLUMN showtimes TEXT")
+            columns = {name for _, name, *_ in conn.execute("PRAGMA table_info(scrape_run)")}
+            if "fingerprint" not in columns:
+                conn.execute("ALTER TABLE scrape_run ADD COLUMN fingerprint TEXT")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # NOTE: a connection per operation keeps the store usable from any thread, and WAL mode lets readers proceed
+        # while a scrape is being written
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+
+    @staticmethod
+    def _showing_rows(shows: dict[date, list[Showing]]) -> list[tuple]:
+        return [
+            (dt.isoformat(), show.title, show.url, show.excerpt, " ".join(t.isoformat() for t in show.showtimes) or None)
+            for dt, day_shows in sorted(shows.items()) for show in day_shows
+        ]
+
+    @staticmethod
+    def fingerprint(rows: list[tuple]) -> str:
+        """
+        A digest of everything stored for the showings in `rows` (see `_showing_rows()`)
+        """
+        return hashlib.sha256(json.dumps(rows, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+    def record_run(self, cinema: Cinema, from_date: date, to_date: date, shows: dict[date, list[Showing]], started: Optional[datetime] = None) -> int:
+        """
+        Record a successful scrape of `cinema` covering `from_date` through `to_date` and the showings it found
+
+        If the latest successful run for `cinema` covered the same dates and found exactly the same showings (as it does
+        whenever the result came from the daily showings cache), nothing is recorded and the ID of that run is returned.
+        """
+        started = started or datetime.now()
+        rows = self._showing_rows(shows)
+        fingerprint = self.fingerprint(rows)
+
+        with self._connect() as conn:
+            latest = conn.execute(
+                "SELECT id, from_date, to_date, fingerprint FROM scrape_run WHERE cinema = ? AND status = 'ok' ORDER BY id DESC LIMIT 1",
+                (cinema,),
+            ).fetchone()
+            if latest is not None and latest[1:] == (from_date.isoformat(), to_date.isoformat(), fingerprint):
+                return latest[0]
+
+            cur = conn.execute(
+                "INSERT INTO scrape_run (cinema, from_date, to_date, started, finished, status, fingerprint) VALUES (?, ?, ?, ?, ?, 'ok', ?)",
+                (cinema, from_date.isoformat(), to_date.isoformat(), started.isoformat(), datetime.now().isoformat(), fingerprint),
+            )
+            run_id = cur.lastrowid
+
+            conn.executemany(
+                "INSERT INTO showing (run_id, cinema, date, title, url, excerpt, showtimes) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((run_id, cinema, *row) for row in rows),
+            )
+
+        return run_id
+
+    def record_failure(self, cinema: Cinema, from_date: date, to_date: date, error: Optional[str] = None, started: Optional[datetime] = None) -> int:
+        started = started or datetime.now()
+
+        with self._connect() as conn:
+            cur = conn.execute(
+                "INSERT INTO scrape_run (cinema, from_date, to_date, started, finished, status, error) VALUES (?, ?, ?, ?, ?, 'failed', ?)",
+                (cinema, from_date.isoformat(), to_date.isoformat(), started.isoformat(), datetime.now().isoformat(), error),
+            )
+
+        return cur.lastrowid
+
+    def showings_by_date(self, cinema: Cinema, from_date: date, to_date: date) -> dict[date, list[Showing]]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT s.date, s.title, s.url, s.excerpt, s.showtimes FROM showing s
+                WHERE s.cinema = ? AND s.date BETWEEN ? AND ? AND s.run_id = ({_LATEST_RUN_FOR_DAY})
+                ORDER BY s.date, s.title
+                """,
+                (cinema, from_date.isoformat(), to_date.isoformat()),
+            ).fetchall()
+
+        results = defaultdict(list)
+        for dt, title, url, excerpt, showtimes in rows:
+            dt = date.fromisoformat(dt)
+            results[dt].append(Showing(date=dt, title=title, url=url, excerpt=excerpt, showtimes=tuple(showtimes.split()) if showtimes else ()))
+
+        return dict(results)
+
+    def showings_by_cinema(self, from_date: date, to_date: date, cinemas: Optional[Iterable[Cinema]] = None) -> dict[Cinema, dict[date, list[Showing]]]:
+        if cinemas is None:
+            cinemas = self.cinemas()
+
+        results = {}
+        for cinema in cinemas:
+            if shows := self.showings_by_date(cinema, from_date=from_date, to_date=to_date):
+                results[cinema] = shows
+
+        return results
+
+    def showings_of_title(self, title: str, since: date, until: Optional[date] = None) -> dict[Cinema, list[date]]:
+        """
+        Every day `title` was scraped as showing at each cinema, in the given range
+        """
+        until = until or date.max
+
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT cinema, date FROM showing WHERE title = ? AND date BETWEEN ? AND ? ORDER BY cinema, date",
+                (title, since.isoformat(), until.isoformat()),
+            ).fetchall()
+
+        results = defaultdict(list)
+        for cinema, dt in rows:
+            results[cinema].append(date.fromisoformat(dt))
+
+        return dict(results)
+
+    def cinemas(self) -> list[Cinema]:
+        with self._connect() as conn:
+            return [cinema for (cinema,) in conn.execute("SELECT DISTINCT cinema FROM scrape_run ORDER BY cinema")]
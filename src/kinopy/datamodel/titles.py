@@ -0,0 +1,201 @@
+"""
+Recognizing the same film under the different spellings of its title that each cinema uses
+
+Titles are first canonicalized (see `canonical_title()`), which takes care of most differences: HTML entities, case,
+accents, punctuation, leading articles, and qualifiers like "(1954)", "(4K Restoration)" or "50th Anniversary". Two
+titles with the same canonical form are the same film, and `film_key()` gives a key for it. What's left over (e.g.
+"CatVideoFest" and "Cat-Video-Fest") is matched up by a `FilmIndex`, which finds near-duplicates through the trigrams
+the titles have in common rather than by comparing every pair of titles.
+
+NOTE: dropping the year means that remakes which share a title are taken to be the same film
+"""
+from __future__ import annotations
+
+import html
+import re
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+from typing import Iterable
+
+ARTICLES = ("the", "a", "an")
+
+# NOTE: "(1954)", "[2025]"
+_YEAR = re.compile(r"[(\[]\s*(?:18|19|20)\d\d\s*[)\]]")
+# NOTE: "(4K Restoration)", "(Subtitled)", "(25th Anniversary Edition)"
+_QUALIFIER_WORDS = r"restoration|restored|remaster(?:ed)?|anniversary|subtitled|dubbed|4k|2k|35mm|70mm|edition|re-?release|director'?s cut"
+_PAREN_QUALIFIER = re.compile(rf"[(\[][^)\]]*\b(?:{_QUALIFIER_WORDS})\b[^)\]]*[)\]]", re.IGNORECASE)
+# NOTE: "Jaws - 50th Anniversary", "Shin Godzilla 4K", at the end of a title
+_TRAILING_QUALIFIER = re.compile(r"(?:\s*[-:–—]\s*|\s+)(?:\d+(?:st|nd|rd|th)\s+anniversary(?:\s+edition)?|4k|2k|35mm|70mm)\s*$", re.IGNORECASE)
+_TRAILING_ARTICLE = re.compile(rf",\s*({'|'.join(ARTICLES)})\s*$", re.IGNORECASE)
+_APOSTROPHES = re.compile(r"['’‘`]")
+_NON_WORD = re.compile(r"[\W_]+")
+_DIGITS = re.compile(r"\d+")
+# NOTE: up to xxxix, as a whole word. "i", "v" and "x" are also words, but they only keep two titles apart if just one of
+# them has it
+_ROMAN = re.compile(r"(x{0,3})(ix|iv|v?i{0,3})")
+_ROMAN_VALUES = {"i": 1, "v": 5, "x": 10}
+_NUMBERED_WORDS = {"part", "pt", "vol", "volume", "chapter", "episode", "book"}
+_NUMBER_WORDS = {
+    word: n
+    for n, word in enumerate(
+        "one two three four five six seven eight nine ten eleven twelve thirteen fourteen fifteen sixteen seventeen "
+        "eighteen nineteen twenty".split(),
+        start=1,
+    )
+}
+
+
+@lru_cache(maxsize=8192)
+def canonical_title(title: str) -> str:
+    """
+    `title` with everything that differs between spellings of the same title taken out, e.g.
+    "The 40-Year-Old Virgin: 20th Anniversary" -> "40 year old virgin"
+    """
+    # NOTE: some sources escape twice, e.g. "&amp;#8217;"
+    s = html.unescape(html.unescape(title))
+
+    # NOTE: accents are dropped, so that "Amélie" and "Amelie" are the same
+    s = "".join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))
+
+    previous = None
+    while previous != s:
+        previous = s
+        s = _PAREN_QUALIFIER.sub(" ", s)
+        s = _YEAR.sub(" ", s)
+        s = _TRAILING_QUALIFIER.sub("", s).strip()
+
+    # NOTE: "Outsiders, The" -> "The Outsiders"
+    if m := _TRAILING_ARTICLE.search(s):
+        s = f"{m.group(1)} {s[:m.start()]}"
+
+    s = s.casefold().replace("&", " and ")
+    s = _APOSTROPHES.sub("", s)
+    words = _NON_WORD.sub(" ", s).split()
+
+    if len(words) > 1 and words[0] in ARTICLES:
+        words = words[1:]
+
+    # NOTE: a title that is nothing but punctuation or qualifiers is left as it was, rather than becoming empty
+    return " ".join(words) or title.casefold().strip()
+
+
+def film_key(title: str) -> str:
+    """
+    A key for the film with `title` that is the same for any spelling with the same `canonical_title()`, and that
+    doesn't change between runs
+
+    NOTE: spellings that only a `FilmIndex` matches up get different keys here, look films up through an index instead
+    """
+    return canonical_title(title).replace(" ", "-")
+
+
+def _roman(word: str) -> int | None:
+    if not word or not _ROMAN.fullmatch(word):
+        return None
+
+    total = 0
+    for c, following in zip(word, word[1:] + " "):
+        value = _ROMAN_VALUES[c]
+        total += -value if _ROMAN_VALUES.get(following, 0) > value else value
+    return total
+
+
+def sequel_markers(key: str) -> tuple[int, ...]:
+    """
+    The numbers in the title with `key` (see `film_key()`) that tell the films of a series apart: numerals, Roman
+    numerals, and number words after e.g. "part" or "vol", so "the-godfather-part-ii" -> (2,)
+    """
+    words = key.split("-")
+    # NOTE: numerals are taken from the title without spaces, so that "20,000" and "20000" are the same
+    markers = [int(digits) for digits in _DIGITS.findall("".join(words))]
+
+    for previous, word in zip([""] + words, words):
+        if (n := _roman(word)) is not None:
+            markers.append(n)
+        elif previous in _NUMBERED_WORDS and word in _NUMBER_WORDS:
+            markers.append(_NUMBER_WORDS[word])
+
+    return tuple(sorted(markers))
+
+
+def trigrams(s: str) -> frozenset[str]:
+    # NOTE: padded, so that short words at the start and end still count
+    padded = f"  {s} "
+    return frozenset(padded[n:n + 3] for n in range(len(padded) - 2))
+
+
+class FilmIndex:
+    """
+    Groups titles into films, matching near-duplicates by the similarity of their trigrams
+
+    Each film is known by the `film_key()` of the first of its titles that was added, so adding the same titles in the
+    same order always gives the same keys (`add_many()` sorts them first). Only titles with the same `sequel_markers()`
+    are ever matched, "Toy Story 2" and "Toy Story 3" (or "The Godfather Part II" and "Part III") are different films
+    however similar they are otherwise.
+
+    Parameters
+    ----------
+    threshold - the least Jaccard similarity between the trigrams of two titles for them to be the same film
+    max_postings - trigrams shared by more films than this aren't used to look for matches (they are still counted in
+        the similarity), which keeps each lookup from growing with the number of films
+    """
+    def __init__(self, threshold: float = 0.8, max_postings: int = 64):
+        self.threshold = threshold
+        self.max_postings = max_postings
+
+        self._keys: dict[str, str] = {}
+        self._trigrams: dict[str, frozenset[str]] = {}
+        self._markers: dict[str, tuple[int, ...]] = {}
+        self._postings: dict[str, list[str]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self._trigrams)
+
+    def _match(self, grams: frozenset[str], markers: tuple[int, ...]) -> str | None:
+        shared = defaultdict(int)
+        for gram in grams:
+            postings = self._postings.get(gram, ())
+            if len(postings) <= self.max_postings:
+                for key in postings:
+                    shared[key] += 1
+
+        best, best_score = None, self.threshold
+        for key, count in shared.items():
+            other = self._trigrams[key]
+            score = count / (len(grams) + len(other) - count)
+            if score >= best_score and self._markers[key] == markers:
+                best, best_score = key, score
+
+        return best
+
+    def add(self, title: str) -> str:
+        """
+        The key of the film with `title`, which is added to the index if there isn't one yet
+        """
+        key = film_key(title)
+        # NOTE: compared without spaces, "Cat-Video-Fest" and "CatVideoFest" are the same
+        compact = key.replace("-", "")
+
+        if (known := self._keys.get(compact)) is not None:
+            return known
+
+        grams = trigrams(compact)
+        markers = sequel_markers(key)
+        match = self._match(grams, markers)
+        if match is not None:
+            self._keys[compact] = match
+            return match
+
+        self._keys[compact] = key
+        self._trigrams[key] = grams
+        self._markers[key] = markers
+        for gram in grams:
+            self._postings[gram].append(key)
+        return key
+
+    def add_many(self, titles: Iterable[str]) -> dict[str, str]:
+        """
+        The key of the film for each of `titles`
+        """
+        return {title: self.add(title) for title in sorted(set(titles), key=canonical_title)}
@@ -1,8 +1,46 @@
-from .alamo_drafthouse import AlamoDrafthouseProvider
-from .apple_cinemas import AppleCinemasProvider
-from .brattle import BrattleProvider
-from .coolidge_corner import CoolidgeCornerProvider
-from .harvard_film_archive import HarvardFilmArchiveProvider
-from .landmark_kendall import LandmarkKendallSquareProvider
-from .regent_theatre import RegentTheatreProvider
-from .somerville_theatre import SomervilleTheatreProvider
+"""
+Each provider lives in its own module, which is only imported once the provider is used. Some of them pull in heavy
+dependencies (`lxml`, `curl_cffi`) that a run without them shouldn't pay for.
+
+The provider classes can still be imported from here as usual, e.g. `from kinopy.provider import BrattleProvider`.
+"""
+import importlib
+
+
+# NOTE: the name of each provider, as used in kinopy.toml, and the module and class that implement it. To add a new
+# provider, add it here.
+PROVIDERS: dict[str, tuple[str, str]] = {
+    "alamo_drafthouse": ("alamo_drafthouse", "AlamoDrafthouseProvider"),
+    "apple_cinemas": ("apple_cinemas", "AppleCinemasProvider"),
+    "brattle": ("brattle", "BrattleProvider"),
+    "coolidge_corner": ("coolidge_corner", "CoolidgeCornerProvider"),
+    "harvard_film_archive": ("harvard_film_archive", "HarvardFilmArchiveProvider"),
+    "landmark_kendall": ("landmark_kendall", "LandmarkKendallSquareProvider"),
+    "regent_theatre": ("regent_theatre", "RegentTheatreProvider"),
+    "somerville_theatre": ("somerville_theatre", "SomervilleTheatreProvider"),
+}
+
+__all__ = ["PROVIDERS", "provider_class", *(cls for _, cls in PROVIDERS.values())]
+
+
+def provider_class(name: str) -> type:
+    """
+    The class implementing the provider called `name`, importing its module if need be
+    """
+    try:
+        module, cls = PROVIDERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown provider {name!r}, expected one of: {', '.join(PROVIDERS)}") from None
+
+    return getattr(importlib.import_module(f".{module}", __name__), cls)
+
+
+def __getattr__(attr):
+    for name, (_, cls) in PROVIDERS.items():
+        if cls == attr:
+            return provider_class(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {attr!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
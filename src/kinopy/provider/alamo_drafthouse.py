@@ -3,14 +3,13 @@ from __future__ import annotations
 import json
 from collections import defaultdict
 from datetime import date, datetime
-from typing import Any
+from typing import Any, Collection, Iterable, Optional, Union
 
 from ..datamodel import CACHE_ROOT, Showing
-from ..util import StrEnum, daily_showings_cache, web
+from ..util import StrEnum, daily_showings_cache, json_, metrics, web
 
 
 CACHE = CACHE_ROOT.joinpath("AlamoDrafthouse")
-CACHE.mkdir(exist_ok=True, parents=True)
 
 
 BOSTON = 2901
@@ -20,6 +19,9 @@ class AlamoDrafthouseProvider:
     PRESENTATION_URL_PATT = "https://drafthouse.com/boston/show/{slug}?cinemaId={cinemaId}"
     # can also add sessionId=… to get a specific showing, not that I expect to use it
     SESSION_URL_PATT = "https://drafthouse.com/boston/show/{slug}?cinemaId={cinemaId}&sessionId={sessionId}"
+    # NOTE: the market's schedule may cover other cinemas than these, their sessions are discarded
+    CINEMAS = {str(BOSTON)}
+    SESSION_FIELDS = ("cinemaId", "sessionId", "showTimeClt")
 
     Slug = str
     Session = dict[str, Any]
@@ -28,11 +30,42 @@ class AlamoDrafthouseProvider:
     # TODO: ugh the return types are going to be a bit of a nuisance since different data sources provide different
     # temporal granularity, but maybe mapping-of-mapping is the way to go in general?
     @classmethod
-    def from_json(cls, data: dict) -> dict[date, dict[Slug, list[Showing]]]:
-        presentation_data = {pres["slug"]: pres for pres in data["data"]["presentations"]}
-        sessions_by_date = cls.sessions_by_date(data, presentation_data)
-
-        shows_by_date = defaultdict(lambda: defaultdict(list))
+    @metrics.timed("parse")
+    def from_json(
+        cls,
+        src: Union[bytes, dict],
+        from_date: date = date.min,
+        to_date: date = date.max,
+        cinemas: Optional[Collection[str]] = None,
+        streaming: bool = False,
+    ) -> dict[date, dict[Slug, Showing]]:
+        """
+        Parameters
+        ----------
+        src - the market schedule, either the body of the response or the document decoded from it
+        from_date, to_date - only sessions starting on or between these dates are kept
+        cinemas - if given, only sessions at these cinema IDs are kept
+        streaming - if given, decode `src` (which must be the body of the response) incrementally when it is large enough
+            for that to pay off, only building the sessions that are kept and the presentations they refer to, see
+            `kinopy.util.json_`
+        """
+        # NOTE: the document is gone through twice when streaming, which is only worth it when it really is streamed
+        streaming = streaming and json_.streams(src)
+        if streaming:
+            sessions = json_.items(src, "data.sessions")
+        else:
+            data = json.loads(src) if isinstance(src, bytes) else src
+            sessions = data["data"]["sessions"]
+
+        sessions_by_date = cls.sessions_by_date(sessions, from_date, to_date, cinemas)
+
+        # NOTE: the presentations come before the sessions in the document, so they are gone through again for the
+        # ones that are actually showing
+        showing = {slug for ses_by_pres in sessions_by_date.values() for slug in ses_by_pres}
+        presentations = json_.items(src, "data.presentations") if streaming else data["data"]["presentations"]
+        presentation_data = {pres["slug"]: pres for pres in presentations if pres["slug"] in showing}
+
+        shows_by_date = defaultdict(dict)
 
         for dt, ses_by_pres in sessions_by_date.items():
             for slug, sessions in ses_by_pres.items():
@@ -46,10 +79,11 @@ class AlamoDrafthouseProvider:
                 excerpt = None
 
                 show = Showing(
-                    date=str(dt),
+                    date=dt,
                     title=title,
                     url=url,
                     excerpt=excerpt,
+                    showtimes=tuple(datetime.fromisoformat(ses["showTimeClt"]) for ses in sessions),
                 )
 
                 if slug in shows_by_date[dt]:
@@ -62,37 +96,49 @@ class AlamoDrafthouseProvider:
     @classmethod
     @daily_showings_cache(cachedir=CACHE)
     def showings_by_date(cls, from_date: date, to_date: date) -> dict[date, list[Showing]]:
-        src = cls.showings_json()
-        presentations = cls.from_json(src)
+        src = cls.showings_src()
+        presentations = cls.from_json(src, from_date=from_date, to_date=to_date, cinemas=cls.CINEMAS, streaming=True)
         # NOTE: the sort here gives a nice ordering on the page for presentations showing on multiple days
-        filtered = {dt: sorted((show for slug,show in pres.items()), key=lambda show: show.title) for dt, pres in presentations.items() if from_date <= dt <= to_date}
+        filtered = {dt: sorted((show for slug,show in pres.items()), key=lambda show: show.title) for dt, pres in presentations.items()}
 
         return filtered
 
     @classmethod
-    def sessions_by_date(cls, data: dict, presentation_data: dict) -> dict[date, dict[str, list]]:
+    def sessions_by_date(
+        cls,
+        sessions: Iterable[Session],
+        from_date: date = date.min,
+        to_date: date = date.max,
+        cinemas: Optional[Collection[str]] = None,
+    ) -> dict[date, dict[Slug, list[Session]]]:
         result: dict[date, dict[str, list]] = defaultdict(lambda: defaultdict(list))
 
-        for ses in data["data"]["sessions"]:
+        for ses in sessions:
             slug = ses["presentationSlug"]
             if slug == "private-event":
                 print("Private event detected in Alamo Drafthouse API, discarding")
                 continue
 
-            pres = presentation_data[slug]
+            if cinemas is not None and ses["cinemaId"] not in cinemas:
+                continue
 
             start_time = datetime.fromisoformat(ses["showTimeClt"])
             date = start_time.date()
+            if not from_date <= date <= to_date:
+                continue
 
-            result[date][slug].append(ses)
+            # NOTE: each session has a couple dozen fields, only the ones used for the showings are kept
+            result[date][slug].append({field: ses[field] for field in cls.SESSION_FIELDS})
 
         return result
 
     @classmethod
-    def showings_json(cls) -> dict:
+    def showings_src(cls) -> bytes:
         response = web.get(cls.JSON_URL)
         response.raise_for_status()
 
-        result = response.json()
+        return response.content
 
-        return result
+    @classmethod
+    def showings_json(cls) -> dict:
+        return json.loads(cls.showings_src())
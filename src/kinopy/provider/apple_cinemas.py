@@ -1,18 +1,17 @@
 import json
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta, timezone
 from functools import wraps
 from pathlib import Path
 from typing import Optional
 
-# this curl-impersonate wrapper is necessary to get around TLS fingerprinting
-import curl_cffi
+from pydantic_settings import BaseSettings
 
 from ..datamodel import CACHE_ROOT, Showing
-from ..util import daily_showings_cache
+from ..util import daily_showings_cache, metrics, web
 
 CACHE = CACHE_ROOT.joinpath("AppleCinemas")
-CACHE.mkdir(exist_ok=True, parents=True)
 
 # f604d90 corresponds to companyId, which doesn't seem to vary as far as I can tell
 # 5fe26a5ff118402f4e00c6cc is the locationId for Cambridge
@@ -23,96 +22,125 @@ class AppleCinemasProvider:
     SHOWING_URL_PATTERN = f"https://www.applecinemas.com/{{title_slug}}/{CAMBRIDGE_LOCATION_ID}/{{actualMovieId}}"
     ALL_MOVIES_URL = f"https://www.applecinemas.com/Kiosk/GetAllCompanyLocationMovies/f604d90/{CAMBRIDGE_LOCATION_ID}"
 
+    # NOTE: curl-impersonate is necessary to get around TLS fingerprinting
+    IMPERSONATE = "firefox"
+
     MovieID = str
 
-    @classmethod
+    class Config(BaseSettings):
+        # NOTE: one request is made per movie per day, this many of them are in flight at once
+        max_workers: int = 8
+
+    def __init__(self, kinopy_config: Optional[BaseSettings] = None):
+        section = kinopy_config.provider_section("apple_cinemas") if kinopy_config is not None else None
+        self._config = self.Config(**(section or {}))
+
     @daily_showings_cache(cachedir=CACHE)
-    def showings_by_date(cls, from_date: date, to_date: date) -> dict[date, list[Showing]]:
-        sched = cls.schedule(from_date=from_date, to_date=to_date)
+    def showings_by_date(self, from_date: date, to_date: date) -> dict[date, list[Showing]]:
+        sched = self.schedule(from_date=from_date, to_date=to_date)
 
         results = defaultdict(list)
 
-        seen = set()
+        # NOTE: one showing per movie per day, with every showtime on every screen that day
+        movies = {}
+        showtimes = defaultdict(set)
 
         for movID, showings in sched.items():
             for mov in showings:
                 for scr in mov["screens"]:
                     for st in scr["showTimes"]:
-                        dt = datetime.fromisoformat(st["showTime"]).date()
+                        start = datetime.fromisoformat(st["showTime"])
+                        dt = start.date()
 
-                        if (dt, movID) in seen:
-                            #print(f"Already tracking movie for {dt.isoformat()}: {movID!r}")
-                            continue
+                        movies.setdefault((dt, movID), mov)
+                        showtimes[(dt, movID)].add(start)
 
-                        title = mov["movieDisplayName"]
+        for (dt, movID), mov in movies.items():
+            title = mov["movieDisplayName"]
 
-                        title_slug = title.replace(" ", "-")
-                        url = cls.SHOWING_URL_PATTERN.format(title_slug=title_slug, actualMovieId=mov["actualMovieId"])
+            title_slug = title.replace(" ", "-")
+            url = self.SHOWING_URL_PATTERN.format(title_slug=title_slug, actualMovieId=mov["actualMovieId"])
 
-                        excerpt = None
+            excerpt = None
 
-                        s = Showing(
-                            date=str(dt),
-                            title=title,
-                            url=url,
-                            excerpt=excerpt,
-                        )
+            s = Showing(
+                date=dt,
+                title=title,
+                url=url,
+                excerpt=excerpt,
+                showtimes=tuple(showtimes[(dt, movID)]),
+            )
 
-                        results[dt].append(s)
-                        seen.add((dt, movID))
+            results[dt].append(s)
 
         results = {dt: sorted(shows, key=lambda s: s.title) for dt, shows in results.items() if from_date <= dt <= to_date}
 
         return results
 
-    @classmethod
-    def schedule(cls, from_date: date, to_date: date) -> dict[MovieID, list]:
-        all_movies_response = curl_cffi.get(cls.ALL_MOVIES_URL, impersonate="firefox")
+    def schedule(self, from_date: date, to_date: date) -> dict[MovieID, list]:
+        all_movies_response = web.get(self.ALL_MOVIES_URL, impersonate=self.IMPERSONATE)
         all_movies_response.raise_for_status()
         all_movies_data = all_movies_response.json()
 
-        movies = defaultdict(list)
+        titles = {mov["actualMovieId"]: mov["movieName"] for mov in all_movies_data["schedules"]}  # lol, nice
+        dates = self.query_dates(from_date, to_date)
+        queries = [(actualMovieId, d) for actualMovieId in titles for d in dates]
+
+        print(f"Finding showtimes for {len(titles)} titles over {len(dates)} days")
+
+        def fetch(query: tuple[str, date]) -> Optional[list]:
+            actualMovieId, d = query
+            try:
+                return self.showings_for_movie_on_date(actualMovieId, d)
+            except Exception as exc:
+                print(f"FAILED to retrieve Apple Cinemas showtimes for {titles[actualMovieId]!r} on {d.isoformat()}: {exc}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=self._config.max_workers, thread_name_prefix="kinopy-apple") as executor:
+            responses = list(executor.map(metrics.bind(fetch), queries))
+
+        failures = sum(1 for mov_data in responses if mov_data is None)
+        if failures:
+            print(f"{failures} of {len(queries)} Apple Cinemas showtime requests failed")
 
-        for mov in all_movies_data["schedules"]:
-            actualMovieId = mov["actualMovieId"]  # lol, nice
-            title = mov["movieName"]
+        movies = defaultdict(list)
 
-            print(f"Finding showtimes for title: {title!r}")
-            mov_data = cls.showings_for_movie(actualMovieId, from_date, to_date)
-            movies[actualMovieId].extend(m for m in mov_data if m["locationId"] == cls.CAMBRIDGE_LOCATION_ID)
+        for (actualMovieId, _), mov_data in zip(queries, responses):
+            if mov_data:
+                movies[actualMovieId].extend(m for m in mov_data if m["locationId"] == self.CAMBRIDGE_LOCATION_ID)
 
         return movies
 
-    @classmethod
-    def showings_for_movie(cls, actualMovieId: str, from_date: date, to_date: date) -> list:
+    @staticmethod
+    def query_dates(from_date: date, to_date: date) -> list[date]:
         assert to_date > from_date, "to_date must come after from_date"
 
-        results = []
+        ndays = (to_date - from_date).days
+        return [from_date + timedelta(days=n) for n in range(ndays)]
 
-        retrieval_date = date.today()
+    @classmethod
+    def showings_for_movie_on_date(cls, actualMovieId: str, d: date) -> list:
+        st_str = d.strftime("%Y-%m-%dT00:00:00.000Z")
+        # NOTE: the ending date parameter appears to not matter at all to the remote server, it does not even need to
+        # be after the starting date. We'll set this parameter "right" anyway, as a prayer for that messy API's soul.
+        ed_str = d.strftime("%Y-%m-%dT23:59:59.000Z")
 
-        d = from_date
-        while d < to_date:
-            st_str = d.strftime("%Y-%m-%dT00:00:00.000Z")
-            # NOTE: the ending date parameter appears to not matter at all to the remote server, it does not even need to
-            # be after the starting date. We'll set this parameter "right" anyway, as a prayer for that messy API's soul.
-            ed_str = d.strftime("%Y-%m-%dT23:59:59.000Z")
+        url = cls.MOVIE_URL_PATTERN.format(actualMovieId=actualMovieId, fromTime=st_str, toTime=ed_str)
 
-            url = cls.MOVIE_URL_PATTERN.format(actualMovieId=actualMovieId, fromTime=st_str, toTime=ed_str)
+        movie_response = web.get(url, impersonate=cls.IMPERSONATE)
+        movie_response.raise_for_status()
 
-            try:
-                movie_response = curl_cffi.get(url, impersonate="firefox")
-                movie_response.raise_for_status()
+        mov_data = movie_response.json()
+        for m in mov_data:
+            m["actualMovieId"] = actualMovieId
 
-                mov_data = movie_response.json()
-                for m in mov_data:
-                    m["actualMovieId"] = actualMovieId
-            except Exception:
-                continue
+        return mov_data
 
-            if mov_data:
-                results.extend(mov_data)
+    @classmethod
+    def showings_for_movie(cls, actualMovieId: str, from_date: date, to_date: date) -> list:
+        results = []
 
-            d += timedelta(days=1)
+        for d in cls.query_dates(from_date, to_date):
+            results.extend(cls.showings_for_movie_on_date(actualMovieId, d))
 
         return results
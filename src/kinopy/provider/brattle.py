@@ -2,18 +2,21 @@ import time
 from collections import defaultdict
 from datetime import date
 
-import lxml.html
+from lxml import etree
 
 from ..datamodel import CACHE_ROOT, Showing
-from ..util import daily_showings_cache, web
+from ..util import daily_showings_cache, html_, metrics, web
 
 
 CACHE = CACHE_ROOT.joinpath("Brattle")
-CACHE.mkdir(exist_ok=True, parents=True)
 
 class BrattleProvider:
     QUERY_URL = "https://brattlefilm.org/coming-soon/"
 
+    SHOW_DETAILS = etree.XPath("//div[@class='show-details']")
+    TITLE_LINK = etree.XPath(".//a[@class='title']")
+    SHOW_DATES = etree.XPath(".//div[contains(@class, 'date-selector')]//li/@data-date", smart_strings=False)
+
     @classmethod
     @daily_showings_cache(cachedir=CACHE)
     def showings_by_date(cls, from_date: date, to_date: date) -> dict[date, list[Showing]]:
@@ -27,15 +30,23 @@ class BrattleProvider:
         return result
 
     @classmethod
-    def shows_from_html(cls, html: bytes) -> dict[date, list[Showing]]:
+    @metrics.timed("parse")
+    def shows_from_html(cls, html: bytes, streaming: bool = False) -> dict[date, list[Showing]]:
+        """
+        Parameters
+        ----------
+        streaming - if given, parse the page incrementally instead of building the whole document, see `kinopy.util.html_`
+        """
         results = defaultdict(list)
 
-        doc = lxml.html.fromstring(html)
-        shows = doc.xpath("//div[@class='show-details']")
+        if streaming:
+            shows = html_.iter_elements(html, lambda elem: elem.tag == "div" and elem.get("class") == "show-details")
+        else:
+            shows = cls.SHOW_DETAILS(html_.parse(html))
 
         for shw in shows:
-            [link] = shw.xpath(".//a[@class='title']")
-            title = link.text_content().strip()
+            [link] = cls.TITLE_LINK(shw)
+            title = html_.text_content(link).strip()
             url = link.attrib["href"]
             if "/movies/" not in url:
                 # special case: non-movie events show up on this page too, and while it's cool that they show up here,
@@ -44,16 +55,16 @@ class BrattleProvider:
 
             excerpt = None
 
-            date_children = shw.xpath(".//div[contains(@class, 'date-selector')]//li[@data-date]")
+            timestamps = cls.SHOW_DATES(shw)
 
-            if not date_children:
+            if not timestamps:
                 # special case: some Brattle showings do not have any showtimes listed at all
                 continue
 
-            dates = set(date.fromtimestamp(int(node.attrib["data-date"])) for node in date_children)
+            dates = set(date.fromtimestamp(int(ts)) for ts in timestamps)
             for d in dates:
                 s = Showing(
-                    date=str(d),
+                    date=d,
                     title=title,
                     url=url,
                     excerpt=excerpt,
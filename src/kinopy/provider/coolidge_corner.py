@@ -1,71 +1,93 @@
-import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, timedelta
+from typing import Optional
 
-import lxml.html
+from lxml import etree
+from pydantic_settings import BaseSettings
 
 from ..datamodel import CACHE_ROOT, Showing
-from ..util import daily_showings_cache, web
+from ..util import daily_showings_cache, html_, metrics, web
 
 
 CACHE = CACHE_ROOT.joinpath("CoolidgeCorner")
-CACHE.mkdir(exist_ok=True, parents=True)
 
 
 # TODO:Consider collating "Seminar" events together with their associated film
 # TODO:Scrape event tags, indicate free ones, mark new releases?
 
 class CoolidgeCornerProvider:
+    HOST = "coolidge.org"
     QUERY_PATTERN = "https://coolidge.org/showtimes?date={isoformat}"
 
+    FILM_CARDS = etree.XPath("//div[@class='film-card']")
+    FILM_CARD_LINK = etree.XPath(".//h2/a[@class='film-card__link']")
+    FILM_CARD_EXCERPT = etree.XPath(".//div[@class='film-card__excerpt']")
+
+    class Config(BaseSettings):
+        # NOTE: one page is fetched per day, these limits keep us polite when fetching many days at once
+        requests_per_second: float = 4.0
+        burst: int = 4
+        max_workers: int = 4
+
+    def __init__(self, kinopy_config: Optional[BaseSettings] = None):
+        section = kinopy_config.provider_section("coolidge_corner") if kinopy_config is not None else None
+        self._config = self.Config(**(section or {}))
+
+        web.set_rate_limit(self.HOST, rate=self._config.requests_per_second, burst=self._config.burst)
+
     @classmethod
-    def from_html(cls, date: date, film_card: lxml.html.Element) -> Showing:
-        [link] = film_card.xpath(".//h2/a[@class='film-card__link']")
+    def from_html(cls, date: date, film_card: etree._Element) -> Showing:
+        [link] = cls.FILM_CARD_LINK(film_card)
         rel_url = link.attrib["href"]
         url = f"https://coolidge.org/{rel_url}"
-        title = link.text_content()
+        title = html_.text_content(link)
 
-        [excerpt_tag] = film_card.xpath(".//div[@class='film-card__excerpt']")
-        excerpt = excerpt_tag.text_content()
+        [excerpt_tag] = cls.FILM_CARD_EXCERPT(film_card)
+        excerpt = html_.text_content(excerpt_tag)
 
         return Showing(
-            date=str(date),
+            date=date,
             title=title,
             url=url,
             excerpt=excerpt,
         )
 
     @classmethod
-    def from_showing_page(cls, date: date, page_src: str) -> list[Showing]:
-        html = lxml.html.fromstring(page_src)
-
-        film_cards = html.xpath("//div[@class='film-card']")
+    @metrics.timed("parse")
+    def from_showing_page(cls, date: date, page_src: str, streaming: bool = False) -> list[Showing]:
+        """
+        Parameters
+        ----------
+        streaming - if given, parse the page incrementally instead of building the whole document, see `kinopy.util.html_`
+        """
+        if streaming:
+            film_cards = html_.iter_elements(page_src, lambda elem: elem.tag == "div" and elem.get("class") == "film-card")
+        else:
+            film_cards = cls.FILM_CARDS(html_.parse(page_src))
 
         result = [cls.from_html(date, fc) for fc in film_cards]
         return result
 
-    @classmethod
     @daily_showings_cache(cachedir=CACHE)
-    def showings_by_date(cls, from_date: date, to_date: date) -> dict[date, list[Showing]]:
+    def showings_by_date(self, from_date: date, to_date: date) -> dict[date, list[Showing]]:
         ndays = (to_date - from_date).days
         dates = [from_date + timedelta(days=n) for n in range(ndays+1)]
 
-        return cls.showings_for_dates(dates)
+        return self.showings_for_dates(dates)
 
     @classmethod
-    def showings_for_dates(cls, dates: list[date]) -> dict[date, list[Showing]]:
-        result = {}
-
-        for d in dates:
-            url = cls.QUERY_PATTERN.format(isoformat=d.isoformat())
-            response = web.get(url)
-            response.raise_for_status()
-            src = response.content
-
-            # TODO: more sophisticated rate limiting
-            time.sleep(0.25)
-
-            shows = cls.from_showing_page(date=d, page_src=src)
-            result[d] = shows
+    def showings_for_date(cls, d: date) -> list[Showing]:
+        url = cls.QUERY_PATTERN.format(isoformat=d.isoformat())
+        # NOTE: requests to coolidge.org are rate limited by kinopy.util.web, see __init__()
+        response = web.get(url)
+        response.raise_for_status()
+        src = response.content
+
+        return cls.from_showing_page(date=d, page_src=src)
+
+    def showings_for_dates(self, dates: list[date]) -> dict[date, list[Showing]]:
+        with ThreadPoolExecutor(max_workers=self._config.max_workers, thread_name_prefix="kinopy-coolidge") as executor:
+            result = dict(zip(dates, executor.map(metrics.bind(self.showings_for_date), dates)))
 
         result = {dt: sorted(shows, key=lambda s: s.title) for dt, shows in result.items() if dt in dates}
 
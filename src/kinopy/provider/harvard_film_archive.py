@@ -2,19 +2,23 @@ from collections import defaultdict
 from datetime import date, datetime
 from itertools import chain
 
-import lxml.html
+from lxml import etree
 
 from ..datamodel import CACHE_ROOT, Showing
-from ..util import daily_showings_cache, web
+from ..util import daily_showings_cache, html_, metrics, web
 
 
 CACHE = CACHE_ROOT.joinpath("HarvardFilmArchiveProvider")
-CACHE.mkdir(exist_ok=True, parents=True)
 
 
 class HarvardFilmArchiveProvider:
     CALENDAR_URL_PATTERN = "https://harvardfilmarchive.org/calendar?date_from={date_from}&date_to={date_to}"
 
+    EVENTS = etree.XPath("//div[contains(concat(' ', @class, ' '), ' event ')]")
+    EVENT_TIME = etree.XPath("./div/time")
+    EVENT_TITLE = etree.XPath(".//*[@class='event__title']")
+    EVENT_LINK = etree.XPath(".//a[@class='event__link']")
+
     @classmethod
     @daily_showings_cache(cachedir=CACHE)
     def showings_by_date(cls, from_date: date, to_date: date) -> dict[date, list[Showing]]:
@@ -23,30 +27,49 @@ class HarvardFilmArchiveProvider:
         response = web.get(url)
         response.raise_for_status()
 
+        results = {dt: sorted(shows, key=lambda s: s.title) for dt, shows in cls.shows_from_html(response.content).items() if from_date <= dt <= to_date}
+
+        return results
+
+    @staticmethod
+    def _is_event(elem) -> bool:
+        return elem.tag == "div" and " event " in f" {elem.get('class', '')} "
+
+    @classmethod
+    @metrics.timed("parse")
+    def shows_from_html(cls, html: bytes, streaming: bool = False) -> dict[date, list[Showing]]:
+        """
+        Parameters
+        ----------
+        streaming - if given, parse the page incrementally instead of building the whole document, see `kinopy.util.html_`
+        """
         results = defaultdict(list)
 
-        doc = lxml.html.fromstring(response.content)
-        event_nodes = doc.xpath("//div[contains(concat(' ', @class, ' '), ' event ')]")
+        if streaming:
+            event_nodes = html_.iter_elements(html, cls._is_event)
+        else:
+            event_nodes = cls.EVENTS(html_.parse(html))
+
         for evt in event_nodes:
-            [time_node] = evt.xpath("./div/time")
-            [title_node] = evt.xpath(".//*[@class='event__title']")
-            [link_node] = evt.xpath(".//a[@class='event__link']")
+            [time_node] = cls.EVENT_TIME(evt)
+            [title_node] = cls.EVENT_TITLE(evt)
+            [link_node] = cls.EVENT_LINK(evt)
 
-            dt = datetime.fromisoformat(time_node.attrib["datetime"]).date()
-            title = title_node.text_content()
+            start = datetime.fromisoformat(time_node.attrib["datetime"])
+            dt = start.date()
+            title = html_.text_content(title_node)
             rel_url = link_node.attrib["href"].removeprefix("/")
             url = f"https://harvardfilmarchive.org/{rel_url}"
             excerpt = None
 
             s = Showing(
-                date=str(dt),
+                date=dt,
                 title=title,
                 url=url,
                 excerpt=excerpt,
+                showtimes=(start,),
             )
 
             results[dt].append(s)
 
-        results = {dt: sorted(shows, key=lambda s: s.title) for dt, shows in results.items() if from_date <= dt <= to_date}
-
         return results
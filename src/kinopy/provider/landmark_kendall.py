@@ -1,15 +1,24 @@
 import json
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta
 from functools import cache
 from typing import Iterable, Optional
 
 from ..datamodel import CACHE_ROOT, Showing
-from ..util import daily_showings_cache, web
+from ..util import daily_showings_cache, metrics, urlresolver, web
+from ..util.kvstore import TTLStore
 
 
 CACHE = CACHE_ROOT.joinpath("LandmarkKendallSquare")
-CACHE.mkdir(exist_ok=True, parents=True)
+
+
+@cache
+def details_store() -> TTLStore:
+    """
+    Where the details of each film are kept between runs, see `LandmarkKendallSquareProvider.film_details()`
+    """
+    return TTLStore(CACHE.joinpath("film_details.sqlite3"))
 
 
 class LandmarkKendallSquareProvider:
@@ -19,6 +28,17 @@ class LandmarkKendallSquareProvider:
 
     FilmID = str
 
+    # NOTE: a film's details (title, synopsis) hardly ever change, so they are only requested again after this long
+    DETAILS_TTL = timedelta(days=7)
+    # NOTE: how long a film the API has no details for is remembered as such
+    DETAILS_NEGATIVE_TTL = timedelta(days=1)
+    DETAILS_NAMESPACE = "landmark_film_details"
+    # NOTE: the details of a film run to several KB (cast, images, trailers), only what the showings are made from is kept
+    DETAILS_FIELDS = ("id", "title", "locale")
+    # NOTE: film IDs go in the query string, this many per request keeps its length bounded
+    DETAILS_CHUNK_SIZE = 10
+    DETAILS_MAX_WORKERS = 4
+
     @classmethod
     @daily_showings_cache(cachedir=CACHE)
     def showings_by_date(cls, from_date: date, to_date: date) -> dict[date, list[Showing]]:
@@ -43,27 +63,36 @@ class LandmarkKendallSquareProvider:
         sched = sched_response.json()["X019B"]["schedule"]
 
         film_details = cls.film_details(sched.keys())
+        film_page_urls = cls.film_page_urls({film_id: film["title"] for film_id, film in film_details.items() if film_id in sched})
 
         for film_id, presentations in sched.items():
+            if film_id not in film_details:
+                # NOTE: the BoxOffice API occasionally schedules a film it won't give details for, nothing to show then
+                print(f"No details available for Landmark film ID {film_id!r}, skipping")
+                continue
+
             for d, pres in presentations.items():
+                dt = date.fromisoformat(d)
                 film = film_details[film_id]
                 title = film["title"]
                 excerpt = film["locale"]["synopsis"]
                 url = "https://www.landmarktheatres.com"
                 #url = pres["data"]["ticketing"]["urls"][0]
-                if film_page_url := cls.film_page_url(title, film_id):
+                if film_page_url := film_page_urls[film_id]:
                     url = film_page_url
                 else:
-                    url = pres["data"]["ticketing"][0]["urls"][0]
+                    # NOTE: each date holds a list of showtimes, any of them will get you to the ticketing page
+                    url = pres[0]["data"]["ticketing"][0]["urls"][0]
 
                 show = Showing(
-                    date=str(d),
+                    date=dt,
                     title=title,
                     url=url,
                     excerpt=excerpt,
+                    showtimes=tuple(datetime.fromisoformat(showtime["startsAt"]) for showtime in pres),
                 )
 
-                results[date.fromisoformat(d)].append(show)
+                results[dt].append(show)
 
         results = {dt: sorted(shows, key=lambda s: s.title) for dt, shows in results.items() if from_date <= dt <= to_date}
 
@@ -71,15 +100,71 @@ class LandmarkKendallSquareProvider:
 
     @classmethod
     def film_details(cls, fids: Iterable[FilmID]) -> dict[FilmID, dict]:
+        """
+        The details of each film, for the films the BoxOffice API has details for
+
+        Details are remembered between runs, only the films without unexpired details are requested. Those are
+        requested `DETAILS_CHUNK_SIZE` at a time, with the requests made concurrently.
+        """
+        fids = list(dict.fromkeys(fids))
+
+        # NOTE: details that didn't come from the actual hosts (see `web.is_live()`) aren't mixed in with the ones that did
+        persist = web.is_live()
+
+        known = details_store().get_many(cls.DETAILS_NAMESPACE, fids) if persist else {}
+        # NOTE: sorted, so that the same films are requested with the same URL, see `kinopy.util.httpcache`
+        missing = sorted(fid for fid in fids if fid not in known)
+
+        if missing:
+            chunks = [missing[n:n + cls.DETAILS_CHUNK_SIZE] for n in range(0, len(missing), cls.DETAILS_CHUNK_SIZE)]
+            with ThreadPoolExecutor(max_workers=min(len(chunks), cls.DETAILS_MAX_WORKERS), thread_name_prefix="kinopy-landmark") as executor:
+                futures = [executor.submit(metrics.bind(cls.fetch_film_details), chunk) for chunk in chunks]
+
+            fetched, errors = {}, []
+            for chunk, fut in zip(chunks, futures):
+                try:
+                    details = fut.result()
+                except Exception as exc:
+                    errors.append(exc)
+                    continue
+                fetched.update({fid: details.get(fid) for fid in chunk})
+
+            # NOTE: whatever did arrive is kept even if some requests failed, so that only those are made again
+            if persist:
+                details_store().put_many(cls.DETAILS_NAMESPACE, {fid: film for fid, film in fetched.items() if film is not None}, ttl=cls.DETAILS_TTL)
+                details_store().put_many(cls.DETAILS_NAMESPACE, {fid: None for fid, film in fetched.items() if film is None}, ttl=cls.DETAILS_NEGATIVE_TTL)
+            if errors:
+                raise errors[0]
+
+            known.update(fetched)
+
+        metrics.record("film_details", films=len(fids), cached=len(fids) - len(missing), fetched=len(missing))
+
+        return {fid: known[fid] for fid in fids if known.get(fid) is not None}
+
+    @classmethod
+    def fetch_film_details(cls, fids: list[FilmID]) -> dict[FilmID, dict]:
         id_params = "&".join(f"ids={fid}" for fid in fids)
         details_url = cls.MOVIES_URL + "?basic=false&castingLimit=3&" + id_params
         details_response = web.get(details_url)
         details_response.raise_for_status()
 
-        return {filminfo["id"]: filminfo for filminfo in details_response.json()}
+        return {filminfo["id"]: {field: filminfo[field] for field in cls.DETAILS_FIELDS} for filminfo in details_response.json()}
+
+    @classmethod
+    def film_page_urls(cls, titles: dict[FilmID, str]) -> dict[FilmID, Optional[str]]:
+        """
+        Try to provide a URL to a 'nice' film page for each film, see `film_page_url()`
+
+        The pages are checked all at once, and the results remembered between runs, see `kinopy.util.urlresolver`.
+        """
+        candidates = {
+            film_id: cls.PRODUCTION_URL_PATTERN.format(slug=f"{film_id}-{title.strip().replace(' ', '-')}")
+            for film_id, title in titles.items()
+        }
+        return urlresolver.default_resolver().resolve_many(candidates)
 
     @classmethod
-    @cache
     def film_page_url(cls, title: str, film_id: str) -> Optional[str]:
         """
         Try to provide a URL to a 'nice' film page
@@ -87,15 +172,4 @@ class LandmarkKendallSquareProvider:
         The URL provided by the BoxOffice API goes directly to the ticket purchase page,
         but Landmark provides a film summary page that would be preferable.
         """
-        normed_title = title.strip().replace(" ", "-")
-        slug = f"{film_id}-{normed_title}"
-
-        theatre_url = cls.PRODUCTION_URL_PATTERN.format(slug=slug)
-        response = web.head(theatre_url)
-
-        if response.ok:
-            result = theatre_url
-        else:
-            result = None
-
-        return result
+        return cls.film_page_urls({film_id: title})[film_id]
@@ -1,17 +1,20 @@
+import html
 import json
 import re
+import threading
 from collections import defaultdict
-from datetime import date
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional
 from urllib.parse import unquote
 
 import lxml.html
 
 from ..datamodel import CACHE_ROOT, Showing
-from ..util import daily_showings_cache, web
+from ..util import daily_showings_cache, metrics, web
 
 
 CACHE = CACHE_ROOT.joinpath("RegentTheatre")
-CACHE.mkdir(exist_ok=True, parents=True)
 
 
 class RegentTheatreProvider:
@@ -133,6 +136,20 @@ class RegentTheatreProvider:
         "nonce": None,
     }
 
+    Month = tuple[int, int]
+
+    # NOTE: the nonce and each month of parsed events are shared by every provider in the process (main and the server
+    # create one for each job and each refresh), so later windows in an already-retrieved month cost nothing. Months are
+    # kept for MONTH_TTL, the nonce for the day since that's how often it seems to change
+    MONTH_TTL = timedelta(minutes=30)
+
+    _lock = threading.Lock()
+    _nonce_lock = threading.Lock()
+    _nonce: Optional[tuple[date, str]] = None
+    _months: dict[Month, tuple[datetime, dict[int, dict]]] = {}
+    # NOTE: the months being retrieved, so that a month asked for again in the meantime is only retrieved once
+    _pending: dict[Month, Future] = {}
+
     @classmethod
     def fetch_nonce(cls) -> str:
         response = web.get(cls.SCHEDULE_URL)
@@ -146,20 +163,46 @@ class RegentTheatreProvider:
         return m.group(1).decode()
 
     @classmethod
+    def nonce(cls) -> str:
+        with cls._nonce_lock:
+            today = date.today()
+            if cls._nonce is None or cls._nonce[0] != today:
+                cls._nonce = (today, cls.fetch_nonce())
+
+            return cls._nonce[1]
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        with cls._lock, cls._nonce_lock:
+            cls._nonce = None
+            cls._months.clear()
+
+    @staticmethod
+    def months_between(from_date: date, to_date: date) -> list[Month]:
+        months = []
+
+        year, month = from_date.year, from_date.month
+        while (year, month) <= (to_date.year, to_date.month):
+            months.append((year, month))
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+        return months
+
     @daily_showings_cache(cachedir=CACHE)
-    def showings_by_date(cls, from_date: date, to_date: date) -> dict[date, list[Showing]]:
-        shows = cls.showings_json(from_date=from_date, to_date=to_date)
+    def showings_by_date(self, from_date: date, to_date: date) -> dict[date, list[Showing]]:
+        shows = self.showings_json(from_date=from_date, to_date=to_date)
         results = defaultdict(list)
 
         for event_ID, shw in shows.items():
-            dt = date.fromtimestamp(shw["event_start_unix"])
+            # NOTE: EventON timestamps are the local time as if it were UTC, e.g. a 7:30 PM show is at 19:30Z
+            start = datetime.fromtimestamp(shw["event_start_unix"], timezone.utc).replace(tzinfo=None)
+            dt = start.date()
             if not (from_date <= dt <= to_date):
-                # NOTE:the API seems to serve an entire month at a time with the above query parameters, so we just filter
-                # them here
+                # NOTE:the API serves an entire month at a time, so we just filter them here
                 continue
 
-            # TODO: unescape?
-            title = shw["event_title"]
+            # NOTE: titles come with HTML entities in them, e.g. "It&#8217;s Never Over"
+            title = html.unescape(shw["event_title"])
             # NOTE: There seems to be no good way to link directly to a showing using the JSON data, but maybe it can
             # be scraped out of the HTML contained in the JSON data (yeesh), at least for events that have only one link.
             # Seems that event cards for festivals have multiple links, so the safest thing to do feels like to link to
@@ -168,10 +211,11 @@ class RegentTheatreProvider:
             excerpt = None
 
             s = Showing(
-                date=str(dt),
+                date=dt,
                 title=title,
                 url=url,
                 excerpt=excerpt,
+                showtimes=(start,),
             )
             results[dt].append(s)
 
@@ -179,9 +223,59 @@ class RegentTheatreProvider:
 
         return results
 
+    def showings_json(self, from_date: date, to_date: date) -> dict[int, dict]:
+        """
+        Every movie event in the calendar months spanned by `from_date` and `to_date`
+        """
+        months = self.months_between(from_date, to_date)
+
+        with ThreadPoolExecutor(max_workers=len(months), thread_name_prefix="kinopy-regent") as executor:
+            month_events = list(executor.map(metrics.bind(self.month_showings_json), months))
+
+        result = {}
+        for events in month_events:
+            result.update(events)
+
+        return result
+
     @classmethod
-    def showings_json(cls, from_date: date, to_date: date) -> dict[int, dict]:
-        content = cls.schedule_json(from_date=from_date, to_date=to_date)
+    def month_showings_json(cls, month: Month) -> dict[int, dict]:
+        with cls._lock:
+            now = datetime.now()
+            cached = cls._months.get(month)
+            if cached is not None and cached[0] > now:
+                return cached[1]
+
+            pending = cls._pending.get(month)
+            retrieving = pending is None
+            if retrieving:
+                pending = cls._pending[month] = Future()
+
+        if not retrieving:
+            return pending.result()
+
+        try:
+            year, mon = month
+            events = cls.movies_from_content(cls.schedule_json(year=year, month=mon, nonce=cls.nonce()))
+        except BaseException as exc:
+            with cls._lock:
+                del cls._pending[month]
+            pending.set_exception(exc)
+            raise
+
+        with cls._lock:
+            del cls._pending[month]
+            now = datetime.now()
+            for expired in [m for m, (expires, _) in cls._months.items() if expires <= now]:
+                del cls._months[expired]
+            cls._months[month] = (now + cls.MONTH_TTL, events)
+        pending.set_result(events)
+
+        return events
+
+    @classmethod
+    @metrics.timed("parse")
+    def movies_from_content(cls, content: dict) -> dict[int, dict]:
         result = {shw["event_id"]: shw for shw in content["cals"]["evcal_calendar_685"]["json"]}
 
         # NOTE: [insert heavy sigh here]
@@ -205,15 +299,23 @@ class RegentTheatreProvider:
         return result
 
     @classmethod
-    def schedule_json(cls, from_date: date, to_date: date) -> dict:
+    def schedule_json(cls, year: int, month: int, nonce: str) -> dict:
+        """
+        The EventON calendar data for an entire month
+        """
+        first_day = date(year, month, 1)
+        next_month = (first_day + timedelta(days=31)).replace(day=1)
+        start = datetime.combine(first_day, time())
+        end = datetime.combine(next_month, time()) - timedelta(seconds=1)
+
         url = cls.JSON_URL
         payload = cls.EVENTON_PAYLOAD_PATTERN.copy()
-        payload["cals[evcal_calendar_685][sc][fixed_day]"] = str(from_date.day)
-        payload["cals[evcal_calendar_685][sc][fixed_month]"] = str(from_date.month)
-        payload["cals[evcal_calendar_685][sc][fixed_year]"] = str(from_date.year)
-        payload["cals[evcal_calendar_685][sc][focus_start_date_range]"] = from_date.strftime('%s')
-        payload["cals[evcal_calendar_685][sc][focus_end_date_range]"] = to_date.strftime('%s')
-        payload["nonce"] = cls.fetch_nonce()
+        payload["cals[evcal_calendar_685][sc][fixed_day]"] = str(first_day.day)
+        payload["cals[evcal_calendar_685][sc][fixed_month]"] = str(first_day.month)
+        payload["cals[evcal_calendar_685][sc][fixed_year]"] = str(first_day.year)
+        payload["cals[evcal_calendar_685][sc][focus_start_date_range]"] = str(int(start.timestamp()))
+        payload["cals[evcal_calendar_685][sc][focus_end_date_range]"] = str(int(end.timestamp()))
+        payload["nonce"] = nonce
 
         response = web.post(url, data=payload)
         response.raise_for_status()
@@ -1,18 +1,16 @@
 import json
 from collections import defaultdict
 from datetime import date, datetime
-from functools import cache
-from typing import Optional
+from typing import Iterable, Optional
 
 from pydantic import Field, SecretStr
 from pydantic_settings import BaseSettings
 
 from ..datamodel import CACHE_ROOT, Showing
-from ..util import daily_showings_cache, web
+from ..util import daily_showings_cache, urlresolver, web
 
 
 CACHE = CACHE_ROOT.joinpath("SomervilleTheatre")
-CACHE.mkdir(exist_ok=True, parents=True)
 
 
 class SomervilleTheatreProvider:
@@ -23,10 +21,8 @@ class SomervilleTheatreProvider:
         token: Optional[SecretStr] = Field(default=None, example="<Somerville Theatre Veezi token>")
 
     def __init__(self, kinopy_config: BaseSettings):
-        if kinopy_config.provider is None:
-            raise ValueError("Veezi token not available")
-
-        config = kinopy_config.provider.somerville_theatre
+        section = kinopy_config.provider_section("somerville_theatre")
+        config = self.Config(**section) if section is not None else None
 
         if config is None or config.token is None:
             raise ValueError("Veezi token not available")
@@ -34,7 +30,16 @@ class SomervilleTheatreProvider:
         self._token = config.token
 
     @classmethod
-    @cache
+    def film_page_urls(cls, titles: Iterable[str]) -> dict[str, Optional[str]]:
+        """
+        Try to provide a URL to a 'nice' film page for each title, see `film_page_url()`
+
+        The pages are checked all at once, and the results remembered between runs, see `kinopy.util.urlresolver`.
+        """
+        candidates = {title: cls.PRODUCTION_URL_PATTERN.format(slug=title.strip().replace(" ", "-")) for title in titles}
+        return urlresolver.default_resolver().resolve_many(candidates)
+
+    @classmethod
     def film_page_url(cls, title: str) -> Optional[str]:
         """
         Try to provide a URL to a 'nice' film page
@@ -48,16 +53,7 @@ class SomervilleTheatreProvider:
         to guess the Somerville Theatre URL, but we'll send a HEAD just to be sure and
         fall back on the URL provided by Veezi if necessary
         """
-        slug = title.strip().replace(" ", "-")
-        theatre_url = cls.PRODUCTION_URL_PATTERN.format(slug=slug)
-        response = web.head(theatre_url)
-
-        if response.ok:
-            result = theatre_url
-        else:
-            result = None
-
-        return result
+        return cls.film_page_urls([title])[title]
 
 
     @daily_showings_cache(cachedir=CACHE)
@@ -66,18 +62,27 @@ class SomervilleTheatreProvider:
         data = self.showings_json()
 
         seen = set()
+        first_sessions = []
+        showtimes = defaultdict(list)
 
         for pres in data:
             # NOTE: crude approach, but effective
             film_id = pres["FilmId"]
             title = pres["Title"]
-            dt = datetime.fromisoformat(pres["FeatureStartTime"]).date()
+            start = datetime.fromisoformat(pres["FeatureStartTime"])
+            dt = start.date()
+            showtimes[(dt, film_id)].append(start)
             if (dt, film_id) in seen:
-                print(f"Seen title already, skipping: {title!r}")
                 continue
 
             seen.add((dt, film_id))
-            if film_page_url := self.film_page_url(title):
+            first_sessions.append((dt, pres))
+
+        film_page_urls = self.film_page_urls(pres["Title"] for _, pres in first_sessions)
+
+        for dt, pres in first_sessions:
+            title = pres["Title"]
+            if film_page_url := film_page_urls[title]:
                 url = film_page_url
             else:
                 url = pres["Url"]
@@ -85,10 +90,11 @@ class SomervilleTheatreProvider:
             excerpt = None
 
             show = Showing(
-                date=str(dt),
+                date=dt,
                 title=title,
                 url=url,
                 excerpt=excerpt,
+                showtimes=tuple(showtimes[(dt, pres["FilmId"])]),
             )
 
             result[dt].append(show)
@@ -0,0 +1,321 @@
+"""
+Serving the calendar from memory, while each provider is refreshed in the background
+
+Readers always get the last good listings straight away. Each cinema is refreshed by its own thread on its own
+interval, and a refresh that fails (or hangs) only holds up that cinema: its last good listings keep being served in
+the meantime. The server is started with the listings last recorded in the `ShowingStore`, if there is one, so it has
+something to show before the first refreshes finish.
+
+Routes:
+
+  / - the calendar page, as rendered by the `render` function given to the server
+  /showings.json - the listings for every cinema, by date
+  /sessions.json - the sessions starting in the next few hours, see `CalendarHandler.sessions_json()`
+  /status.json - when each cinema was last refreshed, and how the last attempt went
+  /<name> - each of the `static_files`, by name, e.g. the stylesheet and script for the calendar
+"""
+from __future__ import annotations
+
+import json as jsonlib
+import mimetypes
+import threading
+import time
+from contextlib import nullcontext
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Optional
+from urllib.parse import parse_qs
+
+from .datamodel import Cinema, MassMarketClassifier, Session, SessionIndex, Showing, ShowingStore
+from .util import bypass_showings_cache
+
+
+ShowingsByCinema = dict[Cinema, dict[date, list[Showing]]]
+ShowingsJob = Callable[[], dict[date, list[Showing]]]
+# NOTE: the retrieval job for each cinema, for the given range of dates
+JobFactory = Callable[[date, date], dict[Cinema, ShowingsJob]]
+Window = Callable[[], tuple[date, date]]
+
+
+class ShowingsModel:
+    """
+    The current listings for each cinema, along with how the last attempt to refresh each one went
+    """
+    def __init__(self, cinemas: list[Cinema]):
+        self.cinemas = cinemas
+        self.version = 0
+
+        self._shows: ShowingsByCinema = {}
+        self._status: dict[Cinema, dict] = {cinema: {"last_success": None, "last_attempt": None, "error": None, "next_refresh": None} for cinema in cinemas}
+        self._lock = threading.Lock()
+
+    def update(self, cinema: Cinema, shows: dict[date, list[Showing]], attempted: Optional[datetime] = None) -> None:
+        with self._lock:
+            self._shows[cinema] = shows
+            self._status[cinema].update(last_success=datetime.now(), last_attempt=attempted or datetime.now(), error=None)
+            self.version += 1
+
+    def seed(self, cinema: Cinema, shows: dict[date, list[Showing]]) -> None:
+        """
+        Start out with `shows` for `cinema`, e.g. from a previous run, without counting it as a refresh
+        """
+        with self._lock:
+            self._shows[cinema] = shows
+            self.version += 1
+
+    def failed(self, cinema: Cinema, error: str, attempted: Optional[datetime] = None) -> None:
+        # NOTE: the listings are left alone, so the last good ones keep being served
+        with self._lock:
+            self._status[cinema].update(last_attempt=attempted or datetime.now(), error=error)
+
+    def scheduled(self, cinema: Cinema, next_refresh: datetime) -> None:
+        with self._lock:
+            self._status[cinema]["next_refresh"] = next_refresh
+
+    def snapshot(self) -> tuple[int, ShowingsByCinema]:
+        """
+        The current version of the model and its listings, with cinemas in calendar order
+        """
+        with self._lock:
+            return self.version, {cinema: self._shows[cinema] for cinema in self.cinemas if cinema in self._shows}
+
+    def status(self) -> dict[Cinema, dict]:
+        with self._lock:
+            return {cinema: dict(status) for cinema, status in self._status.items()}
+
+
+class ProviderRefresher(threading.Thread):
+    """
+    Refreshes the listings of one cinema every `interval` seconds, or sooner (after `retry_interval`) if it failed
+
+    Only the first refresh may be answered from the provider's showings cache, after that they always go upstream.
+    """
+    def __init__(self, cinema: Cinema, model: ShowingsModel, jobs: JobFactory, window: Window, interval: float, retry_interval: float, store: Optional[ShowingStore] = None, classifier: Optional[MassMarketClassifier] = None):
+        super().__init__(name=f"kinopy-refresh-{cinema}", daemon=True)
+        self.cinema = cinema
+        self.model = model
+        self.jobs = jobs
+        self.window = window
+        self.interval = interval
+        self.retry_interval = min(retry_interval, interval)
+        self.store = store
+        self.classifier = classifier
+
+        # NOTE: not `_stop`, threading.Thread has a method of that name which join() and is_alive() rely on
+        self._stopping = threading.Event()
+        self._refreshed = False
+
+    def refresh(self) -> bool:
+        from_date, to_date = self.window()
+        attempted = datetime.now()
+
+        try:
+            with bypass_showings_cache() if self._refreshed else nullcontext():
+                shows = self.jobs(from_date, to_date)[self.cinema]()
+        except Exception as exc:
+            print(f"=== FAILED to refresh {self.cinema} listings: {exc}")
+            self.model.failed(self.cinema, error=repr(exc), attempted=attempted)
+            if self.store is not None:
+                self.store.record_failure(self.cinema, from_date=from_date, to_date=to_date, error=repr(exc), started=attempted)
+            return False
+
+        print(f"=== Refreshed {self.cinema} listings ({(datetime.now() - attempted).total_seconds():.1f} s)")
+        self._refreshed = True
+        # NOTE: counted before the model is updated, so that the page rendered for the new version is classified with them
+        if self.classifier is not None:
+            self.classifier.record(self.cinema, from_date=from_date, to_date=to_date, shows=shows)
+        self.model.update(self.cinema, shows, attempted=attempted)
+        if self.store is not None:
+            self.store.record_run(self.cinema, from_date=from_date, to_date=to_date, shows=shows, started=attempted)
+        return True
+
+    def run(self):
+        while not self._stopping.is_set():
+            wait = self.interval if self.refresh() else self.retry_interval
+            self.model.scheduled(self.cinema, datetime.fromtimestamp(time.time() + wait))
+            self._stopping.wait(wait)
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+
+def _json_default(obj):
+    if isinstance(obj, (date, datetime)):
+        return obj.isoformat()
+    raise TypeError(f"Can't serialize {type(obj).__name__}")
+
+
+def session_json(ses: Session) -> dict:
+    return {"start": ses.start.isoformat(), "cinema": ses.cinema, "title": ses.showing.title, "url": ses.showing.url}
+
+
+def showings_json(shows: ShowingsByCinema) -> dict:
+    return {
+        cinema: {
+            dt.isoformat(): [
+                {"title": show.title, "url": show.url, "excerpt": show.excerpt, "showtimes": [t.isoformat() for t in show.showtimes]}
+                for show in day_shows
+            ]
+            for dt, day_shows in sorted(shows_by_date.items())
+        }
+        for cinema, shows_by_date in shows.items()
+    }
+
+
+class CalendarServer(ThreadingHTTPServer):
+    """
+    Parameters
+    ----------
+    address - (host, port) to listen on
+    cinemas - the cinemas to serve, in calendar order
+    jobs - see `JobFactory`
+    window - the range of dates to retrieve listings for, called at every refresh so that it can move with the date
+    render - turns the listings into the calendar page
+    static_files - other files to serve, at /<file name>
+    interval - seconds between refreshes of each cinema, unless overridden in `intervals`
+    retry_interval - seconds to wait before retrying a cinema that failed to refresh
+    store - if given, every refresh is recorded in it, and the server starts with the listings last recorded there
+    classifier - if given, every refresh is counted in it, see `MassMarketClassifier`
+    """
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        cinemas: list[Cinema],
+        jobs: JobFactory,
+        window: Window,
+        render: Callable[[ShowingsByCinema], str],
+        static_files: list[Path],
+        interval: float = 3600.0,
+        intervals: Optional[dict[Cinema, float]] = None,
+        retry_interval: float = 300.0,
+        store: Optional[ShowingStore] = None,
+        classifier: Optional[MassMarketClassifier] = None,
+    ):
+        super().__init__(address, CalendarHandler)
+        self.model = ShowingsModel(cinemas)
+        self.render = render
+        self.static_files = {path.name: path for path in static_files}
+        self.store = store
+
+        if store is not None:
+            from_date, to_date = window()
+            for cinema, shows in store.showings_by_cinema(from_date=from_date, to_date=to_date, cinemas=cinemas).items():
+                self.model.seed(cinema, shows)
+
+        intervals = intervals or {}
+        self.refreshers = [
+            ProviderRefresher(cinema, self.model, jobs=jobs, window=window, interval=intervals.get(cinema, interval), retry_interval=retry_interval, store=store, classifier=classifier)
+            for cinema in cinemas
+        ]
+
+        self._page: tuple[int, bytes] = (-1, b"")
+        self._page_lock = threading.Lock()
+        self._sessions: tuple[int, SessionIndex] = (-1, SessionIndex([]))
+        self._sessions_lock = threading.Lock()
+
+    def start_refreshing(self) -> None:
+        for refresher in self.refreshers:
+            refresher.start()
+
+    def stop_refreshing(self, timeout: float = 10.0) -> None:
+        """
+        Stop every refresher, waiting up to `timeout` seconds in all for them to finish
+
+        A refresher in the middle of a refresh finishes it first, one that takes longer than that is left to finish on its
+        own (they are daemon threads, so they don't keep the process alive).
+        """
+        for refresher in self.refreshers:
+            refresher.stop()
+
+        deadline = time.monotonic() + timeout
+        for refresher in self.refreshers:
+            if refresher.is_alive():
+                refresher.join(max(0.0, deadline - time.monotonic()))
+
+    def page(self) -> bytes:
+        """
+        The rendered calendar, which is only rendered again when the listings have changed
+        """
+        with self._page_lock:
+            version, shows = self.model.snapshot()
+            if self._page[0] != version:
+                self._page = (version, self.render(shows).encode("utf-8"))
+            return self._page[1]
+
+    def sessions(self) -> SessionIndex:
+        """
+        Every session of the current listings, which is only indexed again when the listings have changed
+        """
+        with self._sessions_lock:
+            version, shows = self.model.snapshot()
+            if self._sessions[0] != version:
+                self._sessions = (version, SessionIndex.from_showings(shows))
+            return self._sessions[1]
+
+    def static_file(self, name: str) -> Optional[Path]:
+        # NOTE: only the files that were asked for, the directory they're in may well hold kinopy.toml
+        return self.static_files.get(name)
+
+
+class CalendarHandler(BaseHTTPRequestHandler):
+    server: CalendarServer
+
+    def send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def send_json(self, data) -> None:
+        self.send(200, jsonlib.dumps(data, default=_json_default).encode("utf-8"), "application/json")
+
+    def sessions_json(self, query: dict[str, list[str]]):
+        """
+        Query parameters
+        ----------------
+        from - sessions starting from this time (ISO 8601), or from now
+        hours - sessions starting within this many hours of `from`, 3 by default
+        latest - instead, only the last session starting on this date (ISO 8601)
+        cinema - only sessions at this cinema, can be given more than once
+        """
+        index = self.server.sessions()
+        cinemas = query.get("cinema")
+
+        if "latest" in query:
+            ses = index.latest(date.fromisoformat(query["latest"][0]), cinemas=cinemas)
+            return session_json(ses) if ses is not None else None
+
+        start = datetime.fromisoformat(query["from"][0]) if "from" in query else datetime.now()
+        hours = float(query.get("hours", ["3"])[0])
+        return [session_json(ses) for ses in index.between(start, start + timedelta(hours=hours), cinemas=cinemas)]
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+
+        if path in ("/", "/cal.html"):
+            self.send(200, self.server.page(), "text/html; charset=utf-8")
+        elif path == "/showings.json":
+            _, shows = self.server.model.snapshot()
+            self.send_json(showings_json(shows))
+        elif path == "/sessions.json":
+            try:
+                data = self.sessions_json(parse_qs(query))
+            except ValueError as exc:
+                self.send(400, str(exc).encode("utf-8"), "text/plain")
+                return
+            self.send_json(data)
+        elif path == "/status.json":
+            self.send_json(self.server.model.status())
+        elif static := self.server.static_file(path.lstrip("/")):
+            content_type = mimetypes.guess_type(static.name)[0] or "application/octet-stream"
+            self.send(200, static.read_bytes(), content_type)
+        else:
+            self.send(404, b"not found", "text/plain")
+
+    do_HEAD = do_GET
@@ -1,3 +1,24 @@
-from . import web
+"""
+The submodules that pull in heavy dependencies (`lxml` for `html_`, `requests` for `web` once it sends anything) are
+only imported once they're used, the same as the providers, see `kinopy.provider`. They can still be imported from here
+as usual, e.g. `from kinopy.util import web`.
+"""
+import importlib
+
 from .enum_ import StrEnum
-from .cache import daily_showings_cache
+from .cache import bypass_showings_cache, daily_showings_cache
+
+
+_SUBMODULES = ("fragments", "html_", "json_", "metrics", "web")
+
+__all__ = ["StrEnum", "bypass_showings_cache", "daily_showings_cache", *_SUBMODULES]
+
+
+def __getattr__(attr):
+    if attr in _SUBMODULES:
+        return importlib.import_module(f".{attr}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {attr!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,50 +1,171 @@
-import dataclasses
+import inspect
 import json as jsonlib
-from datetime import date
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime, time, timedelta
 from functools import wraps
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 
-from ..datamodel import Showing
+from ..datamodel import Showing, ShowingColumns
+from . import metrics
+from .files import atomic_write
 
 
-def _json_cache_filename(cachedir: Path, prefix: Optional[str] = None, dt: Optional[date] = None) -> Path:
-    if dt is None:
-        dt = date.today()
+_RANGE_PATTERN = re.compile(r"(\d{4}-\d{2}-\d{2})_(\d{4}-\d{2}-\d{2})\.json")
+_BYPASS: ContextVar[bool] = ContextVar("kinopy_bypass_showings_cache", default=False)
+_TTL: ContextVar[Optional[timedelta]] = ContextVar("kinopy_showings_cache_ttl", default=None)
+
+
+@contextmanager
+def bypass_showings_cache() -> Iterator[None]:
+    """
+    Skip looking up cached showings inside the block, the results are still cached for later
+    """
+    token = _BYPASS.set(True)
+    try:
+        yield
+    finally:
+        _BYPASS.reset(token)
+
+
+@contextmanager
+def showings_cache_ttl(ttl: timedelta) -> Iterator[None]:
+    """
+    Cache the results of the showings functions called inside the block for `ttl`, instead of the TTL they were given
+    """
+    token = _TTL.set(ttl)
+    try:
+        yield
+    finally:
+        _TTL.reset(token)
+
+
+def _json_cache_filename(cachedir: Path, from_date: date, to_date: date, prefix: Optional[str] = None) -> Path:
     prefix = (prefix + "_") if prefix else ""
-    fn = cachedir.joinpath(f"{prefix}{dt.isoformat()}.json")
+    fn = cachedir.joinpath(f"{prefix}{from_date.isoformat()}_{to_date.isoformat()}.json")
     return fn
 
 
-def daily_showings_cache(*, cachedir: Path, prefix: Optional[str] = None):
+def _cached_ranges(cachedir: Path, prefix: Optional[str] = None) -> dict[Path, tuple[date, date]]:
+    prefix = (prefix + "_") if prefix else ""
+
+    ranges = {}
+    for fn in cachedir.glob(f"{prefix}*.json"):
+        m = _RANGE_PATTERN.fullmatch(fn.name[len(prefix):])
+        if m:
+            ranges[fn] = (date.fromisoformat(m.group(1)), date.fromisoformat(m.group(2)))
+
+    return ranges
+
+
+def _expiry(ttl: Optional[timedelta]) -> datetime:
+    now = datetime.now()
+    if ttl is None:
+        return datetime.combine(now.date() + timedelta(days=1), time())
+    return now + ttl
+
+
+def _prune(ranges: dict[Path, tuple[date, date]], written: Path) -> None:
+    """
+    Delete the cache files in `ranges` that have expired, or are covered by the newer one just `written`
     """
-    Cache the results of the wrapped showings-by-date function on a daily basis.
-    Subsequent calls on the same day will return the same value.
+    start, stop = ranges[written]
+    now = datetime.now()
+
+    for fn, (fn_start, fn_stop) in ranges.items():
+        if fn == written:
+            continue
+
+        if not (start <= fn_start and fn_stop <= stop):
+            try:
+                if now < datetime.fromisoformat(jsonlib.loads(fn.read_text())["expires"]):
+                    continue
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+
+        fn.unlink(missing_ok=True)
+
+
+def _read_entry(fn: Path) -> Optional[ShowingColumns]:
+    """
+    Read a cache file, or return None if it is unreadable or expired
+    """
+    try:
+        entry = jsonlib.loads(fn.read_text())
+        if datetime.now() >= datetime.fromisoformat(entry["expires"]):
+            return None
+        return ShowingColumns.from_json(entry["columns"])
+    except (OSError, ValueError, KeyError, TypeError):
+        # NOTE: a damaged cache file is treated the same as a missing one, and will be replaced. So is one written before
+        # showings were stored as columns
+        return None
+
+
+def daily_showings_cache(*, cachedir: Path, prefix: Optional[str] = None, ttl: Optional[timedelta] = None):
+    """
+    Cache the results of the wrapped showings-by-date function, keyed on its `from_date` and `to_date` arguments.
+
+    A call for a range that lies inside of a cached range is answered from the cached result without calling the
+    function. Cached results expire after `ttl`, or at the end of the day they were retrieved on if no TTL is given. The
+    TTL can be overridden with `showings_cache_ttl()`, which is how the `cache_ttl` of each provider's settings is
+    applied.
+
+    Whenever a result is cached, the files that have expired or are covered by the new one are deleted, so that the
+    cache directory doesn't keep growing.
 
     Parameters
     ----------
-    json - if given, the results of the function and cache files are treated as JSON when (de)serializing
+    cachedir - directory the cache files are written to
+    prefix - if given, prepended to the names of the cache files
+    ttl - if given, how long a cached result remains valid
     """
     def deco(func):
+        sig = inspect.signature(func)
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            fn = _json_cache_filename(cachedir=cachedir, prefix=prefix)
+            bound = sig.bind(*args, **kwargs)
+            from_date, to_date = bound.arguments["from_date"], bound.arguments["to_date"]
+
+            with metrics.timed("showings_cache", cache=cachedir.name, prefix=prefix) as m:
+                m["hit"] = False
+
+                if _BYPASS.get():
+                    ranges = {}
+                else:
+                    ranges = _cached_ranges(cachedir=cachedir, prefix=prefix)
+
+                # NOTE: prefer the narrowest cached range that covers the request, it's the cheapest to read
+                covering = sorted(
+                    (fn for fn, (start, stop) in ranges.items() if start <= from_date and to_date <= stop),
+                    key=lambda fn: ranges[fn][1] - ranges[fn][0],
+                )
+                for fn in covering:
+                    cached = _read_entry(fn)
+                    if cached is not None:
+                        m["hit"] = True
+                        return cached.by_date(from_date, to_date)
+
+            result = func(*args, **kwargs)
 
-            if fn.exists():
-                result_serialized = jsonlib.loads(fn.read_text())
-                result = {date.fromisoformat(dt_txt): [Showing(**shw) for shw in shows] for dt_txt, shows in result_serialized.items()}
-            else:
-                result = func(*args, **kwargs)
-                result_serialized = {dt.isoformat(): [dataclasses.asdict(shw) for shw in shows] for dt, shows in result.items()}
-                fn.write_text(jsonlib.dumps(result_serialized))
+            entry = {
+                "expires": _expiry(_TTL.get() or ttl).isoformat(),
+                "columns": ShowingColumns.from_dict(result).to_json(),
+            }
+            cachedir.mkdir(exist_ok=True, parents=True)
+            fn = _json_cache_filename(cachedir=cachedir, from_date=from_date, to_date=to_date, prefix=prefix)
+            atomic_write(fn, jsonlib.dumps(entry).encode())
+            _prune(_cached_ranges(cachedir=cachedir, prefix=prefix), written=fn)
 
             return result
 
-        def clear_cache(dt: Optional[date] = None):
-            fn = _json_cache_filename(cachedir=cachedir, prefix=prefix, dt=dt)
-            fn.unlink(missing_ok=True)
+        def clear_cache():
+            for fn in _cached_ranges(cachedir=cachedir, prefix=prefix):
+                fn.unlink(missing_ok=True)
 
-        func.clear_cache = clear_cache
+        wrapper.clear_cache = clear_cache
 
         return wrapper
 
@@ -0,0 +1,63 @@
+import os
+import stat
+import tempfile
+from functools import cache
+from pathlib import Path
+
+
+@cache
+def _umask() -> int:
+    # NOTE: os.umask() can only be read by setting it, which would briefly change it for every other thread too, so
+    # Linux's record of it is used where there is one
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except OSError:
+        pass
+
+    mask = os.umask(0o022)
+    os.umask(mask)
+    return mask
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    """
+    Write `data` to `path` through a temporary file in the same directory, so that readers (including other processes)
+    only ever see the old contents or the complete new contents.
+
+    The file keeps the permissions of the one it replaces, or gets the ones a new file would (following the umask).
+    """
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+
+        # NOTE: mkstemp() creates the file readable by its owner only, which os.replace() would carry over
+        try:
+            mode = stat.S_IMODE(path.stat().st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~_umask()
+        os.chmod(tmp, mode)
+
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def write_if_changed(path: Path, data: bytes) -> bool:
+    """
+    Like `atomic_write()`, but leave `path` untouched (modification time included) if it already holds `data`
+
+    Returns whether `path` was written.
+    """
+    try:
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+
+    atomic_write(path, data)
+    return True
@@ -0,0 +1,85 @@
+"""
+Keeping rendered pieces of the calendar between runs, so that only what changed has to be rendered again
+
+Fragments are kept by a key that includes a fingerprint of what they were rendered from (see
+`kinopy.datamodel.fingerprint`), so a fragment that is found is always current. Fragments that weren't asked for during
+a run are dropped when the cache is saved.
+"""
+from __future__ import annotations
+
+import json as jsonlib
+from pathlib import Path
+from typing import Callable
+
+from .files import atomic_write
+
+
+class FragmentCache:
+    """
+    Parameters
+    ----------
+    path - JSON file the fragments are kept in
+    version - fragments kept under any other version are ignored, change it whenever the markup of a fragment changes
+    """
+    def __init__(self, path: Path, version: str = ""):
+        self.path = path
+        self.version = version
+
+        self._fragments: dict[str, str] = {}
+        self._fingerprints: dict[str, str] = {}
+        self._used: dict[str, str] = {}
+        self._dirty = False
+
+        self.hits = 0
+        self.misses = 0
+
+        try:
+            data = jsonlib.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = {}
+
+        if data.get("version") == version:
+            self._fragments = data.get("fragments", {})
+            self._fingerprints = data.get("fingerprints", {})
+
+    def get(self, key: str, render: Callable[[], str]) -> str:
+        """
+        The fragment kept for `key`, or the result of `render()` if there isn't one
+        """
+        fragment = self._used.get(key)
+        if fragment is not None:
+            return fragment
+
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            fragment = render()
+            self.misses += 1
+            self._dirty = True
+        else:
+            self.hits += 1
+
+        self._used[key] = fragment
+        return fragment
+
+    def changed_since_last_run(self, fingerprints: dict[str, str]) -> list[str]:
+        """
+        Which of `fingerprints` (e.g. one per cinema) differ from the last time they were given, and remember them
+        """
+        changed = [name for name, fp in fingerprints.items() if self._fingerprints.get(name) != fp]
+        if changed or fingerprints.keys() != self._fingerprints.keys():
+            self._fingerprints = dict(fingerprints)
+            self._dirty = True
+        return changed
+
+    def save(self) -> bool:
+        """
+        Write out the fragments used during this run, if anything changed, returning whether it did
+        """
+        if not self._dirty and self._used.keys() == self._fragments.keys():
+            return False
+
+        self._fragments = dict(self._used)
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        atomic_write(self.path, jsonlib.dumps({"version": self.version, "fingerprints": self._fingerprints, "fragments": self._fragments}).encode("utf-8"))
+        self._dirty = False
+        return True
@@ -0,0 +1,54 @@
+"""
+Helpers for extracting data from large HTML pages with as little work as possible
+
+Providers compile their XPath expressions once (as `lxml.etree.XPath` objects) and evaluate them against either a full
+document from `parse()`, or against the matching elements produced by `iter_elements()`. The latter never holds more
+than one matching subtree in memory, which keeps peak memory flat for large pages at a modest cost in speed.
+"""
+from io import BytesIO
+from typing import Callable, Iterator, Union
+
+from lxml import etree
+
+
+# NOTE: equivalent to lxml.html's text_content(), but usable on any element
+text_content = etree.XPath("string()", smart_strings=False)
+
+
+def _as_bytes(src: Union[str, bytes]) -> bytes:
+    return src.encode() if isinstance(src, str) else src
+
+
+def parse(src: Union[str, bytes]) -> etree._Element:
+    # NOTE: etree.HTML() uses lxml's default HTML parser, which is thread-local and so safe to use from worker threads
+    return etree.HTML(_as_bytes(src))
+
+
+def iter_elements(src: Union[str, bytes], match: Callable[[etree._Element], bool]) -> Iterator[etree._Element]:
+    """
+    Incrementally parse an HTML document, yielding each complete element that `match` accepts
+
+    `match` is called when an element starts, so it can only examine the element's tag and attributes. Everything
+    outside of the matching elements is discarded as soon as it is parsed, and each matching element is discarded once
+    the consumer moves on from it.
+    """
+    open_matches = []
+
+    for event, elem in etree.iterparse(BytesIO(_as_bytes(src)), events=("start", "end"), html=True):
+        if event == "start":
+            if match(elem):
+                open_matches.append(elem)
+            continue
+
+        if open_matches and open_matches[-1] is elem:
+            open_matches.pop()
+            if not open_matches:
+                yield elem
+
+        if not open_matches:
+            # NOTE: the children of this element and its preceding siblings have already been handled, drop them
+            elem.clear()
+            parent = elem.getparent()
+            if parent is not None:
+                while elem.getprevious() is not None:
+                    del parent[0]
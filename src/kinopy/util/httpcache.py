@@ -0,0 +1,216 @@
+"""
+On-disk cache of HTTP responses
+
+Responses are stored along with their validators (`ETag`, `Last-Modified`) so that a stale entry can be revalidated with
+a conditional request. An unchanged upstream then only costs a `304 Not Modified` instead of the full body. Freshness
+follows the `Cache-Control` (`max-age`, `no-cache`, `no-store`) and `Expires` response headers.
+
+One response is kept per method and URL. When it has a `Vary` header, the values of the request headers it names are
+kept with it and it is only used for requests that send the same values. Responses with `Vary: *` aren't kept.
+"""
+from __future__ import annotations
+
+import hashlib
+import json as jsonlib
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+from .files import atomic_write
+
+if TYPE_CHECKING:
+    import requests
+
+
+_TRANSFER_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+def _cache_control(headers) -> dict[str, Optional[str]]:
+    directives = {}
+    for directive in headers.get("cache-control", "").split(","):
+        name, _, value = directive.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+def _expiry(headers, now: float) -> float:
+    """
+    When a response with these (lowercased) headers stops being fresh, as a UNIX timestamp
+    """
+    cc = _cache_control(headers)
+    if "no-cache" in cc or "no-store" in cc:
+        return now
+
+    if max_age := cc.get("max-age"):
+        try:
+            return now + int(max_age)
+        except ValueError:
+            return now
+
+    if expires := headers.get("expires"):
+        try:
+            return parsedate_to_datetime(expires).timestamp()
+        except (TypeError, ValueError):
+            return now
+
+    return now
+
+
+def _vary(headers) -> list[str]:
+    """
+    The (lowercased) names of the request headers listed in the `Vary` header of a response with these headers
+    """
+    return [name.strip().lower() for name in headers.get("vary", "").split(",") if name.strip()]
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    status_code: int
+    headers: dict[str, str]
+    expires: float
+    body: bytes
+    # NOTE: the request headers named by the response's `Vary` header, and the values they were sent with
+    vary: dict[str, Optional[str]] = field(default_factory=dict)
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires
+
+    def matches(self, request_headers: dict[str, str]) -> bool:
+        """
+        Whether this response can be used for a request with these (lowercased) headers
+        """
+        return all(request_headers.get(name) == value for name, value in self.vary.items())
+
+    def conditional_headers(self) -> dict[str, str]:
+        headers = {}
+        if etag := self.headers.get("etag"):
+            headers["If-None-Match"] = etag
+        if last_modified := self.headers.get("last-modified"):
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def response(self) -> requests.Response:
+        import requests
+        from requests.structures import CaseInsensitiveDict
+
+        response = requests.Response()
+        response.status_code = self.status_code
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.url = self.url
+        response.reason = "OK"
+        response._content = self.body
+        return response
+
+
+class HTTPCache:
+    def __init__(self, cachedir: Path):
+        self.cachedir = cachedir
+        self._stats = Counter()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(method: str, url: str, impersonate: Optional[str] = None) -> str:
+        # NOTE: a site may well answer a browser differently, so impersonated requests get their own entries
+        request = f"{method.upper()} {url}" if impersonate is None else f"{method.upper()} {url} impersonate={impersonate}"
+        return hashlib.sha256(request.encode()).hexdigest()
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        return self.cachedir.joinpath(f"{key}.json"), self.cachedir.joinpath(f"{key}.body")
+
+    def count(self, stat: str) -> None:
+        with self._lock:
+            self._stats[stat] += 1
+
+    @property
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {stat: self._stats[stat] for stat in ("hits", "misses", "revalidations")}
+
+    def lookup(self, key: str) -> Optional[CacheEntry]:
+        meta_fn, body_fn = self._paths(key)
+        try:
+            meta = jsonlib.loads(meta_fn.read_text())
+            body = body_fn.read_bytes()
+        except (OSError, ValueError):
+            return None
+
+        if len(body) != meta["length"]:
+            # NOTE: the body was replaced by another process between reading the metadata and the body
+            return None
+
+        return CacheEntry(
+            url=meta["url"],
+            status_code=meta["status_code"],
+            headers=meta["headers"],
+            expires=meta["expires"],
+            body=body,
+            vary=meta.get("vary", {}),
+        )
+
+    def store(self, key: str, response, request_headers: dict[str, str]) -> None:
+        """
+        Keep `response`, if it can be, for the request with these (lowercased) headers that it answered
+        """
+        if response.status_code != 200:
+            return
+
+        # NOTE: the stored body is already decoded, so any headers describing the transfer don't apply to it
+        headers = {k.lower(): v for k, v in response.headers.items() if k.lower() not in _TRANSFER_HEADERS}
+        if "no-store" in _cache_control(headers):
+            return
+
+        vary = _vary(headers)
+        if "*" in vary:
+            return
+
+        now = time.time()
+        expires = _expiry(headers, now)
+        if expires <= now and not ("etag" in headers or "last-modified" in headers):
+            # NOTE: nothing to gain by keeping a response that is stale immediately and can't be revalidated
+            return
+
+        body = response.content
+        meta = {
+            "url": str(response.url),
+            "status_code": response.status_code,
+            "headers": headers,
+            "expires": expires,
+            "length": len(body),
+            "vary": {name: request_headers.get(name) for name in vary},
+        }
+
+        self.cachedir.mkdir(exist_ok=True, parents=True)
+        meta_fn, body_fn = self._paths(key)
+        atomic_write(body_fn, body)
+        atomic_write(meta_fn, jsonlib.dumps(meta).encode())
+
+    def revalidated(self, key: str, entry: CacheEntry, response) -> CacheEntry:
+        """
+        Refresh a stored entry with the headers of a `304 Not Modified` response
+        """
+        entry.headers.update({k.lower(): v for k, v in response.headers.items() if k.lower() in ("cache-control", "expires", "etag", "last-modified", "date")})
+        entry.expires = _expiry(entry.headers, time.time())
+
+        meta_fn, _ = self._paths(key)
+        meta = {
+            "url": entry.url,
+            "status_code": entry.status_code,
+            "headers": entry.headers,
+            "expires": entry.expires,
+            "length": len(entry.body),
+            "vary": entry.vary,
+        }
+        atomic_write(meta_fn, jsonlib.dumps(meta).encode())
+
+        return entry
+
+    def clear(self) -> None:
+        for fn in self.cachedir.glob("*"):
+            fn.unlink(missing_ok=True)
@@ -0,0 +1,160 @@
+"""
+Helpers for pulling the items of one array out of a large JSON document without decoding all of it
+
+`items()` yields the items of an array one at a time, so that the consumer can decide what to keep as it goes and
+nothing else in the document is ever built. When `ijson` is installed (the 'streaming' extra) it does the parsing.
+Otherwise a document of at least `SCAN_MIN_BYTES` is walked with the standard library's decoder: the objects along the
+way to the array are scanned over without decoding the values of their other keys, and each item is decoded on its own
+as it is reached. That is slower than `json.loads()`, so smaller documents are simply decoded whole.
+"""
+from __future__ import annotations
+
+import json
+import re
+from io import BytesIO
+from typing import Any, Iterator, Optional, Union
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+
+# NOTE: below this size (in bytes, or characters for text) the memory saved by scanning isn't worth the time it costs
+SCAN_MIN_BYTES = 8 * 1024 * 1024
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def streams(src: Union[str, bytes]) -> bool:
+    """
+    Whether `items()` decodes `src` incrementally, rather than decoding all of it at once
+    """
+    return ijson is not None or len(src) >= SCAN_MIN_BYTES
+
+
+def items(src: Union[str, bytes], path: str) -> Iterator[Any]:
+    """
+    Each item of the array found by following `path` from the top of the JSON document `src`, e.g. "data.sessions"
+    for `{"data": {"sessions": [...]}}`
+
+    Nothing is yielded if the document doesn't have anything at `path`.
+    """
+    if ijson is not None:
+        src = src.encode() if isinstance(src, str) else src
+        # NOTE: use_float, so that numbers come out the same as they do from json.loads()
+        yield from ijson.items(BytesIO(src), f"{path}.item", use_float=True)
+        return
+
+    if not streams(src):
+        doc = json.loads(src)
+        for key in path.split("."):
+            if not isinstance(doc, dict) or key not in doc:
+                return
+            doc = doc[key]
+        if isinstance(doc, list):
+            yield from doc
+        return
+
+    raw, s = None, src
+    if isinstance(src, bytes):
+        # NOTE: decoded as latin-1, which has one character for each byte, so that the text takes no more memory than
+        # `src` does (any other character in it would double that at least) and positions in it are positions in `src`.
+        # Only the items with something other than ASCII in them need decoding again, from their UTF-8 bytes
+        raw, s = src, src.decode("latin-1")
+
+    pos: Optional[int] = _skip_whitespace(s, 0)
+    for key in path.split("."):
+        pos = _find_key(s, pos, key if raw is None else key.encode().decode("latin-1"))
+        if pos is None:
+            return
+
+    yield from _array_items(s, pos, raw)
+
+
+def _skip_whitespace(s: str, pos: int) -> int:
+    return _WHITESPACE.match(s, pos).end()
+
+
+def _expect(s: str, pos: int, char: str) -> int:
+    if s[pos:pos + 1] != char:
+        raise json.JSONDecodeError(f"Expecting '{char}'", s, pos)
+    return _skip_whitespace(s, pos + 1)
+
+
+def _skip_value(s: str, pos: int) -> int:
+    """
+    The position just past the value starting at `pos`
+    """
+    # NOTE: an array or object is skipped over one item at a time, so that no more than one of its items is ever built
+    if s[pos:pos + 1] in ("[", "{"):
+        return _end(s, pos)
+
+    _, end = _DECODER.raw_decode(s, pos)
+    return end
+
+
+def _end(s: str, pos: int) -> int:
+    """
+    The position just past the array or object starting at `pos`, each of its items is decoded and dropped in turn
+    """
+    close = "]" if s[pos] == "[" else "}"
+    pos = _skip_whitespace(s, pos + 1)
+    if s[pos:pos + 1] == close:
+        return pos + 1
+
+    while True:
+        if close == "}":
+            _, pos = _DECODER.raw_decode(s, pos)
+            pos = _expect(s, _skip_whitespace(s, pos), ":")
+        _, pos = _DECODER.raw_decode(s, pos)
+
+        pos = _skip_whitespace(s, pos)
+        if s[pos:pos + 1] == close:
+            return pos + 1
+        pos = _expect(s, pos, ",")
+
+
+def _find_key(s: str, pos: int, key: str) -> Optional[int]:
+    """
+    The position of the value of `key` in the object starting at `pos`, if it has one
+    """
+    if s[pos:pos + 1] != "{":
+        return None
+
+    pos = _skip_whitespace(s, pos + 1)
+    if s[pos:pos + 1] == "}":
+        return None
+
+    while True:
+        name, pos = _DECODER.raw_decode(s, pos)
+        pos = _expect(s, _skip_whitespace(s, pos), ":")
+        if name == key:
+            return pos
+
+        pos = _skip_whitespace(s, _skip_value(s, pos))
+        if s[pos:pos + 1] == "}":
+            return None
+        pos = _expect(s, pos, ",")
+
+
+def _array_items(s: str, pos: int, raw: Optional[bytes] = None) -> Iterator[Any]:
+    if s[pos:pos + 1] != "[":
+        return
+
+    pos = _skip_whitespace(s, pos + 1)
+    if s[pos:pos + 1] == "]":
+        return
+
+    while True:
+        start = pos
+        item, pos = _DECODER.raw_decode(s, pos)
+        if raw is not None and not raw[start:pos].isascii():
+            item = json.loads(raw[start:pos])
+        yield item
+
+        pos = _skip_whitespace(s, pos)
+        if s[pos:pos + 1] == "]":
+            return
+        pos = _expect(s, pos, ",")
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import json as jsonlib
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entry (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    -- JSON
+    value TEXT NOT NULL,
+    -- UNIX timestamp
+    expires REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+"""
+
+# NOTE: keep well under SQLite's limit on the number of parameters in a statement
+_CHUNK = 500
+
+
+class TTLStore:
+    """
+    SQLite database of JSON values that expire, for remembering things between runs
+
+    Keys are grouped into namespaces so that unrelated users can share one database. The database is created on first
+    use.
+    """
+    def __init__(self, path: Path):
+        self.path = path
+        self._initialized = False
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            if not self._initialized:
+                self.path.parent.mkdir(exist_ok=True, parents=True)
+                with closing(sqlite3.connect(self.path, timeout=30)) as conn:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.executescript(SCHEMA)
+                self._initialized = True
+
+        # NOTE: a connection per operation keeps the store usable from any thread, see ShowingStore
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+
+    def get_many(self, namespace: str, keys: Iterable[str]) -> dict[str, Any]:
+        """
+        The unexpired values stored for any of `keys`, missing keys are left out
+        """
+        keys = list(dict.fromkeys(keys))
+        now = time.time()
+
+        result = {}
+        with self._connect() as conn:
+            for start in range(0, len(keys), _CHUNK):
+                chunk = keys[start:start + _CHUNK]
+                rows = conn.execute(
+                    f"SELECT key, value FROM entry WHERE namespace = ? AND expires > ? AND key IN ({', '.join('?' * len(chunk))})",
+                    (namespace, now, *chunk),
+                )
+                result.update((key, jsonlib.loads(value)) for key, value in rows)
+
+        return result
+
+    def put_many(self, namespace: str, items: dict[str, Any], ttl: timedelta) -> None:
+        if not items:
+            return
+
+        expires = time.time() + ttl.total_seconds()
+
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO entry (namespace, key, value, expires) VALUES (?, ?, ?, ?)",
+                ((namespace, key, jsonlib.dumps(value), expires) for key, value in items.items()),
+            )
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        return self.get_many(namespace, [key]).get(key, default)
+
+    def put(self, namespace: str, key: str, value: Any, ttl: timedelta) -> None:
+        self.put_many(namespace, {key: value}, ttl=ttl)
+
+    def purge(self) -> int:
+        """
+        Delete every expired entry, returning how many there were
+        """
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM entry WHERE expires <= ?", (time.time(),)).rowcount
@@ -0,0 +1,196 @@
+"""
+Structured metrics for a refresh: provider runs, HTTP requests, parse steps and showings cache lookups
+
+Nothing is collected until a run is started with `start_run()`. While it is active, each measured step records an
+event (a flat dict) tagged with the provider it was made on behalf of, so that it can be written out as JSON lines and
+summarized per provider and per host at the end of the run.
+
+The current provider is tracked with a context variable. Worker threads don't inherit it, so functions handed to a
+thread pool from inside a provider should be wrapped with `bind()`.
+"""
+from __future__ import annotations
+
+import contextvars
+import json as jsonlib
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+
+_PROVIDER: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("kinopy_provider", default=None)
+
+
+class MetricsRun:
+    def __init__(self):
+        self.started = datetime.now()
+        self.events: list[dict] = []
+        self._lock = threading.Lock()
+
+    def record(self, event: str, **fields) -> None:
+        fields = {"run": self.started.isoformat(), "event": event, "provider": _PROVIDER.get(), **fields}
+        with self._lock:
+            self.events.append(fields)
+
+    def write(self, path: Path, max_bytes: Optional[int] = None) -> None:
+        """
+        Append every event of this run to the JSON lines file at `path`
+
+        Parameters
+        ----------
+        path - the JSON lines file
+        max_bytes - if given, a file at least this large is first moved aside to `path` with '.1' added to its name
+        """
+        path.parent.mkdir(exist_ok=True, parents=True)
+        if max_bytes is not None:
+            try:
+                if path.stat().st_size >= max_bytes:
+                    path.replace(path.with_name(path.name + ".1"))
+            except FileNotFoundError:
+                pass
+
+        with self._lock, path.open("a", encoding="utf-8") as f:
+            for event in self.events:
+                f.write(jsonlib.dumps(event) + "\n")
+
+    def by_provider(self) -> dict[Optional[str], dict]:
+        rows = defaultdict(lambda: defaultdict(float))
+
+        with self._lock:
+            events = list(self.events)
+
+        for ev in events:
+            row = rows[ev["provider"]]
+            if ev["event"] == "provider":
+                row["status"] = ev["status"]
+                row["seconds"] = ev["seconds"]
+                row["showings"] = ev.get("showings") or 0
+            elif ev["event"] == "request":
+                row["requests"] += 1
+                row["bytes"] += ev["bytes"] or 0
+                row["request_seconds"] += ev["seconds"]
+                row["retries"] += ev["retries"]
+                row["http_cache_hits"] += ev["cache"] == "hit"
+            elif ev["event"] == "parse":
+                row["parse_seconds"] += ev["seconds"]
+            elif ev["event"] == "showings_cache":
+                row["showings_cache_hits"] += ev["hit"]
+                row["showings_cache_misses"] += not ev["hit"]
+
+        return rows
+
+    def by_host(self) -> dict[str, dict]:
+        rows = defaultdict(lambda: defaultdict(float))
+
+        with self._lock:
+            events = [ev for ev in self.events if ev["event"] == "request"]
+
+        for ev in events:
+            row = rows[ev["host"]]
+            row["requests"] += 1
+            row["bytes"] += ev["bytes"] or 0
+            row["seconds"] += ev["seconds"]
+            row["retries"] += ev["retries"]
+            row["errors"] += ev["status"] is None or ev["status"] >= 400
+
+        return rows
+
+    def summary(self) -> str:
+        lines = [
+            f"{'provider':<32}{'status':>8}{'wall (s)':>10}{'http (s)':>10}{'parse (s)':>10}{'requests':>10}{'KiB':>10}"
+            f"{'retries':>9}{'cached':>8}{'showings':>10}"
+        ]
+        for provider, row in sorted(self.by_provider().items(), key=lambda item: -item[1]["seconds"]):
+            cached = "-"
+            if row["showings_cache_hits"] or row["showings_cache_misses"]:
+                cached = "yes" if row["showings_cache_hits"] else "no"
+            lines.append(
+                f"{provider or '(none)':<32}{row.get('status', 'running'):>8}{row['seconds']:>10.2f}{row['request_seconds']:>10.2f}"
+                f"{row['parse_seconds']:>10.2f}{row['requests']:>10.0f}{row['bytes'] / 1024:>10.0f}{row['retries']:>9.0f}"
+                f"{cached:>8}{row['showings']:>10.0f}"
+            )
+
+        lines.append("")
+        lines.append(f"{'host':<32}{'requests':>10}{'errors':>8}{'retries':>9}{'total (s)':>11}{'KiB':>10}")
+        for host, row in sorted(self.by_host().items(), key=lambda item: -item[1]["seconds"]):
+            lines.append(
+                f"{host:<32}{row['requests']:>10.0f}{row['errors']:>8.0f}{row['retries']:>9.0f}{row['seconds']:>11.2f}{row['bytes'] / 1024:>10.0f}"
+            )
+
+        return "\n".join(lines)
+
+
+_RUN: Optional[MetricsRun] = None
+
+
+def start_run() -> MetricsRun:
+    """
+    Start collecting metrics, replacing any run that was already active
+    """
+    global _RUN
+    _RUN = MetricsRun()
+    return _RUN
+
+
+def stop_run() -> Optional[MetricsRun]:
+    global _RUN
+    run, _RUN = _RUN, None
+    return run
+
+
+def record(event: str, **fields) -> None:
+    if _RUN is not None:
+        _RUN.record(event, **fields)
+
+
+@contextmanager
+def timed(event: str, **fields) -> Iterator[dict]:
+    """
+    Record `event` along with how long the block took, in seconds
+
+    The yielded dict can be filled in with more fields from inside the block. Also usable as a decorator.
+    """
+    extra = {}
+    start = time.perf_counter()
+    try:
+        yield extra
+    finally:
+        record(event, seconds=time.perf_counter() - start, **fields, **extra)
+
+
+@contextmanager
+def provider(name: str) -> Iterator[dict]:
+    """
+    Attribute everything measured inside the block to the provider `name`, and record the run of the provider itself
+
+    Set "showings" on the yielded dict to record how many showings the provider produced.
+    """
+    token = _PROVIDER.set(name)
+    try:
+        with timed("provider") as extra:
+            try:
+                yield extra
+            except BaseException as exc:
+                extra.update(status="failed", error=repr(exc))
+                raise
+            extra.setdefault("status", "ok")
+    finally:
+        _PROVIDER.reset(token)
+
+
+def bind(func: Callable) -> Callable:
+    """
+    Wrap `func` to run with the current provider, wherever it is called from
+    """
+    ctx = contextvars.copy_context()
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        # NOTE: a Context can only be entered by one thread at a time, so each call gets its own copy
+        return ctx.copy().run(func, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,84 @@
+"""
+Recorded HTTP exchanges, for replaying a run of the providers without the network
+
+In 'record' mode `kinopy.util.web` saves every response it receives here, keyed on the method, URL and body of the
+request. In 'replay' mode the saved responses are served back instead of sending anything, so a run can be repeated
+deterministically and offline, as long as it makes the same requests.
+"""
+from __future__ import annotations
+
+import hashlib
+import json as jsonlib
+from pathlib import Path
+from typing import Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from .files import atomic_write
+from .httpcache import _TRANSFER_HEADERS
+
+
+class RecordingNotFound(requests.ConnectionError):
+    """
+    Raised when replaying a request that was never recorded
+    """
+
+
+class Recordings:
+    def __init__(self, directory: Path):
+        self.directory = directory
+
+    @staticmethod
+    def key(method: str, url: str, body: Optional[bytes] = None) -> str:
+        digest = hashlib.sha256(f"{method.upper()} {url}\n".encode())
+        if body:
+            digest.update(body)
+        return digest.hexdigest()
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        return self.directory.joinpath(f"{key}.json"), self.directory.joinpath(f"{key}.body")
+
+    def save(self, key: str, method: str, url: str, response) -> None:
+        # NOTE: the saved body is already decoded, so any headers describing the transfer don't apply to it
+        headers = {k.lower(): v for k, v in response.headers.items() if k.lower() not in _TRANSFER_HEADERS}
+
+        body = response.content
+        meta = {
+            "method": method.upper(),
+            "url": url,
+            "status_code": response.status_code,
+            "reason": getattr(response, "reason", None),
+            "headers": headers,
+            "length": len(body),
+        }
+
+        self.directory.mkdir(exist_ok=True, parents=True)
+        meta_fn, body_fn = self._paths(key)
+        atomic_write(body_fn, body)
+        atomic_write(meta_fn, jsonlib.dumps(meta).encode())
+
+    def load(self, key: str) -> Optional[requests.Response]:
+        meta_fn, body_fn = self._paths(key)
+        try:
+            meta = jsonlib.loads(meta_fn.read_text())
+            body = body_fn.read_bytes()
+        except (OSError, ValueError):
+            return None
+
+        if len(body) != meta["length"]:
+            return None
+
+        response = requests.Response()
+        response.status_code = meta["status_code"]
+        response.reason = meta["reason"]
+        response.headers = CaseInsensitiveDict(meta["headers"])
+        response.url = meta["url"]
+        response._content = body
+        return response
+
+    def replay(self, key: str, method: str, url: str) -> requests.Response:
+        response = self.load(key)
+        if response is None:
+            raise RecordingNotFound(f"No recorded response for {method.upper()} {url} in {self.directory}")
+        return response
@@ -0,0 +1,188 @@
+"""
+A local stand-in for the endpoints that each provider retrieves from, serving the captured payloads in `example_data/`
+
+    python -m kinopy.util.standin [--port 8765] [--latency 0.2] [--jitter 0.5] [--error-rate 0.05] [--seed 0]
+
+Point `kinopy` at it by setting `rewrite_to = "http://127.0.0.1:8765"` in the `[kinopy.http]` section of `kinopy.toml`,
+then a full refresh (`python main.py`) runs against it under the given network conditions. Every request is answered
+after `latency` seconds, give or take a random fraction `jitter` of that, and a random fraction `error_rate` of requests
+fail with `503 Service Unavailable`.
+
+NOTE: the payloads are fixed, so the same listings are served whatever dates are asked for. The providers' showings
+caches still apply, clear them (or use an empty cache directory) to measure a full refresh.
+
+Apple Cinemas has no captured payload, the stand-in reports that it has nothing scheduled.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class Route:
+    host: str
+    # matched against the start of the path and query of the request
+    prefix: str
+    # name of the file in the data directory to respond with, or the response itself
+    fixture: Optional[str] = None
+    body: bytes = b""
+    content_type: str = "application/json"
+
+
+ROUTES = [
+    # Somerville Theatre
+    Route("api.us.veezi.com", "/v1/websession", fixture="somerville_veezi_data.json"),
+    # The Brattle
+    Route("brattlefilm.org", "/coming-soon/", fixture="brattle.html", content_type="text/html; charset=utf-8"),
+    # Regent Theatre, the EventON calendar
+    Route("regenttheatre.com", "/schedule/", fixture="regent_schedule.html", content_type="text/html; charset=utf-8"),
+    Route("regenttheatre.com", "/?evo-ajax=", fixture="regent.json"),
+    # Harvard Film Archive
+    Route("harvardfilmarchive.org", "/calendar", fixture="harvard_film_archive_calendar.html", content_type="text/html; charset=utf-8"),
+    # Coolidge Corner Theatre
+    Route("coolidge.org", "/showtimes", fixture="coolidge_showings.html", content_type="text/html; charset=utf-8"),
+    # Alamo Drafthouse, the "mother" API
+    Route("drafthouse.com", "/s/mother/v2/schedule/market/", fixture="alamo.json"),
+    # Landmark Kendall Square, the BoxOffice API
+    Route("www.landmarktheatres.com", "/api/gatsby-source-boxofficeapi/schedule", fixture="kendall.json"),
+    Route("www.landmarktheatres.com", "/api/gatsby-source-boxofficeapi/movies", fixture="kendall_details.json"),
+    # Apple Cinemas, the Kiosk API
+    Route("www.applecinemas.com", "/Kiosk/GetAllCompanyLocationMovies/", body=b'{"schedules": []}'),
+    Route("www.applecinemas.com", "/Kiosk/GetLocationonlineMovies/", body=b"[]"),
+]
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], data_dir: Path, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, seed: Optional[int] = None):
+        super().__init__(address, StandInHandler)
+        self.data_dir = data_dir
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._bodies: dict[str, bytes] = {}
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def route(self, host: str, target: str) -> Optional[Route]:
+        for route in ROUTES:
+            if route.host == host and target.startswith(route.prefix):
+                return route
+        return None
+
+    def body(self, route: Route) -> bytes:
+        if route.fixture is None:
+            return route.body
+
+        # NOTE: a race here only means reading the same file twice
+        if route.fixture not in self._bodies:
+            self._bodies[route.fixture] = self.data_dir.joinpath(route.fixture).read_bytes()
+        return self._bodies[route.fixture]
+
+    def conditions(self) -> tuple[float, bool]:
+        """
+        How long to delay the next response, and whether it should fail
+        """
+        with self._rng_lock:
+            delay = self.latency * (1 + self.jitter * self._rng.uniform(-1, 1))
+            failed = self._rng.random() < self.error_rate
+        return max(0.0, delay), failed
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    server: StandInServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def respond(self, send_body: bool = True) -> None:
+        if length := int(self.headers.get("Content-Length") or 0):
+            self.rfile.read(length)
+
+        delay, failed = self.server.conditions()
+        time.sleep(delay)
+
+        # NOTE: requests arrive as /<host>/<path>?<query>, see `kinopy.util.web._rewrite()`
+        host, _, rest = self.path.lstrip("/").partition("/")
+        route = self.server.route(host, "/" + rest)
+
+        if failed:
+            status, body, content_type = 503, b"injected failure", "text/plain"
+        elif route is None:
+            status, body, content_type = 404, b"not found", "text/plain"
+        else:
+            status, body, content_type = 200, self.server.body(route), route.content_type
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self.respond()
+
+    def do_POST(self):
+        self.respond()
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+
+def start(data_dir: Path, host: str = "127.0.0.1", port: int = 0, **conditions) -> StandInServer:
+    """
+    Start a stand-in server in a background thread, call `shutdown()` on it to stop it
+
+    With the default `port` of 0, a free port is picked, see `StandInServer.base_url`.
+    """
+    server = StandInServer((host, port), data_dir=data_dir, **conditions)
+    threading.Thread(target=server.serve_forever, name="kinopy-standin", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--data", type=Path, default=Path("example_data"), help="directory of captured payloads")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random variation of the latency, as a fraction of it")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = StandInServer(
+        (args.host, args.port),
+        data_dir=args.data,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    print(f"Serving stand-in endpoints at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Checking whether guessed URLs exist, remembering the answers between runs
+
+Some providers link to a cinema's own film page rather than the ticketing URL their data comes with, but can only guess
+at the URL of that page (usually from a slug of the title). A `URLResolver` checks a batch of such guesses at once with
+concurrent `HEAD` requests, and stores both the URLs that exist and the ones that don't, so that a warm cache needs no
+requests at all.
+"""
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import cache
+from typing import Hashable, Optional, TypeVar
+
+from ..datamodel import CACHE_ROOT
+from . import metrics, web
+from .kvstore import TTLStore
+
+
+K = TypeVar("K", bound=Hashable)
+
+
+class URLResolver:
+    """
+    Parameters
+    ----------
+    store - where the results are kept
+    namespace - the part of `store` they are kept in
+    ttl - how long a URL that exists is remembered for
+    negative_ttl - how long a URL that doesn't exist is remembered for
+    max_workers - how many URLs are checked at once
+    """
+    def __init__(self, store: TTLStore, namespace: str = "url_exists", ttl: timedelta = timedelta(days=7), negative_ttl: timedelta = timedelta(days=1), max_workers: int = 8):
+        self.store = store
+        self.namespace = namespace
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_workers = max_workers
+
+    @staticmethod
+    def probe(url: str) -> Optional[bool]:
+        """
+        Whether `url` exists, or None if that couldn't be determined
+        """
+        try:
+            response = web.head(url)
+        except Exception as exc:
+            print(f"FAILED to check {url}: {exc}")
+            return None
+
+        if response.ok:
+            return True
+        if response.status_code >= 500 or response.status_code == 429:
+            # NOTE: the server is having a bad time, that says nothing about the page
+            return None
+        return False
+
+    def resolve_many(self, candidates: dict[K, str]) -> dict[K, Optional[str]]:
+        """
+        For each key, its candidate URL if it exists, otherwise None
+        """
+        urls = set(candidates.values())
+
+        # NOTE: answers that didn't come from the actual hosts (see `web.is_live()`) aren't mixed in with the ones that did
+        persist = web.is_live()
+
+        known = self.store.get_many(self.namespace, urls) if persist else {}
+        unknown = sorted(urls - known.keys())
+
+        if unknown:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="kinopy-urls") as executor:
+                probed = dict(zip(unknown, executor.map(metrics.bind(self.probe), unknown)))
+
+            # NOTE: inconclusive probes aren't stored, they're retried on the next run
+            if persist:
+                self.store.put_many(self.namespace, {url: True for url, exists in probed.items() if exists is True}, ttl=self.ttl)
+                self.store.put_many(self.namespace, {url: False for url, exists in probed.items() if exists is False}, ttl=self.negative_ttl)
+            known.update(probed)
+
+        metrics.record("url_resolve", urls=len(urls), cached=len(urls) - len(unknown), probed=len(unknown))
+
+        return {key: url if known.get(url) else None for key, url in candidates.items()}
+
+    def resolve(self, url: str) -> Optional[str]:
+        return self.resolve_many({url: url})[url]
+
+
+@cache
+def default_resolver() -> URLResolver:
+    """
+    The resolver shared by every provider, kept in the cache directory
+    """
+    return URLResolver(TTLStore(CACHE_ROOT.joinpath("urls.sqlite3")))
@@ -1,21 +1,380 @@
 """
 This module mimics `requests.api` so that it can be used as a drop-in replacement.
-The difference is that `kinopy` uses a common Session object to set the `User-Agent` header.
+The difference is that `kinopy` uses a common Session object to set the `User-Agent` header and to keep pooled
+connections to each host alive between requests.
+
+Requests to sites that fingerprint TLS clients can pass `impersonate="<browser>"`, in which case they are sent through a
+shared `curl_cffi` session impersonating that browser instead. They go through the HTTP cache like any other request.
+
+GET responses are kept in an on-disk HTTP cache (see `kinopy.util.httpcache`) and revalidated with conditional requests
+once they go stale. `cache_stats()` reports how often the cache was hit, missed or revalidated.
+
+The transport can be switched away from the network: in 'record' mode every response is also saved to disk, and in
+'replay' mode the saved responses are served back without sending anything (see `kinopy.util.recording`). Setting
+`rewrite_to` sends every request to a stand-in server instead (see `kinopy.util.standin`). The HTTP cache is bypassed
+in either case, so that it neither hides requests from the transport nor keeps responses that didn't come from upstream.
+
+Every request records a 'request' event with `kinopy.util.metrics` (host, status, bytes, time taken, retries and how
+the HTTP cache was involved) while a metrics run is active.
+
+Each function also has an awaitable counterpart (`aget()`, `apost()`, etc.) When `httpx` is installed, these use a
+pooled `httpx.AsyncClient` (which is also what provides HTTP/2 support) and return `httpx.Response` objects. Otherwise,
+and for requests that are cached, recorded, replayed or impersonated, they run the synchronous functions in a worker
+thread and return what those do. Callers should only rely on what every response type has: `status_code`, `headers`,
+`url`, `content`, `text`, `json()` and `raise_for_status()` (notably not `ok`, which httpx doesn't have). `aclose()`
+closes the async client of the running event loop.
 """
-import requests
+from __future__ import annotations
+
+import asyncio
+import threading
+import weakref
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import urlsplit
 
 import kinopy
+from ..datamodel import CACHE_ROOT
+from . import metrics
+from .httpcache import HTTPCache
+from .ratelimit import TokenBucket
+
+if TYPE_CHECKING:
+    import requests
+
+    from .recording import Recordings
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+USER_AGENT = f"kinopy {kinopy.__version__}"
+TRANSPORTS = ("live", "record", "replay")
+
+
+@dataclass(frozen=True)
+class ClientConfig:
+    # number of hosts to keep a connection pool for
+    pool_connections: int = 10
+    # number of keep-alive connections to hold open for each host
+    pool_maxsize: int = 10
+    # in seconds, used for any request that does not specify its own timeout
+    timeout: Optional[float] = 30.0
+    # how many times a request is retried (with backoff) when it can't connect or gets a 502, 503 or 504 response.
+    # NOTE: only idempotent requests made without `impersonate` are retried. A request that times out (or fails) while
+    # waiting for the response isn't retried, it raises requests.ReadTimeout (or requests.ConnectionError) as it would
+    # without retries
+    retries: int = 0
+    # NOTE: only the async functions can use HTTP/2, and only if httpx is installed with its 'http2' extra
+    http2: bool = False
+    # whether GET responses are stored in (and revalidated from) the on-disk HTTP cache
+    cache: bool = True
+    # one of: 'live', 'record', 'replay'
+    transport: str = "live"
+    # directory that responses are recorded to and replayed from, the 'recordings' directory of the cache by default
+    recordings: Optional[str] = None
+    # if given, the base URL of a stand-in server that every request is sent to instead, as <rewrite_to>/<host>/<path>
+    rewrite_to: Optional[str] = None
+
+
+_LOCK = threading.Lock()
+_CONFIG = ClientConfig()
+_SESSION: Optional[requests.Session] = None
+# NOTE: an httpx.AsyncClient's connections belong to the event loop they were opened on, so keep one client per loop
+_ASYNC_CLIENTS: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_RATE_LIMITS: dict[str, TokenBucket] = {}
+_IMPERSONATING_SESSIONS: dict = {}
+HTTP_CACHE = HTTPCache(CACHE_ROOT.joinpath("http"))
+
+
+def configure(**kwargs) -> ClientConfig:
+    """
+    Update the client configuration, see `ClientConfig` for the available options.
+
+    Any open connections are closed, new ones are opened with the new configuration on the next request.
+    """
+    global _CONFIG
+
+    if kwargs.get("transport", _CONFIG.transport) not in TRANSPORTS:
+        raise ValueError(f"Unknown transport {kwargs['transport']!r}, expected one of: {', '.join(TRANSPORTS)}")
+
+    with _LOCK:
+        _CONFIG = replace(_CONFIG, **kwargs)
+        _close()
+
+    return _CONFIG
+
+
+def close() -> None:
+    """
+    Close every pooled connection
+    """
+    with _LOCK:
+        _close()
+
+
+def _close() -> None:
+    global _SESSION
+
+    if _SESSION is not None:
+        _SESSION.close()
+        _SESSION = None
+
+    for sess in _IMPERSONATING_SESSIONS.values():
+        sess.close()
+    _IMPERSONATING_SESSIONS.clear()
+
+    clients = list(_ASYNC_CLIENTS.items())
+    _ASYNC_CLIENTS.clear()
+    for loop, client in clients:
+        _close_async_client(loop, client)
+
+
+def _close_async_client(loop: asyncio.AbstractEventLoop, client: httpx.AsyncClient) -> None:
+    """
+    Close `client` on the event loop its connections belong to
+    """
+    if loop.is_closed():
+        # NOTE: the loop's transports were closed along with it, there is nothing left to close cleanly
+        return
+
+    if loop.is_running():
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is loop:
+            # NOTE: called from a coroutine on that loop, which can't be blocked waiting for the close
+            loop.create_task(client.aclose())
+        else:
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+    else:
+        loop.run_until_complete(client.aclose())
+
+
+def set_rate_limit(host: str, rate: float, burst: int = 1) -> None:
+    """
+    Limit requests to `host` to `rate` per second on average, in bursts of at most `burst`
+
+    Setting the same limit again keeps the existing one, along with the tokens already taken from it.
+    """
+    with _LOCK:
+        bucket = _RATE_LIMITS.get(host)
+        if bucket is None or (bucket.rate, bucket.burst) != (rate, burst):
+            _RATE_LIMITS[host] = TokenBucket(rate=rate, burst=burst)
+
+
+def clear_rate_limit(host: str) -> None:
+    _RATE_LIMITS.pop(host, None)
+
+
+def _rate_limit(url) -> Optional[TokenBucket]:
+    return _RATE_LIMITS.get(urlsplit(url).hostname)
+
+
+def session() -> requests.Session:
+    global _SESSION
+
+    with _LOCK:
+        if _SESSION is None:
+            # NOTE: requests is only imported once a request is actually sent, a run answered entirely from the
+            # showings cache doesn't need it
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util import Retry
+
+            sess = requests.Session()
+            sess.headers["User-Agent"] = USER_AGENT
+
+            # NOTE: read=False, a retried read error would be raised as a ConnectionError once the retries ran out
+            retry = Retry(
+                total=_CONFIG.retries,
+                read=False,
+                backoff_factor=0.5,
+                status_forcelist=(502, 503, 504),
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=_CONFIG.pool_connections, pool_maxsize=_CONFIG.pool_maxsize, max_retries=retry)
+            sess.mount("https://", adapter)
+            sess.mount("http://", adapter)
+
+            _SESSION = sess
+
+        return _SESSION
+
+
+def impersonating_session(impersonate: str):
+    """
+    The shared `curl_cffi` session impersonating the given browser
+
+    NOTE: curl_cffi keeps a curl handle per thread for each session, so this is safe to share between worker threads and
+    each one keeps its own connection alive.
+    """
+    with _LOCK:
+        sess = _IMPERSONATING_SESSIONS.get(impersonate)
+        if sess is None:
+            # NOTE: curl_cffi wraps curl-impersonate, which only a few providers need, so it's only imported on demand
+            import curl_cffi
+
+            sess = curl_cffi.Session(impersonate=impersonate)
+            _IMPERSONATING_SESSIONS[impersonate] = sess
+
+        return sess
+
+
+def cache_stats() -> dict[str, int]:
+    return HTTP_CACHE.stats
+
+
+def recordings() -> Recordings:
+    from .recording import Recordings
+
+    if _CONFIG.recordings is not None:
+        return Recordings(Path(_CONFIG.recordings))
+    return Recordings(CACHE_ROOT.joinpath("recordings"))
+
+
+def is_live() -> bool:
+    """
+    Whether requests are going to their actual hosts, rather than being recorded, replayed or sent to a stand-in
+    """
+    return _CONFIG.transport == "live" and _CONFIG.rewrite_to is None
+
+
+def _cacheable(method, **kwargs) -> bool:
+    return _CONFIG.cache and is_live() and method.lower() == "get" and not kwargs.get("stream")
+
 
-SESSION = requests.Session()
-SESSION.headers["User-Agent"] = f"kinopy {kinopy.__version__}"
+def _request_headers(headers: Optional[dict], impersonate: Optional[str] = None) -> dict[str, str]:
+    """
+    The (lowercased) headers a request sent with `headers` goes out with, for matching cached responses
+    """
+    # NOTE: an impersonated request also goes out with the browser's own headers, which are the same every time (and
+    # its responses are kept apart from the others, see HTTPCache.key())
+    sent = {k.lower(): v for k, v in session().headers.items()} if impersonate is None else {}
+    for k, v in (headers or {}).items():
+        if v is None:
+            sent.pop(k.lower(), None)
+        else:
+            sent[k.lower()] = v
+    return sent
+
+
+def _rewrite(url: str) -> str:
+    if _CONFIG.rewrite_to is None:
+        return url
+
+    parts = urlsplit(url)
+    rewritten = f"{_CONFIG.rewrite_to.rstrip('/')}/{parts.netloc}{parts.path or '/'}"
+    if parts.query:
+        rewritten += f"?{parts.query}"
+    return rewritten
+
+
+def _recording_key(method, url, **kwargs) -> tuple[str, str]:
+    import requests
+
+    from .recording import Recordings
+
+    prepared = requests.Request(method, url, params=kwargs.get("params"), data=kwargs.get("data"), json=kwargs.get("json")).prepare()
+
+    body = prepared.body
+    if isinstance(body, str):
+        body = body.encode()
+
+    return Recordings.key(method, prepared.url, body), prepared.url
+
+
+def _send(method, url, impersonate: Optional[str] = None, **kwargs):
+    transport = _CONFIG.transport
+
+    if transport != "live":
+        key, full_url = _recording_key(method, url, **kwargs)
+        if transport == "replay":
+            return recordings().replay(key, method, full_url)
+
+    if bucket := _rate_limit(url):
+        bucket.acquire()
+
+    kwargs.setdefault("timeout", _CONFIG.timeout)
+
+    if impersonate is not None:
+        response = impersonating_session(impersonate).request(method=method.upper(), url=_rewrite(url), **kwargs)
+    else:
+        response = session().request(method=method, url=_rewrite(url), **kwargs)
+
+    if transport == "record":
+        recordings().save(key, method, full_url, response)
+
+    return response
+
+
+def _retries(response) -> int:
+    # NOTE: only responses from requests carry their urllib3 retry history
+    retry = getattr(getattr(response, "raw", None), "retries", None)
+    return len(retry.history) if retry is not None else 0
 
 
 def request(method, url, **kwargs):
-    # By using the 'with' statement we are sure the session is closed, thus we
-    # avoid leaving sockets open which can trigger a ResourceWarning in some
-    # cases, and look like a memory leak in others.
-    with SESSION as session:
-        return session.request(method=method, url=url, **kwargs)
+    with metrics.timed("request", method=method.upper(), host=urlsplit(url).hostname) as m:
+        m.update(status=None, bytes=None, retries=0, cache=None)
+        try:
+            response, m["cache"] = _request(method, url, **kwargs)
+        except Exception as exc:
+            m["error"] = repr(exc)
+            raise
+
+        m["status"] = response.status_code
+        m["retries"] = _retries(response)
+        if not kwargs.get("stream"):
+            m["bytes"] = len(response.content)
+
+    return response
+
+
+def _request(method, url, **kwargs) -> tuple[requests.Response, Optional[str]]:
+    """
+    Send a request through the HTTP cache where possible, returning the response and one of: 'hit', 'revalidated',
+    'miss' or None (if the cache wasn't used)
+
+    NOTE: responses from the cache are `requests.Response` objects, even for impersonated requests, whose other
+    responses come from curl_cffi. Both have the usual `status_code`, `headers`, `content`, `json()` and so on
+    """
+    if not _cacheable(method, **kwargs):
+        return _send(method, url, **kwargs), None
+
+    import requests
+
+    full_url = requests.Request(method, url, params=kwargs.get("params")).prepare().url
+    key = HTTP_CACHE.key(method, full_url, impersonate=kwargs.get("impersonate"))
+    request_headers = _request_headers(kwargs.get("headers"), impersonate=kwargs.get("impersonate"))
+
+    entry = HTTP_CACHE.lookup(key)
+    if entry is not None and not entry.matches(request_headers):
+        # NOTE: the response kept for this URL was for a request with different values of the headers it varies on
+        entry = None
+
+    if entry is not None:
+        if entry.fresh:
+            HTTP_CACHE.count("hits")
+            return entry.response(), "hit"
+
+        kwargs["headers"] = {**(kwargs.get("headers") or {}), **entry.conditional_headers()}
+
+    response = _send(method, url, **kwargs)
+
+    if entry is not None and response.status_code == 304:
+        HTTP_CACHE.count("revalidations")
+        return HTTP_CACHE.revalidated(key, entry, response).response(), "revalidated"
+
+    HTTP_CACHE.count("misses")
+    HTTP_CACHE.store(key, response, request_headers)
+
+    return response, "miss"
 
 
 def get(url, params=None, **kwargs):
@@ -45,3 +404,86 @@ def patch(url, data=None, **kwargs):
 
 def delete(url, **kwargs):
     return request("delete", url, **kwargs)
+
+
+def _async_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+
+    with _LOCK:
+        client = _ASYNC_CLIENTS.get(loop)
+        if client is None:
+            limits = httpx.Limits(
+                max_connections=_CONFIG.pool_connections * _CONFIG.pool_maxsize,
+                max_keepalive_connections=_CONFIG.pool_maxsize,
+            )
+            client = httpx.AsyncClient(
+                headers={"User-Agent": USER_AGENT},
+                limits=limits,
+                http2=_CONFIG.http2,
+                # NOTE: match the requests default
+                follow_redirects=True,
+            )
+            _ASYNC_CLIENTS[loop] = client
+
+        return client
+
+
+async def aclose() -> None:
+    """
+    Close the pooled async client of the running event loop, e.g. before the loop is closed
+    """
+    loop = asyncio.get_running_loop()
+    with _LOCK:
+        client = _ASYNC_CLIENTS.pop(loop, None)
+
+    if client is not None:
+        await client.aclose()
+
+
+async def arequest(method, url, **kwargs):
+    # NOTE: cached, recorded and replayed requests go through the sync client so that they share the same entries
+    if httpx is None or kwargs.get("impersonate") is not None or _cacheable(method, **kwargs) or _CONFIG.transport != "live":
+        return await asyncio.to_thread(request, method, url, **kwargs)
+
+    if bucket := _rate_limit(url):
+        await bucket.aacquire()
+
+    kwargs.setdefault("timeout", _CONFIG.timeout)
+    if "allow_redirects" in kwargs:
+        kwargs["follow_redirects"] = kwargs.pop("allow_redirects")
+
+    with metrics.timed("request", method=method.upper(), host=urlsplit(url).hostname) as m:
+        m.update(status=None, bytes=None, retries=0, cache=None)
+        response = await _async_client().request(method, _rewrite(url), **kwargs)
+        m.update(status=response.status_code, bytes=len(response.content))
+
+    return response
+
+
+async def aget(url, params=None, **kwargs):
+    return await arequest("get", url, params=params, **kwargs)
+
+
+async def aoptions(url, **kwargs):
+    return await arequest("options", url, **kwargs)
+
+
+async def ahead(url, **kwargs):
+    kwargs.setdefault("allow_redirects", False)
+    return await arequest("head", url, **kwargs)
+
+
+async def apost(url, data=None, json=None, **kwargs):
+    return await arequest("post", url, data=data, json=json, **kwargs)
+
+
+async def aput(url, data=None, **kwargs):
+    return await arequest("put", url, data=data, **kwargs)
+
+
+async def apatch(url, data=None, **kwargs):
+    return await arequest("patch", url, data=data, **kwargs)
+
+
+async def adelete(url, **kwargs):
+    return await arequest("delete", url, **kwargs)
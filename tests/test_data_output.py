@@ -0,0 +1,44 @@
+import os
+import stat
+from datetime import date
+
+import pytest
+
+from kinopy.datamodel import Showing
+from main import write_data
+
+
+DAY = date(2025, 8, 4)
+
+
+@pytest.fixture
+def umask():
+    mask = os.umask(0o022)
+    os.umask(mask)
+    return mask
+
+
+def shows(title: str) -> dict:
+    return {"The Brattle": {DAY: [Showing(DAY, title, "https://brattlefilm.org/film", None)]}}
+
+
+def mode(path) -> int:
+    return stat.S_IMODE(path.stat().st_mode)
+
+
+def test_write_data_uses_the_usual_permissions(tmp_path, umask):
+    write_data(tmp_path, shows("Jaws"), from_date=DAY, to_date=DAY)
+
+    files = [path for path in tmp_path.rglob("*") if path.is_file()]
+    assert {path.name for path in files} == {"index.json", f"{DAY.isoformat()}.json"}
+    for path in files:
+        assert mode(path) == 0o666 & ~umask, path
+
+
+def test_write_data_keeps_the_permissions_of_replaced_files(tmp_path):
+    write_data(tmp_path, shows("Jaws"), from_date=DAY, to_date=DAY)
+    day_file = tmp_path.joinpath("days", f"{DAY.isoformat()}.json")
+    day_file.chmod(0o640)
+
+    assert write_data(tmp_path, shows("Jaws 2"), from_date=DAY, to_date=DAY) > 0
+    assert mode(day_file) == 0o640
@@ -0,0 +1,74 @@
+import json
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from kinopy.provider.apple_cinemas import AppleCinemasProvider
+from kinopy.util import web
+from kinopy.util.httpcache import HTTPCache
+
+
+ETAG = '"showtimes-1"'
+
+
+@pytest.fixture
+def server():
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(self.path)
+
+            if self.headers.get("If-None-Match") == ETAG:
+                self.send_response(304)
+                self.send_header("ETag", ETAG)
+                self.end_headers()
+                return
+
+            body = json.dumps([{"locationId": "cambridge"}]).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", self.server.cache_control)
+            self.send_header("ETag", ETAG)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    srv.requests = requests
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def http_cache(tmp_path, monkeypatch):
+    cache = HTTPCache(tmp_path)
+    monkeypatch.setattr(web, "HTTP_CACHE", cache)
+    config = web.configure(cache=True, transport="live", rewrite_to=None)
+    yield cache
+    web.configure(**{field: getattr(config, field) for field in ("cache", "transport", "rewrite_to")})
+
+
+@pytest.mark.parametrize("cache_control, second", [("max-age=60", "hits"), ("no-cache", "revalidations")])
+def test_impersonated_requests_are_cached(server, http_cache, monkeypatch, cache_control, second):
+    server.cache_control = cache_control
+    monkeypatch.setattr(
+        AppleCinemasProvider,
+        "MOVIE_URL_PATTERN",
+        f"http://127.0.0.1:{server.server_port}/{{actualMovieId}}/{{fromTime}}/{{toTime}}",
+    )
+
+    first_data = AppleCinemasProvider.showings_for_movie_on_date("1234", date(2025, 8, 1))
+    second_data = AppleCinemasProvider.showings_for_movie_on_date("1234", date(2025, 8, 1))
+
+    assert first_data == second_data == [{"locationId": "cambridge", "actualMovieId": "1234"}]
+    assert http_cache.stats == {"hits": 0, "misses": 1, "revalidations": 0, second: 1}
+    assert len(server.requests) == (1 if second == "hits" else 2)
@@ -0,0 +1,52 @@
+import threading
+from datetime import date
+
+from kinopy.server import CalendarServer, ProviderRefresher, ShowingsModel
+
+
+CINEMAS = ["The Brattle", "Regent Theatre"]
+
+
+def window():
+    return date(2025, 8, 1), date(2025, 8, 8)
+
+
+def jobs(refreshed: threading.Event):
+    def job():
+        refreshed.set()
+        return {date(2025, 8, 1): []}
+
+    return lambda from_date, to_date: {cinema: job for cinema in CINEMAS}
+
+
+def test_refresher_can_be_joined_after_stopping():
+    refreshed = threading.Event()
+    refresher = ProviderRefresher(CINEMAS[0], ShowingsModel(CINEMAS), jobs=jobs(refreshed), window=window, interval=3600, retry_interval=60)
+    refresher.start()
+    assert refreshed.wait(5)
+
+    refresher.stop()
+    refresher.join(5)
+
+    assert not refresher.is_alive()
+
+
+def test_stop_refreshing_waits_for_the_refreshers():
+    refreshed = threading.Event()
+    server = CalendarServer(
+        ("127.0.0.1", 0),
+        cinemas=CINEMAS,
+        jobs=jobs(refreshed),
+        window=window,
+        render=lambda shows: "",
+        static_files=[],
+        interval=3600,
+    )
+    try:
+        server.start_refreshing()
+        assert refreshed.wait(5)
+        server.stop_refreshing(timeout=5)
+
+        assert not any(refresher.is_alive() for refresher in server.refreshers)
+    finally:
+        server.server_close()
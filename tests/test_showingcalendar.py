@@ -0,0 +1,43 @@
+from datetime import date
+
+from kinopy.datamodel import Showing, ShowingCalendar
+
+
+MONDAY = date(2025, 8, 4)
+
+
+def calendar() -> ShowingCalendar:
+    shows = {"The Brattle": {MONDAY: [Showing(MONDAY, "Jaws", "https://brattlefilm.org/jaws", None)]}}
+    return ShowingCalendar(shows)
+
+
+def test_formatday_takes_a_weekday():
+    cell = calendar().formatday(MONDAY, 0)
+
+    assert cell.startswith('<td class="mon">')
+    assert "Jaws" in cell
+
+
+def test_formatday_zero_is_an_empty_cell():
+    cal = calendar()
+
+    assert cal.formatday(0, 0) == f'<td class="{cal.cssclass_noday}">&nbsp;</td>\n'
+
+
+def test_formatday_numbered():
+    assert '<div class="daynum">Aug 4</div>' in calendar().formatday(MONDAY, 0, with_number=True)
+
+
+def test_formatweek():
+    cal = calendar()
+
+    assert cal.formatweek(MONDAY).count("<td") == 7
+    assert cal.formatweek(MONDAY, weeks=2).count('<div class="daynum">') == 14
+
+
+def test_formatmonth_withyear():
+    cal = calendar()
+
+    assert "<h3>August 2025</h3>" in cal.formatmonth(2025, 8)
+    assert "<h3>August</h3>" in cal.formatmonth(2025, 8, withyear=False)
+    assert "Jaws" in cal.formatyear(2025)
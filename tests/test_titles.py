@@ -0,0 +1,40 @@
+import pytest
+
+from kinopy.datamodel import FilmIndex
+from kinopy.datamodel.titles import sequel_markers
+
+
+@pytest.mark.parametrize("first, second", [
+    ("The Godfather Part II", "The Godfather Part III"),
+    ("Mission: Impossible - Dead Reckoning Part One", "Mission: Impossible - Dead Reckoning Part Two"),
+    ("Kill Bill: Vol. 1", "Kill Bill: Vol. 2"),
+    ("Toy Story 2", "Toy Story 3"),
+    ("Star Wars: Episode IV - A New Hope", "Star Wars: Episode VI - A New Hope"),
+])
+def test_sequels_are_different_films(first, second):
+    keys = FilmIndex().add_many([first, second])
+    assert keys[first] != keys[second]
+
+
+@pytest.mark.parametrize("first, second", [
+    ("CatVideoFest 2025", "Cat Video Fest 2025"),
+    ("The Godfather Part II", "The Godfather: Part II"),
+    ("Mission: Impossible - Dead Reckoning Part One", "Mission Impossible Dead Reckoning - Part One"),
+])
+def test_spellings_are_the_same_film(first, second):
+    keys = FilmIndex().add_many([first, second])
+    assert keys[first] == keys[second]
+
+
+@pytest.mark.parametrize("key, markers", [
+    ("godfather-part-ii", (2,)),
+    ("godfather-part-iii", (3,)),
+    ("star-wars-episode-ix-the-rise-of-skywalker", (9,)),
+    ("dead-reckoning-part-one", (1,)),
+    ("kill-bill-vol-2", (2,)),
+    ("2-fast-2-furious", (2, 2)),
+    ("one-battle-after-another", ()),
+    ("mix-tape", ()),
+])
+def test_sequel_markers(key, markers):
+    assert sequel_markers(key) == markers